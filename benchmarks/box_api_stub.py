@@ -0,0 +1,319 @@
+"""
+Local stand-in for the subset of the Box API used by the MCP server tools.
+
+It is meant for load testing only: every response is synthetic, every request
+is accepted with any bearer token, and a configurable delay is added to each
+call so that blocking or queueing inside the MCP server becomes visible.
+
+Point the server at it with:
+
+    BOX_API_BASE_URL=http://127.0.0.1:8765 BOX_DEVELOPER_TOKEN=stub \
+        uv run src/mcp_server_box.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+IMAGE_ID_SUFFIXES = ("5",)
+SEARCH_RESULTS = 20
+
+
+class StubSettings:
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    content_latency_ms: float = 150.0
+    file_size: int = 64 * 1024
+    base_url: str = ""
+    requests_served: int = 0
+    lock = threading.Lock()
+
+
+def _file_name(file_id: str) -> str:
+    if file_id.endswith(IMAGE_ID_SUFFIXES):
+        return f"image-{file_id}.png"
+    return f"document-{file_id}.txt"
+
+
+def _file_entry(file_id: str) -> dict:
+    return {
+        "type": "file",
+        "id": file_id,
+        "name": _file_name(file_id),
+        "description": "",
+        "size": StubSettings.file_size,
+        "etag": "1",
+        "sha1": hashlib.sha1(_file_content(file_id)).hexdigest(),
+        "file_version": {"type": "file_version", "id": f"{file_id}1"},
+    }
+
+
+def _folder_entry(folder_id: str, name: str | None = None) -> dict:
+    return {
+        "type": "folder",
+        "id": folder_id,
+        "name": name or f"folder-{folder_id}",
+        "description": "",
+        "etag": "1",
+    }
+
+
+def _file_content(file_id: str) -> bytes:
+    if file_id.endswith(IMAGE_ID_SUFFIXES):
+        # Not a valid PNG, but the tools only care about the bytes and mime type
+        return b"\x89PNG\r\n\x1a\n" + bytes(StubSettings.file_size - 8)
+    line = f"Synthetic content of file {file_id}. ".encode()
+    return (line * (StubSettings.file_size // len(line) + 1))[: StubSettings.file_size]
+
+
+class BoxApiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 - signature from base class
+        pass
+
+    def _delay(self, content: bool = False) -> None:
+        base = StubSettings.content_latency_ms if content else StubSettings.latency_ms
+        jitter = random.uniform(-StubSettings.jitter_ms, StubSettings.jitter_ms)
+        time.sleep(max(0.0, base + jitter) / 1000)
+        with StubSettings.lock:
+            StubSettings.requests_served += 1
+
+    def end_headers(self) -> None:
+        # Box identifies every response for support requests
+        self.send_header("box-request-id", f"{random.getrandbits(64):016x}")
+        super().end_headers()
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_bytes(self, body: bytes, content_type: str) -> None:
+        status = 200
+        range_header = self.headers.get("Range")
+        total = len(body)
+        match = re.match(r"bytes=(\d+)-(\d*)", range_header or "")
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else total - 1
+            body = body[start : end + 1]
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{start + len(body) - 1}/{total}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return {}
+
+    def do_GET(self):  # noqa: N802 - http.server naming
+        url = urlparse(self.path)
+        path = url.path
+        query = parse_qs(url.query)
+
+        if path == "/2.0/users/me":
+            self._delay()
+            return self._send_json(
+                {"type": "user", "id": "1", "name": "Load Test User", "login": "load@example.com"}
+            )
+
+        if path == "/2.0/search":
+            self._delay()
+            offset = int(query.get("offset", ["0"])[0])
+            entries = [_file_entry(str(1000 + offset + i)) for i in range(SEARCH_RESULTS)]
+            if query.get("type", [""])[0] == "folder":
+                entries = [_folder_entry(str(2000 + i)) for i in range(3)]
+            return self._send_json(
+                {"type": "search_results_items", "total_count": len(entries), "limit": 100, "offset": offset, "entries": entries}
+            )
+
+        match = re.fullmatch(r"/2.0/files/(\d+)/content", path)
+        if match:
+            self._delay(content=True)
+            return self._send_bytes(_file_content(match.group(1)), "application/octet-stream")
+
+        match = re.fullmatch(r"/2.0/files/(\d+)", path)
+        if match:
+            self._delay()
+            entry = _file_entry(match.group(1))
+            rep_hints = self.headers.get("x-rep-hints") or ""
+            image_hint = re.search(r"\[(jpg|png)\?dimensions=(\d+)x\d+\]", rep_hints)
+            if image_hint:
+                representation = f"{image_hint.group(1)}_{image_hint.group(2)}"
+            elif rep_hints:
+                representation = "extracted_text"
+            if rep_hints:
+                asset_url = f"{StubSettings.base_url}/2.0/representations/{match.group(1)}/{representation}/"
+                entry["representations"] = {
+                    "entries": [
+                        {
+                            # jpg_320 is the "jpg" representation, at 320 pixels
+                            "representation": "extracted_text"
+                            if representation == "extracted_text"
+                            else representation.split("_")[0],
+                            "properties": {},
+                            "status": {"state": "success"},
+                            "info": {"url": asset_url},
+                            "content": {"url_template": asset_url + "{+asset_path}"},
+                        }
+                    ]
+                }
+            return self._send_json(entry)
+
+        match = re.fullmatch(r"/2.0/representations/(\d+)/extracted_text/", path)
+        if match:
+            self._delay(content=True)
+            return self._send_bytes(_file_content(match.group(1)), "text/plain")
+
+        match = re.fullmatch(r"/2.0/representations/(\d+)/(jpg|png)_(\d+)/.*", path)
+        if match:
+            # Roughly the size of a compressed image of that dimension
+            self._delay()
+            dimension = int(match.group(3))
+            magic = b"\xff\xd8\xff" if match.group(2) == "jpg" else b"\x89PNG\r\n\x1a\n"
+            return self._send_bytes(magic + bytes(dimension * dimension // 16), f"image/{match.group(2)}")
+
+        match = re.fullmatch(r"/2.0/folders/(\d+)/items", path)
+        if match:
+            self._delay()
+            folder_id = int(match.group(1))
+            entries = [_file_entry(str(folder_id * 100 + i)) for i in range(10)]
+            # Folders 0-9 have two subfolders each, so trees are three levels deep
+            if folder_id < 10:
+                entries += [_folder_entry(str(folder_id * 10 + i)) for i in (1, 2)]
+            return self._send_json(
+                {"total_count": len(entries), "limit": 100, "offset": 0, "entries": entries}
+            )
+
+        match = re.fullmatch(r"/2.0/folders/(\d+)", path)
+        if match:
+            self._delay()
+            return self._send_json(_folder_entry(match.group(1)))
+
+        if path == "/subscribe":
+            # Long poll: nothing ever changes, so ask the client to reconnect
+            time.sleep(1)
+            return self._send_json({"message": "reconnect"})
+
+        if path == "/2.0/events":
+            # Nothing ever changes in the stub
+            self._delay()
+            position = query.get("stream_position", ["0"])[0]
+            if position == "now":
+                position = "1"
+            return self._send_json({"chunk_size": 0, "next_stream_position": position, "entries": []})
+
+        if path.startswith("/2.0/docgen"):
+            self._delay()
+            return self._send_json({"limit": 100, "next_marker": None, "entries": []})
+
+        self._delay()
+        return self._send_json({"type": "error", "status": 404, "code": "not_found"}, 404)
+
+    def do_POST(self):  # noqa: N802 - http.server naming
+        path = urlparse(self.path).path
+        if path == "/2.0/folders":
+            body = self._read_body()
+            self._delay()
+            return self._send_json(_folder_entry(str(random.randint(10**6, 10**7)), body.get("name")), 201)
+        if path == "/api/2.0/files/content":
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self._delay(content=True)
+            file_id = str(random.randint(10**6, 10**7))
+            return self._send_json({"total_count": 1, "entries": [_file_entry(file_id)]}, 201)
+        match = re.fullmatch(r"/api/2.0/files/(\d+)/content", path)
+        if match:
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self._delay(content=True)
+            return self._send_json({"total_count": 1, "entries": [_file_entry(match.group(1))]}, 201)
+        self._delay()
+        return self._send_json({"type": "error", "status": 404, "code": "not_found"}, 404)
+
+    def do_OPTIONS(self):  # noqa: N802 - http.server naming
+        path = urlparse(self.path).path
+        self._read_body()
+        self._delay()
+        if path == "/2.0/events":
+            return self._send_json({
+                "chunk_size": 1,
+                "entries": [{
+                    "type": "realtime_server",
+                    "url": f"{StubSettings.base_url}/subscribe?channel=stub",
+                    "ttl": "10",
+                    "max_retries": "10",
+                    "retry_timeout": 610,
+                }],
+            })
+        if path == "/2.0/files/content":
+            # Upload preflight check: every upload is allowed
+            return self._send_json({"upload_url": f"{StubSettings.base_url}/api/2.0/files/content"})
+        return self._send_json({"type": "error", "status": 404, "code": "not_found"}, 404)
+
+    def do_PUT(self):  # noqa: N802 - http.server naming
+        path = urlparse(self.path).path
+        body = self._read_body()
+        match = re.fullmatch(r"/2.0/folders/(\d+)", path)
+        self._delay()
+        if match:
+            return self._send_json(_folder_entry(match.group(1), body.get("name")))
+        return self._send_json({"type": "error", "status": 404, "code": "not_found"}, 404)
+
+    def do_DELETE(self):  # noqa: N802 - http.server naming
+        self._delay()
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=StubSettings.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=StubSettings.jitter_ms)
+    parser.add_argument(
+        "--content-latency-ms",
+        type=float,
+        default=StubSettings.content_latency_ms,
+        help="Delay for downloads and extracted text",
+    )
+    parser.add_argument("--file-size", type=int, default=StubSettings.file_size)
+    args = parser.parse_args()
+
+    StubSettings.latency_ms = args.latency_ms
+    StubSettings.jitter_ms = args.jitter_ms
+    StubSettings.content_latency_ms = args.content_latency_ms
+    StubSettings.file_size = args.file_size
+    StubSettings.base_url = f"http://{args.host}:{args.port}"
+
+    server = ThreadingHTTPServer((args.host, args.port), BoxApiStubHandler)
+    server.daemon_threads = True
+    print(f"Box API stub listening on {StubSettings.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Served {StubSettings.requests_served} requests", flush=True)
+
+
+if __name__ == "__main__":
+    main()
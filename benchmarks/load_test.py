@@ -0,0 +1,355 @@
+"""
+Multi-session load generator for the Box MCP server.
+
+Opens many concurrent MCP client sessions, replays a weighted mix of tool
+calls and reports request rate, latency percentiles and error rates.
+
+Each session also pings the server periodically. A ping is answered by the
+server's event loop without touching Box, so when ping latency climbs along
+with tool latency the loop is being blocked by synchronous work; when tool
+latency climbs but pings stay fast, requests are queueing somewhere else.
+
+Examples:
+
+    # 50 stdio sessions (one server process each) against a local Box stand-in
+    python benchmarks/box_api_stub.py --latency-ms 50 &
+    BOX_API_BASE_URL=http://127.0.0.1:8765 BOX_DEVELOPER_TOKEN=stub \
+        python benchmarks/load_test.py --sessions 50 --duration 30
+
+    # 50 sessions sharing one server over the HTTP (SSE) transport
+    python benchmarks/load_test.py --transport sse --url http://127.0.0.1:8000/sse \
+        --sessions 50 --in-flight 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_SCRIPT = os.path.join(REPO_ROOT, "src", "mcp_server_box.py")
+
+DEFAULT_MIX = (
+    "box_search_tool=4,box_read_tool=3,box_download_file_tool=2,"
+    "box_docgen_template_list_tool=1,box_docgen_list_jobs_tool=1"
+)
+
+# Arguments used when a tool has no entry in --args-file. The ids match the
+# synthetic ids served by benchmarks/box_api_stub.py.
+DEFAULT_ARGS: Dict[str, List[Dict[str, Any]]] = {
+    "box_who_am_i": [{}],
+    "box_search_tool": [{"query": "contract"}, {"query": "invoice"}],
+    "box_read_tool": [{"file_id": "1001"}, {"file_id": "1002"}, {"file_id": "1003"}],
+    "box_download_file_tool": [{"file_id": "1004"}, {"file_id": "1005"}],
+    "box_list_folder_content_by_folder_id": [{"folder_id": "12"}],
+    "box_search_folder_by_name": [{"folder_name": "Contracts"}],
+    "box_docgen_template_list_tool": [{}],
+    "box_docgen_list_jobs_tool": [{}],
+}
+
+# Forwarded to stdio server processes so they can reach a Box stand-in
+FORWARDED_ENV = ("BOX_", "FASTMCP_", "PATH", "HOME", "PYTHONPATH", "VIRTUAL_ENV")
+
+
+@dataclass
+class CallSample:
+    tool: str
+    started: float
+    latency: float
+    error: str | None = None
+
+
+@dataclass
+class LoadStats:
+    samples: List[CallSample] = field(default_factory=list)
+    pings: List[float] = field(default_factory=list)
+    session_failures: List[str] = field(default_factory=list)
+    started: float = 0.0
+    finished: float = 0.0
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "tool=weight,tool=weight" into a weight mapping."""
+    weights: Dict[str, float] = {}
+    for part in mix.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        tool, _, weight = part.partition("=")
+        weights[tool.strip()] = float(weight) if weight else 1.0
+    if not weights:
+        raise ValueError("the tool mix is empty")
+    return weights
+
+
+def load_tool_args(path: str | None) -> Dict[str, List[Dict[str, Any]]]:
+    """Merge DEFAULT_ARGS with a JSON file of {tool: args | [args, ...]}."""
+    tool_args = {tool: list(args) for tool, args in DEFAULT_ARGS.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for tool, args in json.load(f).items():
+                tool_args[tool] = args if isinstance(args, list) else [args]
+    return tool_args
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Latency distribution in milliseconds."""
+    return {
+        "count": len(values),
+        "mean_ms": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p90_ms": round(percentile(values, 90) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def _result_error(result) -> str | None:
+    """Classify a CallToolResult as an error.
+
+    Most tools in this server report failures as plain text starting with
+    "Error" instead of raising, so those count as errors too.
+    """
+    texts = [c.text for c in result.content if getattr(c, "type", None) == "text"]
+    if result.isError:
+        return (texts[0] if texts else "isError")[:200]
+    if texts and texts[0].lstrip().lower().startswith(("error", '{"error"')):
+        return texts[0][:200]
+    return None
+
+
+def _open_transport(args: argparse.Namespace):
+    if args.transport == "sse":
+        return sse_client(args.url, timeout=args.connect_timeout)
+
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key.startswith(FORWARDED_ENV)
+    }
+    command = args.server_command or [sys.executable, SERVER_SCRIPT]
+    return stdio_client(
+        StdioServerParameters(
+            command=command[0], args=command[1:], env=env, cwd=REPO_ROOT
+        )
+    )
+
+
+async def _run_session(
+    session_index: int,
+    args: argparse.Namespace,
+    weights: Dict[str, float],
+    tool_args: Dict[str, List[Dict[str, Any]]],
+    stats: LoadStats,
+    deadline: float,
+) -> None:
+    rng = random.Random(args.seed + session_index)
+    tools = list(weights)
+    tool_weights = [weights[t] for t in tools]
+
+    async with AsyncExitStack() as stack:
+        read, write = await stack.enter_async_context(_open_transport(args))
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+
+        async def worker() -> None:
+            while time.monotonic() < deadline:
+                tool = rng.choices(tools, tool_weights)[0]
+                call_args = rng.choice(tool_args.get(tool) or [{}])
+                started = time.monotonic()
+                error = None
+                try:
+                    result = await asyncio.wait_for(
+                        session.call_tool(tool, call_args), args.call_timeout
+                    )
+                    error = _result_error(result)
+                except asyncio.TimeoutError:
+                    error = "timeout"
+                except Exception as e:  # noqa: BLE001 - every failure is a data point
+                    error = f"{type(e).__name__}: {e}"[:200]
+                stats.samples.append(
+                    CallSample(tool, started, time.monotonic() - started, error)
+                )
+                if args.think_time:
+                    await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+        async def pinger() -> None:
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                try:
+                    await asyncio.wait_for(session.send_ping(), args.call_timeout)
+                    stats.pings.append(time.monotonic() - started)
+                except Exception:  # noqa: BLE001
+                    stats.pings.append(args.call_timeout)
+                await asyncio.sleep(args.ping_interval)
+
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(args.in_flight):
+                tg.create_task(worker())
+            if args.ping_interval > 0:
+                tg.create_task(pinger())
+
+
+async def run_load(args: argparse.Namespace) -> LoadStats:
+    weights = parse_mix(args.mix)
+    tool_args = load_tool_args(args.args_file)
+    stats = LoadStats()
+
+    async def guarded(index: int, deadline: float) -> None:
+        # Stagger session start-up so process spawns do not all land at once
+        await asyncio.sleep(index * args.ramp_up / max(1, args.sessions))
+        try:
+            await _run_session(index, args, weights, tool_args, stats, deadline)
+        except Exception as e:  # noqa: BLE001
+            stats.session_failures.append(f"session {index}: {type(e).__name__}: {e}")
+
+    stats.started = time.monotonic()
+    deadline = stats.started + args.ramp_up + args.duration
+    await asyncio.gather(*(guarded(i, deadline) for i in range(args.sessions)))
+    stats.finished = time.monotonic()
+    return stats
+
+
+def build_report(stats: LoadStats, args: argparse.Namespace) -> Dict[str, Any]:
+    # Only count calls issued after ramp-up so the rate reflects steady state
+    steady_start = stats.started + args.ramp_up
+    steady = [s for s in stats.samples if s.started >= steady_start]
+    if steady:
+        wall = max(1e-9, stats.finished - steady_start)
+    else:
+        steady = stats.samples
+        wall = max(1e-9, stats.finished - stats.started)
+
+    per_tool: Dict[str, Any] = {}
+    for tool in sorted({s.tool for s in steady}):
+        tool_samples = [s for s in steady if s.tool == tool]
+        errors = [s for s in tool_samples if s.error]
+        per_tool[tool] = {
+            **summarize([s.latency for s in tool_samples]),
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(tool_samples), 4),
+            "sample_error": errors[0].error if errors else None,
+        }
+
+    latencies = [s.latency for s in steady]
+    errors = [s for s in steady if s.error]
+    busy_time = sum(latencies)
+    return {
+        "transport": args.transport,
+        "sessions": args.sessions,
+        "in_flight_per_session": args.in_flight,
+        "duration_s": round(wall, 2),
+        "calls": len(steady),
+        "requests_per_second": round(len(steady) / wall, 2),
+        "error_rate": round(len(errors) / len(steady), 4) if steady else 0.0,
+        # Average number of calls that were actually in progress. Far below
+        # sessions * in_flight means callers spent their time waiting on
+        # each other rather than on Box.
+        "effective_concurrency": round(busy_time / wall, 2),
+        "latency": summarize(latencies),
+        "ping_latency": summarize(stats.pings),
+        "tools": per_tool,
+        "session_failures": stats.session_failures[:20],
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    lat = report["latency"]
+    ping = report["ping_latency"]
+    print(
+        f"{report['calls']} calls in {report['duration_s']}s over "
+        f"{report['sessions']} {report['transport']} sessions: "
+        f"{report['requests_per_second']} req/s, "
+        f"error rate {report['error_rate']:.2%}, "
+        f"effective concurrency {report['effective_concurrency']}"
+    )
+    print(
+        f"latency  p50 {lat['p50_ms']}ms  p95 {lat['p95_ms']}ms  "
+        f"p99 {lat['p99_ms']}ms  max {lat['max_ms']}ms"
+    )
+    print(
+        f"ping     p50 {ping['p50_ms']}ms  p95 {ping['p95_ms']}ms  "
+        f"p99 {ping['p99_ms']}ms  max {ping['max_ms']}ms"
+    )
+    print()
+    print(f"{'tool':<40} {'calls':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for tool, row in report["tools"].items():
+        print(
+            f"{tool:<40} {row['count']:>7} {row['p50_ms']:>8}ms {row['p95_ms']:>8}ms "
+            f"{row['p99_ms']:>8}ms {row['error_rate']:>7.1%}"
+        )
+    for tool, row in report["tools"].items():
+        if row["sample_error"]:
+            print(f"  {tool}: {row['sample_error']}")
+    for failure in report["session_failures"]:
+        print(f"  {failure}")
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Concurrent MCP session load generator for the Box MCP server"
+    )
+    parser.add_argument("--transport", choices=["stdio", "sse"], default="stdio")
+    parser.add_argument(
+        "--url", default="http://127.0.0.1:8000/sse", help="SSE endpoint (sse transport)"
+    )
+    parser.add_argument(
+        "--server-command",
+        nargs="+",
+        help="Command that starts one stdio server (default: this repo's server)",
+    )
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument(
+        "--in-flight", type=int, default=1, help="Concurrent calls per session"
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument(
+        "--ramp-up", type=float, default=5.0, help="Seconds to spread session start-up"
+    )
+    parser.add_argument(
+        "--think-time", type=float, default=0.0, help="Mean pause between calls (s)"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="tool=weight,...")
+    parser.add_argument(
+        "--args-file", help="JSON file mapping tool name to arguments or list of arguments"
+    )
+    parser.add_argument("--ping-interval", type=float, default=0.5)
+    parser.add_argument("--call-timeout", type=float, default=60.0)
+    parser.add_argument("--connect-timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the report here")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = parse_args(argv)
+    stats = asyncio.run(run_load(args))
+    report = build_report(stats, args)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Cold-start benchmark for the Box MCP server over stdio.
+
+Spawns a fresh server process per run, the same way an agent host does for
+every new session, and measures the time from spawn until the server has
+answered `initialize` and the first `tools/list`. The first tool call is
+timed separately when --first-call is given, since that is where deferred
+imports and client construction are paid.
+
+    python benchmarks/startup_time.py --runs 10
+    BOX_API_BASE_URL=http://127.0.0.1:8765 BOX_DEVELOPER_TOKEN=stub \
+        python benchmarks/startup_time.py --first-call box_who_am_i
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from load_test import FORWARDED_ENV, REPO_ROOT, SERVER_SCRIPT
+
+
+async def measure_once(command: List[str], first_call: str | None) -> Dict[str, float]:
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key.startswith(FORWARDED_ENV)
+    }
+    params = StdioServerParameters(
+        command=command[0], args=command[1:], env=env, cwd=REPO_ROOT
+    )
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            timings["initialize"] = time.perf_counter() - started
+            tools = await session.list_tools()
+            timings["tools_list"] = time.perf_counter() - started
+            timings["tool_count"] = len(tools.tools)
+            if first_call:
+                call_started = time.perf_counter()
+                await session.call_tool(first_call, {})
+                timings["first_call"] = time.perf_counter() - call_started
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure time to first tools/list")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--server-command",
+        nargs="+",
+        help="Command that starts one stdio server (default: this repo's server)",
+    )
+    parser.add_argument(
+        "--first-call", help="Also time the first call of this argument-less tool"
+    )
+    parser.add_argument("--json", dest="json_path", help="Also write the results here")
+    args = parser.parse_args()
+
+    command = args.server_command or [sys.executable, SERVER_SCRIPT]
+    runs = [asyncio.run(measure_once(command, args.first_call)) for _ in range(args.runs)]
+
+    report = {}
+    for key in ("initialize", "tools_list", "first_call"):
+        values = [run[key] for run in runs if key in run]
+        if not values:
+            continue
+        report[key] = {
+            "min_ms": round(min(values) * 1000, 1),
+            "median_ms": round(statistics.median(values) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+        }
+        print(
+            f"{key:<12} min {report[key]['min_ms']:>8}ms  "
+            f"median {report[key]['median_ms']:>8}ms  max {report[key]['max_ms']:>8}ms"
+        )
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"runs": runs, "summary": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Admission control for concurrent tool calls.
+
+Every tool call is accepted as soon as it arrives, so a burst of downloads
+or Box AI questions runs all at once: memory grows with each transfer, Box
+starts rate limiting, and every call in the burst slows down together.
+
+Tools are grouped in categories (ai, transfer, metadata, docgen), each with
+a limit on the calls running at once and a bounded queue of calls waiting
+for a slot. A call that finds the queue full, or waits longer than the
+maximum queue wait, is answered at once with a "busy" result telling the
+client when to retry, instead of adding to the overload.
+"""
+
+import asyncio
+import functools
+import json
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict
+
+# (calls running at once, calls waiting) by category
+DEFAULT_LIMITS = {
+    "ai": (4, 16),
+    "transfer": (8, 32),
+    "metadata": (16, 64),
+    "docgen": (4, 16),
+}
+
+
+class ServerBusy(Exception):
+    """Raised when a call is not admitted; `retry_after` is in seconds."""
+
+    def __init__(self, category: str, retry_after: int, reason: str):
+        super().__init__(f"Server busy with {category} calls, retry after {retry_after} seconds")
+        self.category = category
+        self.retry_after = retry_after
+        self.reason = reason
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "error": "server_busy",
+                "message": str(self),
+                "category": self.category,
+                "reason": self.reason,
+                "retry_after_seconds": self.retry_after,
+            }
+        )
+
+
+@dataclass
+class _Limit:
+    concurrency: int
+    queue: int
+    max_wait: float
+
+
+class _Category:
+    def __init__(self, name: str, limit: _Limit):
+        self.name = name
+        self.limit = limit
+        self._slots = asyncio.Semaphore(limit.concurrency)
+        self.active = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_wait = 0
+        self.total_wait = 0.0
+        self._durations: deque = deque(maxlen=50)
+
+    def retry_after(self) -> int:
+        """Seconds until the calls ahead are likely done, from recent durations."""
+        typical = sum(self._durations) / len(self._durations) if self._durations else 1.0
+        ahead = (self.queued + 1) / self.limit.concurrency
+        return min(60, max(1, math.ceil(typical * ahead)))
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if self._slots.locked() and self.queued >= self.limit.queue:
+            self.rejected_queue_full += 1
+            raise ServerBusy(self.name, self.retry_after(), "queue_full")
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        waited = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.limit.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected_wait += 1
+            raise ServerBusy(self.name, self.retry_after(), "queue_wait")
+        finally:
+            self.queued -= 1
+        started = time.monotonic()
+        self.total_wait += started - waited
+        self.admitted += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+            self._durations.append(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit.concurrency,
+            "active": self.active,
+            "queue_depth": self.queued,
+            "queue_limit": self.limit.queue,
+            "max_queue_depth": self.max_queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_queue_wait": self.rejected_wait,
+            "mean_wait_seconds": round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+        }
+
+
+class Admission:
+    """
+    Per-category concurrency limits with bounded queues.
+
+    Args:
+        limits: Limit of each category; calls of other categories are not limited.
+    """
+
+    def __init__(self, limits: Dict[str, _Limit], enabled: bool = True):
+        self.enabled = enabled
+        self._categories = {name: _Category(name, limit) for name, limit in limits.items()}
+
+    @classmethod
+    def from_env(cls) -> "Admission":
+        """
+        BOX_LIMIT_<CATEGORY> and BOX_QUEUE_<CATEGORY> override the defaults,
+        BOX_QUEUE_WAIT (default 30) is the maximum queue wait in seconds and
+        BOX_ADMISSION=0 turns admission control off.
+        """
+        max_wait = float(os.getenv("BOX_QUEUE_WAIT", "30"))
+        limits = {}
+        for name, (concurrency, queue) in DEFAULT_LIMITS.items():
+            limits[name] = _Limit(
+                concurrency=max(1, int(os.getenv(f"BOX_LIMIT_{name.upper()}", concurrency))),
+                queue=max(0, int(os.getenv(f"BOX_QUEUE_{name.upper()}", queue))),
+                max_wait=max_wait,
+            )
+        return cls(limits, enabled=os.getenv("BOX_ADMISSION", "1").lower() in ("1", "true", "yes"))
+
+    @asynccontextmanager
+    async def admit(self, category: str) -> AsyncIterator[None]:
+        """Hold a slot of `category` for the duration of the block."""
+        if not self.enabled or category not in self._categories:
+            yield
+            return
+        async with self._categories[category].admit():
+            yield
+
+    def limited(self, category: str) -> Callable:
+        """Decorator running a tool under the limits of `category`."""
+
+        def decorator(tool: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(tool)
+            async def wrapper(*args, **kwargs):
+                try:
+                    async with self.admit(category):
+                        return await tool(*args, **kwargs)
+                except ServerBusy as e:
+                    return e.to_json()
+
+            return wrapper
+
+        return decorator
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "categories": {name: c.stats() for name, c in self._categories.items()},
+        }
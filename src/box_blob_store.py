@@ -0,0 +1,244 @@
+"""
+Temporary store for downloaded file content served as MCP resources.
+
+Returning a download inline means base64-encoding the whole file into the
+tool result: a third larger on the wire, several copies in memory, and all
+of it pushed into the agent's context whether it reads it or not. Instead
+the content is streamed to a temp directory and the tool returns a
+`box-download://` resource URI, which the client reads when (and in as many
+chunks as) it needs. The store is bounded in total size, and blobs expire.
+
+Blob ids are random and unguessable; resource reads carry no Box identity,
+so knowing the URI is what grants access to a blob.
+"""
+
+import atexit
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+URI_SCHEME = "box-download://"
+
+
+class BlobTooLargeError(ValueError):
+    """The content does not fit in the store."""
+
+
+@dataclass
+class Blob:
+    blob_id: str
+    path: str
+    file_id: str
+    file_name: str
+    mime_type: str
+    size: int
+    created: float
+
+    @property
+    def uri(self) -> str:
+        return f"{URI_SCHEME}{self.blob_id}"
+
+
+class BlobStore:
+    """
+    Size-bounded, expiring blob files in a private temp directory.
+
+    Args:
+        directory: Where blobs are written. A new temp directory (removed at
+            exit) when not given.
+        max_bytes: Total size of stored blobs; the oldest are evicted to make
+            room, and a single blob larger than this is rejected.
+        ttl: Seconds a blob stays readable.
+        chunk_size: Size of the chunks served by `read_chunk`.
+        max_read_bytes: Larger blobs can only be read in chunks.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = 1024 * 1024 * 1024,
+        ttl: float = 900.0,
+        chunk_size: int = 4 * 1024 * 1024,
+        max_read_bytes: int = 16 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.chunk_size = chunk_size
+        self.max_read_bytes = max_read_bytes
+        self._clock = clock
+        self._blobs: "OrderedDict[str, Blob]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.expired = 0
+        self.evicted = 0
+        self.reads = 0
+
+    @classmethod
+    def from_env(cls) -> "BlobStore":
+        return cls(
+            directory=os.getenv("BOX_BLOB_DIR") or None,
+            max_bytes=int(os.getenv("BOX_BLOB_STORE_MB", "1024")) * 1024 * 1024,
+            ttl=float(os.getenv("BOX_BLOB_TTL", "900")),
+            chunk_size=int(os.getenv("BOX_BLOB_CHUNK_MB", "4")) * 1024 * 1024,
+            max_read_bytes=int(os.getenv("BOX_BLOB_MAX_READ_MB", "16")) * 1024 * 1024,
+        )
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            with self._lock:
+                if self._directory is None:
+                    self._directory = tempfile.mkdtemp(prefix="box-mcp-blobs-")
+                    atexit.register(shutil.rmtree, self._directory, True)
+        return self._directory
+
+    def put(
+        self,
+        chunks: Iterable[bytes],
+        file_id: str,
+        file_name: str,
+        mime_type: Optional[str],
+    ) -> Blob:
+        """
+        Stream `chunks` into a new blob. Room for each chunk is reserved
+        before it is written, so blobs written at once stay within
+        `max_bytes` together.
+        """
+        blob_id = secrets.token_urlsafe(16)
+        path = os.path.join(self.directory, blob_id)
+        size = 0
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    if size + len(chunk) > self.max_bytes:
+                        raise BlobTooLargeError(
+                            f"File is larger than the download store ({self.max_bytes} bytes)"
+                        )
+                    self._reserve(len(chunk))
+                    size += len(chunk)
+                    f.write(chunk)
+        except BaseException:
+            with self._lock:
+                self._bytes -= size
+            _remove_file(path)
+            raise
+
+        blob = Blob(
+            blob_id=blob_id,
+            path=path,
+            file_id=file_id,
+            file_name=file_name,
+            mime_type=mime_type or "application/octet-stream",
+            size=size,
+            created=self._clock(),
+        )
+        with self._lock:
+            self._blobs[blob_id] = blob
+            self.stored += 1
+        return blob
+
+    def _reserve(self, size: int) -> None:
+        """Count `size` more bytes of a blob being written, evicting the oldest blobs for them."""
+        with self._lock:
+            self._expire()
+            while self._bytes + size > self.max_bytes and self._blobs:
+                _, oldest = self._blobs.popitem(last=False)
+                self._discard(oldest)
+                self.evicted += 1
+            if self._bytes + size > self.max_bytes:
+                # The rest is taken by other downloads still being written
+                raise BlobTooLargeError("The download store is full, retry later")
+            self._bytes += size
+
+    def get(self, blob_id: str) -> Optional[Blob]:
+        with self._lock:
+            self._expire()
+            return self._blobs.get(blob_id)
+
+    def get_by_uri(self, uri: str) -> Optional[Blob]:
+        if not uri.startswith(URI_SCHEME):
+            return None
+        return self.get(uri[len(URI_SCHEME):].split("/", 1)[0])
+
+    def read(self, blob_id: str) -> bytes:
+        return self.read_chunk(blob_id, None)
+
+    def read_chunk(self, blob_id: str, index: Optional[int]) -> bytes:
+        """
+        Content of a blob, or of its `index`-th chunk of `chunk_size` bytes.
+        Blobs larger than `max_read_bytes` are only served in chunks.
+        """
+        blob = self.get(blob_id)
+        if blob is None:
+            raise KeyError(f"Download {blob_id} does not exist or has expired")
+        chunks = self.chunk_count(blob)
+        if index is None and blob.size > self.max_read_bytes:
+            raise ValueError(
+                f"Download {blob_id} is {blob.size} bytes, read it in chunks: "
+                f"{blob.uri}/chunks/0 to {blob.uri}/chunks/{chunks - 1}"
+            )
+        if index is not None and not 0 <= index < chunks:
+            raise ValueError(f"Download {blob_id} has chunks 0 to {chunks - 1}, not {index}")
+        self.reads += 1
+        try:
+            with open(blob.path, "rb") as f:
+                if index is None:
+                    return f.read()
+                f.seek(index * self.chunk_size)
+                return f.read(self.chunk_size)
+        except FileNotFoundError:
+            # Evicted or expired since it was looked up
+            raise KeyError(f"Download {blob_id} does not exist or has expired") from None
+
+    def chunk_count(self, blob: Blob) -> int:
+        return max(1, -(-blob.size // self.chunk_size))
+
+    def _expire(self) -> None:
+        now = self._clock()
+        # Blobs are in creation order, so stop at the first live one
+        while self._blobs:
+            blob = next(iter(self._blobs.values()))
+            if now - blob.created < self.ttl:
+                break
+            del self._blobs[blob.blob_id]
+            self._discard(blob)
+            self.expired += 1
+
+    def _discard(self, blob: Blob) -> None:
+        self._bytes -= blob.size
+        _remove_file(blob.path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire()
+            return {
+                "blobs": len(self._blobs),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "stored": self.stored,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "reads": self.reads,
+            }
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Could not remove %s: %s", path, e)
@@ -0,0 +1,178 @@
+"""
+Cancellation of tool calls nobody waits for any more.
+
+When a client cancels a tool call or disconnects, the MCP session stops
+waiting for the handler, but the Box work behind it runs on worker threads
+that the event loop cannot interrupt: a recursive listing keeps paging, a
+folder download keeps streaming and a batch keeps calling Box, spending
+rate limit and memory on a result nobody reads.
+
+Each long-running call therefore gets a CancelToken. It is cancelled when
+the request is cancelled, or, for every call of a connection, when the
+client goes away. Code on the worker threads checks it between pages,
+chunks and sub-tasks, stops with OperationCancelled and cleans up what it
+started (open upload sessions, partial files).
+"""
+
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterable, Iterator, Optional, Set, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CANCELLED = "The tool call was cancelled"
+DISCONNECTED = "The client disconnected"
+
+
+class OperationCancelled(Exception):
+    """Raised on a worker thread when the tool call it works for was cancelled."""
+
+
+class CancelToken:
+    """Thread-safe flag telling worker threads to stop."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = CANCELLED) -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def check(self) -> None:
+        """Raise OperationCancelled if the token was cancelled."""
+        if self._event.is_set():
+            raise OperationCancelled(self.reason)
+
+    def sleep(self, seconds: float) -> None:
+        """time.sleep that returns early, raising, when the token is cancelled."""
+        if self._event.wait(seconds):
+            self.check()
+
+    def chunks(self, iterable: Iterable[T]) -> Iterator[T]:
+        """Items of `iterable`, checking the token before each one."""
+        for item in iterable:
+            self.check()
+            yield item
+
+
+class Connection:
+    """Tokens of the tool calls in progress for one client connection."""
+
+    def __init__(self):
+        self._tokens: Set[CancelToken] = set()
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def add(self, token: CancelToken) -> None:
+        with self._lock:
+            if not self.closed:
+                self._tokens.add(token)
+                return
+        token.cancel(DISCONNECTED)
+
+    def discard(self, token: CancelToken) -> None:
+        with self._lock:
+            self._tokens.discard(token)
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            tokens, self._tokens = self._tokens, set()
+        if tokens:
+            logger.info("Client disconnected, cancelling %d tool calls", len(tokens))
+        for token in tokens:
+            token.cancel(DISCONNECTED)
+
+
+# Set around a connection's server loop; request handlers are started from
+# it, so they see their own connection
+_connection: ContextVar[Optional[Connection]] = ContextVar("box_connection", default=None)
+
+
+@contextmanager
+def client_connection() -> Iterator[Connection]:
+    """Scope of one client connection; the tool calls it starts belong to it."""
+    connection = Connection()
+    reset = _connection.set(connection)
+    try:
+        yield connection
+    finally:
+        connection.close()
+        _connection.reset(reset)
+
+
+@contextmanager
+def request_token() -> Iterator[CancelToken]:
+    """
+    Token for the current tool call. It is cancelled when the handler is
+    cancelled while awaiting inside the block (the client cancelled the
+    request) or when the client's connection closes.
+    """
+    token = CancelToken()
+    connection = _connection.get()
+    if connection is not None:
+        connection.add(token)
+    try:
+        yield token
+    except asyncio.CancelledError:
+        token.cancel()
+        raise
+    finally:
+        if connection is not None:
+            connection.discard(token)
+
+
+class ClosingStream:
+    """Receive stream wrapper calling `on_close` once the client closed its end."""
+
+    def __init__(self, stream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aenter__(self) -> "ClosingStream":
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    def __aiter__(self) -> "ClosingStream":
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._on_close()
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def closing_receive(
+    receive: Callable[[], Awaitable[dict]], on_close: Callable[[], None]
+) -> Callable[[], Awaitable[dict]]:
+    """
+    ASGI receive callable calling `on_close` once the client disconnected,
+    for the SSE transport, whose message stream does not end when it does.
+    """
+
+    async def wrapped() -> dict:
+        message = await receive()
+        if message.get("type") == "http.disconnect":
+            on_close()
+        return message
+
+    return wrapped
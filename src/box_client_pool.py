@@ -0,0 +1,136 @@
+"""
+Pool of per-user Box clients for shared deployments.
+
+A single server process can act for many Box users, either through the
+As-User header (an admin app acting on behalf of a managed user) or with a
+user's own access token. Building a BoxClient wires up dozens of API
+managers, so clients are kept in an LRU with an idle TTL. Every pooled client
+shares the network session of the server's base client, so HTTP connections
+and TLS sessions are reused across users.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from box_sdk_gen import BoxClient, BoxDeveloperTokenAuth
+
+
+def identity_key(
+    as_user_id: Optional[str] = None, access_token: Optional[str] = None
+) -> str:
+    """
+    Stable key for the identity a request acts as; "" for the server's own.
+
+    Raw tokens are never used as keys, only their hash.
+    """
+    if access_token:
+        return "token:" + hashlib.sha256(access_token.encode()).hexdigest()
+    if as_user_id:
+        return f"as-user:{as_user_id}"
+    return ""
+
+
+@dataclass
+class _PoolEntry:
+    client: BoxClient
+    last_used: float
+
+
+class BoxClientPool:
+    """
+    LRU + idle-TTL cache of BoxClient instances keyed by user identity.
+
+    Args:
+        base_client: The server's own client. Pooled clients share its
+            network session.
+        max_clients: Upper bound on pooled clients; the least recently used
+            client is evicted beyond it.
+        idle_ttl: Seconds after which an unused client is evicted.
+    """
+
+    def __init__(
+        self,
+        base_client: BoxClient,
+        max_clients: int = 256,
+        idle_ttl: float = 900.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.base_client = base_client
+        self.max_clients = max_clients
+        self.idle_ttl = idle_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+
+    def get(
+        self, as_user_id: Optional[str] = None, access_token: Optional[str] = None
+    ) -> BoxClient:
+        """Return the pooled client for a user, creating it if needed."""
+        key = identity_key(as_user_id, access_token)
+        if not key:
+            return self.base_client
+
+        now = self._clock()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                entry.last_used = now
+                self._entries.move_to_end(key)
+                return entry.client
+
+            self.misses += 1
+            client = self._create(as_user_id, access_token)
+            self._entries[key] = _PoolEntry(client, now)
+            while len(self._entries) > self.max_clients:
+                self._entries.popitem(last=False)
+                self.evicted_lru += 1
+            return client
+
+    def _create(
+        self, as_user_id: Optional[str], access_token: Optional[str]
+    ) -> BoxClient:
+        if access_token:
+            client = BoxClient(
+                BoxDeveloperTokenAuth(access_token),
+                network_session=self.base_client.network_session,
+            )
+            if as_user_id:
+                client = client.with_as_user_header(as_user_id)
+            return client
+        return self.base_client.with_as_user_header(as_user_id)
+
+    def _evict_idle(self, now: float) -> None:
+        # Entries are in least-recently-used order, so stop at the first live one
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.last_used < self.idle_ttl:
+                break
+            del self._entries[key]
+            self.evicted_idle += 1
+
+    def evict_idle(self) -> None:
+        with self._lock:
+            self._evict_idle(self._clock())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._entries),
+            "max_clients": self.max_clients,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted_lru": self.evicted_lru,
+            "evicted_idle": self.evicted_idle,
+        }
@@ -0,0 +1,219 @@
+"""
+Cache invalidation driven by the Box events stream.
+
+Caches of Box data either serve stale entries or need TTLs short enough to
+waste most of their benefit. Instead a background thread long-polls the Box
+events stream and publishes the id of every changed file and folder to the
+caches subscribed to an InvalidationBus, so they can keep entries for hours
+and still drop them as soon as Box reports a change.
+
+The listener keeps its stream position across disconnects and resumes from
+it, so no change is missed while it reconnects. If Box no longer has events
+that old, subscribers are told to drop everything.
+"""
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+    from box_sdk_gen import BoxClient
+
+logger = logging.getLogger(__name__)
+
+# Item type and id published when every cached entry may be stale
+ALL = "*"
+# Item type published for the parent of a changed item: the folder's
+# listing changed, but not the folder itself or its other items
+FOLDER_ITEMS = "folder_items"
+EVENTS_PAGE_SIZE = 500
+
+Subscriber = Callable[[str, str], None]
+
+
+def event_item(source) -> Tuple[Optional[str], Optional[str]]:
+    """Type ("file", "folder", ...) and id of the item an event is about."""
+    if isinstance(source, dict):
+        return source.get("type"), source.get("id")
+    return getattr(source, "type", None), getattr(source, "id", None)
+
+
+def _parent_id(source) -> Optional[str]:
+    parent = source.get("parent") if isinstance(source, dict) else getattr(source, "parent", None)
+    return event_item(parent)[1] if parent else None
+
+
+class InvalidationBus:
+    """Fans out invalidations by item type and id to subscribed caches."""
+
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self.published = 0
+        self.failures = 0
+
+    def subscribe(self, callback: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def publish(self, item_type: str, item_id: str) -> None:
+        self.published += 1
+        for callback in list(self._subscribers):
+            try:
+                callback(item_type, item_id)
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Invalidating %s %s failed: %s", item_type, item_id, e)
+
+    def publish_all(self) -> None:
+        self.publish(ALL, ALL)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "failures": self.failures,
+        }
+
+
+class EventListener:
+    """
+    Daemon thread that long-polls the Box events stream and publishes the
+    changed items to an InvalidationBus.
+
+    Args:
+        client_provider: Returns the Box client; called on every poll so the
+            client can be created lazily.
+        retry_interval: Seconds before reconnecting after an error, doubled
+            on each consecutive error up to `max_backoff`.
+    """
+
+    def __init__(
+        self,
+        client_provider: Callable[[], "BoxClient"],
+        bus: InvalidationBus,
+        session: "Optional[requests.Session]" = None,
+        retry_interval: float = 5,
+        max_backoff: float = 300,
+    ):
+        self._client_provider = client_provider
+        self.bus = bus
+        # The long-poll URL carries its own credentials; a separate session
+        # keeps the hanging request out of the API connection pool.
+        if session is None:
+            # Imported here: the server imports this module at startup for
+            # InvalidationBus, and only needs requests once a listener runs.
+            import requests
+
+            session = requests.Session()
+        self._session = session
+        self.retry_interval = retry_interval
+        self.max_backoff = max_backoff
+        self.stream_position: Optional[str] = None
+        self._server = None
+        self._polls_left = 0
+        self.events = 0
+        self.reconnects = 0
+        self.resets = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="box-event-listener", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        consecutive_failures = 0
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                consecutive_failures = 0
+            except Exception as e:
+                self.failures += 1
+                consecutive_failures += 1
+                self._server = None
+                delay = min(self.retry_interval * 2 ** (consecutive_failures - 1), self.max_backoff)
+                logger.warning("Box event listener error, retrying in %ss: %s", delay, e)
+                self._stop.wait(delay)
+
+    def poll_once(self) -> None:
+        """Wait for the next change notification and publish what changed."""
+        from box_sdk_gen.managers.events import GetEventsStreamType
+
+        client = self._client_provider()
+        if self.stream_position is None:
+            events = client.events.get_events(
+                stream_type=GetEventsStreamType.CHANGES, stream_position="now"
+            )
+            self.stream_position = str(events.next_stream_position)
+
+        if self._server is None or self._polls_left <= 0:
+            self._server = client.events.get_events_with_long_polling().entries[0]
+            self._polls_left = int(self._server.max_retries or 10)
+            self.reconnects += 1
+        self._polls_left -= 1
+
+        # Box answers within retry_timeout seconds, with or without a change
+        read_timeout = int(self._server.retry_timeout or 610) + 30
+        response = self._session.get(
+            self._server.url,
+            params={"stream_position": self.stream_position},
+            timeout=(10, read_timeout),
+        )
+        response.raise_for_status()
+        message = response.json().get("message")
+        if message == "new_change":
+            self._drain(client)
+        elif message == "reconnect":
+            self._server = None
+
+    def _drain(self, client: "BoxClient") -> None:
+        from box_sdk_gen import BoxAPIError
+        from box_sdk_gen.managers.events import GetEventsStreamType
+
+        while True:
+            try:
+                events = client.events.get_events(
+                    stream_type=GetEventsStreamType.CHANGES,
+                    stream_position=self.stream_position,
+                    limit=EVENTS_PAGE_SIZE,
+                )
+            except BoxAPIError as e:
+                if e.response_info.status_code != 400:
+                    raise
+                # The position has expired; changes since then are unknown
+                logger.warning("Box event stream position expired, dropping cached data")
+                self.resets += 1
+                self.stream_position = None
+                self.bus.publish_all()
+                return
+            for event in events.entries or []:
+                item_type, item_id = event_item(event.source)
+                if item_type in ("file", "folder", "web_link") and item_id:
+                    self.bus.publish(item_type, item_id)
+                    # The parent's listing changed too
+                    parent_id = _parent_id(event.source)
+                    if parent_id:
+                        self.bus.publish(FOLDER_ITEMS, parent_id)
+            self.events += len(events.entries or [])
+            # Advanced per page, so a disconnect resumes after the last published page
+            self.stream_position = str(events.next_stream_position)
+            if not events.entries:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "stream_position": self.stream_position,
+            "events": self.events,
+            "reconnects": self.reconnects,
+            "resets": self.resets,
+            "failures": self.failures,
+        }
@@ -0,0 +1,390 @@
+"""
+Local text extraction when Box has no text representation (yet).
+
+box_read_tool reads the text Box extracts from a file. For a file uploaded a
+moment ago, or of an unusual type, Box can take a long time to produce that
+text or never produce it, and the read stalls or comes back empty. When
+that happens the original file is downloaded and parsed locally: Office
+Open XML documents (docx, pptx, xlsx) with the standard library, PDFs with
+pypdf (the `extraction` extra), plain text as is.
+
+Parsing runs in a small process pool, so a large document neither blocks
+the event loop nor holds the GIL the other tool calls need. Box and local
+extraction race once the fallback starts; the first non-empty text wins.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, BinaryIO, Callable, Dict, List, Optional
+from xml.etree import ElementTree
+
+if TYPE_CHECKING:
+    from box_sdk_gen import BoxClient
+
+logger = logging.getLogger(__name__)
+
+PLAIN_TEXT_EXTENSIONS = (
+    "txt", "md", "csv", "tsv", "json", "xml", "html", "htm", "log", "yaml", "yml", "ini", "rtf",
+)
+# Largest uncompressed part of an Office document that is parsed
+MAX_PART_BYTES = 200 * 1024 * 1024
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_S = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+class UnsupportedFile(Exception):
+    """Raised for files that cannot be extracted locally."""
+
+
+def _part(archive: zipfile.ZipFile, name: str) -> ElementTree.Element:
+    info = archive.getinfo(name)
+    if info.file_size > MAX_PART_BYTES:
+        raise UnsupportedFile(f"{name} is too large to parse")
+    return ElementTree.fromstring(archive.read(info))
+
+
+def _numbered(names: List[str], pattern: str) -> List[str]:
+    """Parts like ppt/slides/slide12.xml, in numeric order."""
+    numbered = []
+    for name in names:
+        match = re.fullmatch(pattern, name)
+        if match:
+            numbered.append((int(match.group(1)), name))
+    return [name for _, name in sorted(numbered)]
+
+
+def _docx_text(archive: zipfile.ZipFile) -> str:
+    paragraphs = []
+    for paragraph in _part(archive, "word/document.xml").iter(f"{_W}p"):
+        pieces = []
+        for node in paragraph.iter():
+            if node.tag == f"{_W}t":
+                pieces.append(node.text or "")
+            elif node.tag == f"{_W}tab":
+                pieces.append("\t")
+            elif node.tag in (f"{_W}br", f"{_W}cr"):
+                pieces.append("\n")
+        paragraphs.append("".join(pieces))
+    return "\n".join(paragraphs)
+
+
+def _pptx_text(archive: zipfile.ZipFile) -> str:
+    slides = []
+    for number, name in enumerate(
+        _numbered(archive.namelist(), r"ppt/slides/slide(\d+)\.xml"), start=1
+    ):
+        paragraphs = [
+            "".join(node.text or "" for node in paragraph.iter(f"{_A}t"))
+            for paragraph in _part(archive, name).iter(f"{_A}p")
+        ]
+        slides.append(f"Slide {number}\n" + "\n".join(p for p in paragraphs if p))
+    return "\n\n".join(slides)
+
+
+def _xlsx_text(archive: zipfile.ZipFile) -> str:
+    names = archive.namelist()
+    shared = []
+    if "xl/sharedStrings.xml" in names:
+        shared = [
+            "".join(node.text or "" for node in item.iter(f"{_S}t"))
+            for item in _part(archive, "xl/sharedStrings.xml").iter(f"{_S}si")
+        ]
+    targets = {
+        rel.get("Id"): "xl/" + rel.get("Target", "").lstrip("/").removeprefix("xl/")
+        for rel in _part(archive, "xl/_rels/workbook.xml.rels").iter(f"{_REL}Relationship")
+    }
+    sheets = []
+    for sheet in _part(archive, "xl/workbook.xml").iter(f"{_S}sheet"):
+        path = targets.get(sheet.get(f"{_R}id"))
+        if path not in names:
+            continue
+        rows = []
+        for row in _part(archive, path).iter(f"{_S}row"):
+            cells = []
+            for cell in row.iter(f"{_S}c"):
+                kind = cell.get("t")
+                if kind == "inlineStr":
+                    cells.append("".join(t.text or "" for t in cell.iter(f"{_S}t")))
+                    continue
+                value = cell.findtext(f"{_S}v") or ""
+                if kind == "s" and value.isdigit() and int(value) < len(shared):
+                    value = shared[int(value)]
+                cells.append(value)
+            rows.append("\t".join(cells))
+        sheets.append(f"# {sheet.get('name')}\n" + "\n".join(rows))
+    return "\n\n".join(sheets)
+
+
+def _pdf_text(path: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise UnsupportedFile("PDF extraction needs pypdf, install the `extraction` extra")
+    reader = PdfReader(path)
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+_OFFICE = {"docx": _docx_text, "pptx": _pptx_text, "xlsx": _xlsx_text}
+
+
+def extension_of(name: str) -> str:
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def supports(name: str) -> bool:
+    extension = extension_of(name)
+    return extension == "pdf" or extension in _OFFICE or extension in PLAIN_TEXT_EXTENSIONS
+
+
+def extract_file(path: str, extension: str) -> str:
+    """Text of a local file; runs in a worker process."""
+    if extension == "pdf":
+        return _pdf_text(path)
+    if extension in _OFFICE:
+        try:
+            with zipfile.ZipFile(path) as archive:
+                return _OFFICE[extension](archive)
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+            raise UnsupportedFile(f"Not a valid {extension} file: {e}")
+    if extension in PLAIN_TEXT_EXTENSIONS:
+        with open(path, "rb") as f:
+            return f.read().decode("utf-8", errors="replace")
+    raise UnsupportedFile(f"Cannot extract text from .{extension} files locally")
+
+
+@dataclass
+class Extraction:
+    text: str
+    # "box" or "local"
+    source: str
+    seconds: float
+    # Why local extraction was started: "slow", "failed" or "empty"
+    fallback: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "seconds": round(self.seconds, 3),
+            "fallback": self.fallback,
+            "characters": len(self.text),
+        }
+
+
+Runner = Callable[..., Awaitable[Any]]
+
+
+async def _in_thread(endpoint: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+def _download_into(client: "BoxClient", file_id: str, target: BinaryIO) -> None:
+    stream = client.downloads.download_file(file_id)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+        # Raises ValueError, ending the download, once the caller has given
+        # up and closed the file
+        target.write(chunk)
+
+
+def _stop(executor: ProcessPoolExecutor) -> None:
+    """Stop a pool, terminating workers still busy with a parse."""
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+class TextExtractor:
+    """
+    Box text extraction with a local fallback in a process pool.
+
+    Args:
+        fallback_after: Seconds to wait for Box before also extracting locally.
+        timeout: Seconds a local parse may take.
+        max_bytes: Larger files are not extracted locally.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        fallback_after: float = 10.0,
+        max_workers: int = 2,
+        timeout: float = 60.0,
+        max_bytes: int = 50 * 1024 * 1024,
+    ):
+        self.enabled = enabled
+        self.fallback_after = fallback_after
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Parses awaited per pool, and pools taken out of use after a parse
+        # timed out, which are stopped once their other parses are done
+        self._parses: Dict[ProcessPoolExecutor, int] = {}
+        self._retired: List[ProcessPoolExecutor] = []
+        self.timeouts = 0
+        self.by_source: Dict[str, int] = {"box": 0, "local": 0}
+        self.seconds_by_source: Dict[str, float] = {"box": 0.0, "local": 0.0}
+        self.fallbacks: Dict[str, int] = {"slow": 0, "failed": 0, "empty": 0}
+        self.local_failures = 0
+
+    @classmethod
+    def from_env(cls) -> "TextExtractor":
+        return cls(
+            enabled=os.getenv("BOX_LOCAL_EXTRACT", "1").lower() in ("1", "true", "yes"),
+            fallback_after=float(os.getenv("BOX_LOCAL_EXTRACT_AFTER", "10")),
+            max_workers=int(os.getenv("BOX_LOCAL_EXTRACT_WORKERS", "2")),
+            timeout=float(os.getenv("BOX_LOCAL_EXTRACT_TIMEOUT", "60")),
+            max_bytes=int(os.getenv("BOX_LOCAL_EXTRACT_MAX_MB", "50")) * 1024 * 1024,
+        )
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process with running threads can deadlock the child;
+            # the fork server only preloads this module, not the server.
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+        return self._executor
+
+    def _retire(self, executor: ProcessPoolExecutor) -> None:
+        """
+        Take a pool with a stuck worker out of use. Terminating one worker
+        breaks the whole pool, failing the parses of other calls, so new
+        parses go to a new pool and this one is stopped once it is idle.
+        """
+        if self._executor is executor:
+            self._executor = None
+        if executor not in self._retired:
+            self._retired.append(executor)
+
+    def shutdown(self) -> None:
+        """Stop the workers, including those stuck in a parse that timed out."""
+        executor, self._executor = self._executor, None
+        retired, self._retired = self._retired, []
+        for pool in ([executor] if executor is not None else []) + retired:
+            _stop(pool)
+
+    async def extract_local(
+        self, client: "BoxClient", file_id: str, run: Optional[Runner] = None
+    ) -> str:
+        """
+        Download a file and extract its text in the process pool. Box calls
+        go through `run(endpoint, func, *args, **kwargs)` when given.
+        """
+        run = run or _in_thread
+        info = await run("file_info", client.files.get_file_by_id, file_id, fields=["name", "size"])
+        if not supports(info.name):
+            raise UnsupportedFile(f"Cannot extract text from {info.name} locally")
+        if (info.size or 0) > self.max_bytes:
+            raise UnsupportedFile(f"{info.name} is too large to extract locally")
+        extension = extension_of(info.name)
+        # Created and removed here rather than by the download thread, which
+        # keeps running when this task is cancelled (Box answered first) or
+        # the download is abandoned at its deadline
+        target = tempfile.NamedTemporaryFile(suffix="." + extension, delete=False)
+        try:
+            await run("download", _download_into, client, file_id, target)
+            target.close()
+            executor = self._pool()
+            self._parses[executor] = self._parses.get(executor, 0) + 1
+            try:
+                future = asyncio.get_running_loop().run_in_executor(
+                    executor, extract_file, target.name, extension
+                )
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self._retire(executor)
+                raise UnsupportedFile(f"Parsing {info.name} took longer than {self.timeout:.0f}s")
+            finally:
+                self._parses[executor] -= 1
+                if not self._parses[executor]:
+                    del self._parses[executor]
+                    if executor in self._retired:
+                        self._retired.remove(executor)
+                        _stop(executor)
+        finally:
+            target.close()
+            os.unlink(target.name)
+
+    async def extract(
+        self,
+        client: "BoxClient",
+        file_id: str,
+        from_box: Callable[[], Awaitable[str]],
+        run: Optional[Runner] = None,
+    ) -> Extraction:
+        """
+        Text of a file from `from_box`, falling back to local extraction when
+        Box is slow, fails or has no text.
+        """
+        started = time.monotonic()
+        box = asyncio.ensure_future(from_box())
+        tasks = {box: "box"}
+        fallback = None
+        if self.enabled:
+            await asyncio.wait({box}, timeout=self.fallback_after)
+            if not box.done():
+                fallback = "slow"
+            elif box.exception() is not None:
+                fallback = "failed"
+            elif not box.result():
+                fallback = "empty"
+            if fallback:
+                self.fallbacks[fallback] += 1
+                tasks[asyncio.ensure_future(self.extract_local(client, file_id, run))] = "local"
+
+        errors: Dict[str, BaseException] = {}
+        empty: Optional[str] = None
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    source = tasks.pop(task)
+                    if task.exception() is not None:
+                        errors[source] = task.exception()
+                        if source == "local":
+                            self.local_failures += 1
+                            logger.info("Local extraction of %s failed: %s", file_id, task.exception())
+                    elif task.result():
+                        return self._done(task.result(), source, started, fallback)
+                    elif empty is None:
+                        empty = source
+            if empty is not None:
+                return self._done("", empty, started, fallback)
+            raise errors.get("box") or errors["local"]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _done(self, text: str, source: str, started: float, fallback: Optional[str]) -> Extraction:
+        seconds = time.monotonic() - started
+        self.by_source[source] += 1
+        self.seconds_by_source[source] += seconds
+        return Extraction(text, source, seconds, fallback)
+
+    def stats(self) -> dict:
+        return {
+            "by_source": dict(self.by_source),
+            "mean_seconds": {
+                source: round(self.seconds_by_source[source] / count, 3)
+                for source, count in self.by_source.items()
+                if count
+            },
+            "fallbacks": dict(self.fallbacks),
+            "local_failures": self.local_failures,
+            "timeouts": self.timeouts,
+            "pool_running": self._executor is not None,
+            "pools_retired": len(self._retired),
+        }
@@ -0,0 +1,307 @@
+"""
+Batches of folder create, update and delete operations.
+
+Setting up a project skeleton or cleaning up dozens of folders one tool call
+at a time costs an agent turn per folder. A batch runs a list of operations
+in one call: operations that do not touch the same folder run concurrently,
+the others in list order, and a folder created earlier in the batch can be
+referred to by later operations before its id is known.
+
+Requests are spread out by a token bucket so a large batch stays within the
+Box API rate limits. Recursive deletes are split into one delete per
+subfolder, so a large tree reports progress as it goes, and a cancelled
+batch stops before its next request.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set
+
+from box_cancel import CancelToken, OperationCancelled
+
+if TYPE_CHECKING:
+    from box_sdk_gen import BoxClient
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("create", "update", "delete")
+REF_PREFIX = "$"
+MAX_OPERATIONS = 500
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests per second in bursts of `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel: Optional[CancelToken] = None) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if cancel is not None:
+                cancel.sleep(wait)
+            else:
+                time.sleep(wait)
+
+
+@dataclass
+class FolderOperation:
+    index: int
+    action: str
+    folder_id: Optional[str] = None
+    name: Optional[str] = None
+    parent_id: Optional[str] = None
+    description: Optional[str] = None
+    recursive: bool = False
+    # Name later operations use ("$name") to refer to the folder this one creates
+    ref: Optional[str] = None
+    depends_on: Set[int] = field(default_factory=set)
+
+
+def _id(value) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+def parse_operations(raw: List[dict]) -> List[FolderOperation]:
+    """Validate a batch and work out which operations must wait for which."""
+    if not raw:
+        raise ValueError("operations must not be empty")
+    if len(raw) > MAX_OPERATIONS:
+        raise ValueError(f"A batch can have at most {MAX_OPERATIONS} operations")
+
+    operations = []
+    refs: Dict[str, int] = {}
+    for index, spec in enumerate(raw):
+        action = str(spec.get("action", "")).lower()
+        op = FolderOperation(
+            index=index,
+            action=action,
+            folder_id=_id(spec.get("folder_id")),
+            name=spec.get("name") or None,
+            parent_id=_id(spec.get("parent_id")),
+            description=spec.get("description") or None,
+            recursive=bool(spec.get("recursive", False)),
+            ref=spec.get("ref") or None,
+        )
+        if action not in ACTIONS:
+            raise ValueError(f"Operation {index}: action must be one of {', '.join(ACTIONS)}")
+        if action == "create" and not op.name:
+            raise ValueError(f"Operation {index}: name is required for create")
+        if action != "create" and not op.folder_id:
+            raise ValueError(f"Operation {index}: folder_id is required for {action}")
+        for value in (op.folder_id, op.parent_id):
+            if value and value.startswith(REF_PREFIX) and value[1:] not in refs:
+                raise ValueError(f"Operation {index}: {value} does not name an earlier create")
+        if op.ref:
+            if action != "create" or op.ref in refs:
+                raise ValueError(f"Operation {index}: ref must be unique and on a create")
+            refs[op.ref] = index
+        operations.append(op)
+
+    # Readers-writer ordering per folder: creating in or moving into a folder
+    # reads it, updating or deleting it writes it.
+    last_writer: Dict[str, int] = {}
+    readers: Dict[str, List[int]] = {}
+
+    def read(op: FolderOperation, key: Optional[str]) -> None:
+        if key:
+            if key in last_writer:
+                op.depends_on.add(last_writer[key])
+            readers.setdefault(key, []).append(op.index)
+
+    def write(op: FolderOperation, key: Optional[str]) -> None:
+        if key:
+            if key in last_writer:
+                op.depends_on.add(last_writer[key])
+            op.depends_on.update(i for i in readers.pop(key, []) if i != op.index)
+            last_writer[key] = op.index
+
+    for op in operations:
+        if op.action == "create":
+            read(op, op.parent_id or "0")
+            if op.ref:
+                write(op, REF_PREFIX + op.ref)
+        else:
+            read(op, op.parent_id)
+            write(op, op.folder_id)
+    return operations
+
+
+def _child_folders(
+    client: "BoxClient", folder_id: str, limiter: RateLimiter, cancel: CancelToken
+) -> List[str]:
+    ids, marker = [], None
+    while True:
+        cancel.check()
+        limiter.acquire(cancel)
+        items = client.folders.get_folder_items(
+            folder_id, fields=["id", "type"], usemarker=True, marker=marker, limit=1000
+        )
+        ids += [entry.id for entry in items.entries or [] if entry.type == "folder"]
+        marker = items.next_marker
+        if not marker:
+            return ids
+
+
+class _Batch:
+    def __init__(
+        self,
+        client: "BoxClient",
+        operations: List[FolderOperation],
+        max_concurrency: int,
+        limiter: RateLimiter,
+        progress: Optional[ProgressCallback],
+        cancel: CancelToken,
+    ):
+        self.client = client
+        self.operations = operations
+        self.max_concurrency = max_concurrency
+        self.limiter = limiter
+        self.progress = progress
+        self.cancel = cancel
+        self.created: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = len(operations)
+
+    def _advance(self, done: int = 0, total: int = 0) -> None:
+        with self._lock:
+            self._done += done
+            self._total += total
+            done, total = self._done, self._total
+        if self.progress:
+            self.progress(done, total)
+
+    def _resolve(self, value: Optional[str]) -> Optional[str]:
+        if value and value.startswith(REF_PREFIX):
+            return self.created[value[1:]]
+        return value
+
+    def _delete_tree(self, folder_id: str) -> int:
+        """Delete a folder and everything in it, one subfolder at a time."""
+        children = _child_folders(self.client, folder_id, self.limiter, self.cancel)
+        self._advance(total=len(children))
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            list(pool.map(self._delete_child, children))
+        self._acquire()
+        self.client.folders.delete_folder_by_id(folder_id, recursive=True)
+        return len(children)
+
+    def _acquire(self) -> None:
+        """Wait for the rate limiter, unless the batch was cancelled."""
+        self.cancel.check()
+        self.limiter.acquire(self.cancel)
+
+    def _delete_child(self, folder_id: str) -> None:
+        self._acquire()
+        self.client.folders.delete_folder_by_id(folder_id, recursive=True)
+        self._advance(done=1)
+
+    def run_one(self, op: FolderOperation, dependencies: List[Future]) -> dict:
+        from box_sdk_gen import CreateFolderParent
+        from box_sdk_gen.managers.folders import UpdateFolderByIdParent
+
+        # Operations of a cancelled batch are dropped before they start
+        self.cancel.check()
+        result = {"index": op.index, "action": op.action, "status": "done"}
+        failed = [f.result()["index"] for f in dependencies if f.result()["status"] != "done"]
+        try:
+            if failed:
+                result["status"] = "skipped"
+                result["error"] = f"Depends on operation {failed[0]}, which did not complete"
+                return result
+            folder_id, parent_id = self._resolve(op.folder_id), self._resolve(op.parent_id)
+            if op.action == "create":
+                self._acquire()
+                folder = self.client.folders.create_folder(
+                    op.name, CreateFolderParent(id=parent_id or "0")
+                )
+                if op.ref:
+                    self.created[op.ref] = folder.id
+                result.update(folder_id=folder.id, name=folder.name)
+            elif op.action == "update":
+                self._acquire()
+                folder = self.client.folders.update_folder_by_id(
+                    folder_id,
+                    name=op.name,
+                    description=op.description,
+                    parent=UpdateFolderByIdParent(id=parent_id) if parent_id else None,
+                )
+                result.update(folder_id=folder.id, name=folder.name)
+            elif op.recursive:
+                result.update(folder_id=folder_id, subfolders=self._delete_tree(folder_id))
+            else:
+                self._acquire()
+                self.client.folders.delete_folder_by_id(folder_id, recursive=False)
+                result["folder_id"] = folder_id
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+        finally:
+            self._advance(done=1)
+        return result
+
+    def run(self) -> List[dict]:
+        futures: Dict[int, Future] = {}
+        # Dependencies always come earlier in the list and the pool starts
+        # work in submission order, so a waiting operation never blocks the
+        # operations it waits for.
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            for op in self.operations:
+                dependencies = [futures[i] for i in sorted(op.depends_on)]
+                futures[op.index] = pool.submit(self.run_one, op, dependencies)
+        return [futures[op.index].result() for op in self.operations]
+
+
+def run_folder_operations(
+    client: "BoxClient",
+    raw_operations: List[dict],
+    max_concurrency: int = 4,
+    rate: float = 10.0,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[CancelToken] = None,
+) -> dict:
+    """
+    Run a batch of folder operations.
+
+    Each operation is a dict with an `action` ("create", "update" or
+    "delete") and the fields of box_manage_folder_tool. A create may set
+    `ref`, and later operations can use "$<ref>" as a folder_id or
+    parent_id.
+
+    Args:
+        rate: Box API requests per second for the whole batch.
+        progress: Called with (completed, total) units of work.
+        cancel: Stops the batch, raising OperationCancelled, when cancelled.
+    """
+    started = time.monotonic()
+    operations = parse_operations(raw_operations)
+    limiter = RateLimiter(rate, burst=max(1, int(rate)))
+    results = _Batch(
+        client, operations, max_concurrency, limiter, progress, cancel or CancelToken()
+    ).run()
+
+    summary: dict = {"operations": len(results)}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    summary["seconds"] = round(time.monotonic() - started, 3)
+    return {"summary": summary, "results": results}
@@ -0,0 +1,181 @@
+"""
+Structured logging that stays off the request path.
+
+The stdio transport owns stdout, so records go to stderr, or to the file
+named by BOX_LOG_FILE, and never to stdout. Tool calls only put records on
+a bounded queue; a background thread formats and writes them, and records
+are dropped (and counted) rather than blocking a call when it falls behind.
+Messages use %-style arguments, formatted on that thread and only for
+records that pass the level.
+
+Each tool call can end with one record carrying its tool name, duration,
+status and the ids of the Box API requests it made (the box-request-id
+header, which Box support asks for). Successful calls are sampled at
+BOX_LOG_SAMPLE; failed and slow calls are always logged.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Loggers of the libraries the server uses, kept at BOX_LOG_LIBRARY_LEVEL
+LIBRARY_LOGGERS = (
+    "mcp", "httpx", "httpcore", "urllib3", "requests", "box_sdk_gen", "anyio", "uvicorn",
+)
+
+# Attributes of every LogRecord; the others were passed as structured fields
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_request_ids: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar(
+    "box_request_ids", default=None
+)
+
+_sample_rate = 1.0
+_slow_after = 10.0
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the structured fields of the record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue as they are, leaving their formatting to the
+    listener thread, and drops them when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging() -> None:
+    """
+    Send every log record through a background queue to stderr or a file.
+
+    BOX_LOG_LEVEL (default WARNING) is the level of the server's loggers and
+    BOX_LOG_LIBRARY_LEVEL (default WARNING) that of the libraries it uses.
+    BOX_LOG_FILE writes to a file instead of stderr, BOX_LOG_FORMAT is json
+    (default) or text, and BOX_LOG_SAMPLE (default 1.0) is the share of
+    successful tool calls logged. Calls slower than BOX_LOG_SLOW_SECONDS
+    (default 10) are logged as warnings.
+    """
+    global _listener, _sample_rate, _slow_after
+    if _listener is not None:
+        return
+    level = logging.getLevelName(os.getenv("BOX_LOG_LEVEL", "WARNING").upper())
+    library_level = logging.getLevelName(os.getenv("BOX_LOG_LIBRARY_LEVEL", "WARNING").upper())
+    _sample_rate = min(max(float(os.getenv("BOX_LOG_SAMPLE", "1.0")), 0.0), 1.0)
+    _slow_after = float(os.getenv("BOX_LOG_SLOW_SECONDS", "10"))
+
+    path = os.getenv("BOX_LOG_FILE")
+    if path:
+        output: logging.Handler = logging.handlers.WatchedFileHandler(os.path.expanduser(path))
+    else:
+        output = logging.StreamHandler(sys.stderr)
+    if os.getenv("BOX_LOG_FORMAT", "json").lower() == "text":
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    handler = _QueueHandler(queue.Queue(int(os.getenv("BOX_LOG_QUEUE", "10000"))))
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    for name in LIBRARY_LOGGERS:
+        logging.getLogger(name).setLevel(library_level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full."""
+    return sum(getattr(h, "dropped", 0) for h in logging.getLogger().handlers)
+
+
+def note_request_id(request_id: Optional[str]) -> None:
+    """Attach the id of a Box API request to the tool call making it, if logged."""
+    ids = _request_ids.get()
+    if ids is not None and request_id:
+        ids.append(request_id)
+
+
+@asynccontextmanager
+async def tool_call(tool: str) -> AsyncIterator[dict]:
+    """
+    Log the outcome of a tool call. The caller sets "error" in the yielded
+    dict when the call failed without raising.
+    """
+    if not logger.isEnabledFor(logging.WARNING):
+        yield {}
+        return
+    outcome: dict = {}
+    ids: List[str] = []
+    token = _request_ids.set(ids)
+    started = time.monotonic()
+    status = "ok"
+    try:
+        yield outcome
+        if outcome.get("error"):
+            status = "error"
+    except Exception as e:
+        status, outcome["error"] = "error", str(e)
+        raise
+    except BaseException:
+        status = "cancelled"
+        raise
+    finally:
+        _request_ids.reset(token)
+        seconds = time.monotonic() - started
+        fields: Any = {
+            "tool": tool,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 1),
+            "box_request_ids": list(ids),
+        }
+        if status != "ok":
+            fields["error"] = str(outcome.get("error", ""))[:500]
+            logger.warning("Tool %s %s after %.0f ms", tool, status, seconds * 1000, extra=fields)
+        elif seconds >= _slow_after:
+            logger.warning("Tool %s slow: %.0f ms", tool, seconds * 1000, extra=fields)
+        elif logger.isEnabledFor(logging.INFO) and random.random() < _sample_rate:
+            logger.info("Tool %s ok in %.0f ms", tool, seconds * 1000, extra=fields)
@@ -0,0 +1,162 @@
+"""
+Memory budget for transfer buffers, and allocation peaks per tool call.
+
+A download returned inline is held as raw bytes, as decoded text and inside
+the response, and an upload part is buffered whole before it is sent. A few
+large files at once can use more memory than the container has. Transfer
+code reserves bytes from a process-wide ByteBudget before buffering; when
+the budget is exhausted it streams from or spills to disk instead, or
+returns a smaller window.
+
+With BOX_TRACEMALLOC=1, the peak Python allocation during each tool call is
+recorded per tool, to find calls whose memory use regressed. Peaks are
+process-wide: a call that overlapped another is counted as such.
+"""
+
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Reservation:
+    """Bytes held from a ByteBudget until released."""
+
+    def __init__(self, budget: "ByteBudget", nbytes: int):
+        self._budget = budget
+        self.nbytes = nbytes
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._budget._release(self.nbytes)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class ByteBudget:
+    """Bytes that transfer buffers may hold at once, across all tool calls."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.reserved = 0
+        self.peak = 0
+        self.granted = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ByteBudget":
+        return cls(int(os.getenv("BOX_MEMORY_BUDGET_MB", "256")) * 1024 * 1024)
+
+    def available(self) -> int:
+        with self._lock:
+            return max(0, self.limit - self.reserved)
+
+    def try_reserve(self, nbytes: int) -> Optional[Reservation]:
+        """A reservation of `nbytes`, or None when the budget cannot hold them now."""
+        with self._lock:
+            if self.reserved + nbytes > self.limit:
+                self.refused += 1
+                return None
+            self.reserved += nbytes
+            self.peak = max(self.peak, self.reserved)
+            self.granted += 1
+        return Reservation(self, nbytes)
+
+    def _release(self, nbytes: int) -> None:
+        with self._lock:
+            self.reserved -= nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit_bytes": self.limit,
+                "reserved_bytes": self.reserved,
+                "peak_reserved_bytes": self.peak,
+                "granted": self.granted,
+                "refused": self.refused,
+            }
+
+
+class _ToolPeaks:
+    def __init__(self):
+        self.calls = 0
+        self.overlapped = 0
+        self.max_peak = 0
+        self.last_peak = 0
+        self.total_peak = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "overlapped_calls": self.overlapped,
+            "max_peak_bytes": self.max_peak,
+            "last_peak_bytes": self.last_peak,
+            "mean_peak_bytes": self.total_peak // self.calls if self.calls else 0,
+        }
+
+
+class AllocationTracker:
+    """Peak traced allocation above the starting level, per tool."""
+
+    def __init__(self, enabled: bool = False, frames: int = 1):
+        self.enabled = enabled
+        self.frames = frames
+        self._tools: Dict[str, _ToolPeaks] = {}
+        self._active = 0
+        self._started = 0
+
+    @classmethod
+    def from_env(cls) -> "AllocationTracker":
+        return cls(enabled=os.getenv("BOX_TRACEMALLOC", "").lower() in ("1", "true", "yes"))
+
+    @asynccontextmanager
+    async def track(self, tool: str) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        if self._active == 0:
+            tracemalloc.reset_peak()
+        overlapped = self._active > 0
+        self._active += 1
+        self._started += 1
+        started = self._started
+        start, _ = tracemalloc.get_traced_memory()
+        began = time.monotonic()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            self._active -= 1
+            overlapped = overlapped or self._active > 0 or self._started != started
+            peaks = self._tools.setdefault(tool, _ToolPeaks())
+            used = max(0, peak - start)
+            peaks.calls += 1
+            peaks.overlapped += overlapped
+            peaks.last_peak = used
+            peaks.total_peak += used
+            if used > peaks.max_peak:
+                peaks.max_peak = used
+                logger.info(
+                    "New allocation peak for %s: %d bytes in %.1fs",
+                    tool, used, time.monotonic() - began,
+                )
+
+    def stats(self) -> dict:
+        stats: dict = {"enabled": self.enabled}
+        if self.enabled:
+            stats["tools"] = {tool: peaks.to_dict() for tool, peaks in self._tools.items()}
+        return stats
@@ -0,0 +1,302 @@
+"""
+Tunable network layer for the server's Box client.
+
+By default the Box SDK sends every call through a plain requests.Session: a
+connection pool of 10, no timeouts and no visibility into connection reuse.
+Under concurrent tool calls that means connections are opened and discarded
+(each with a TLS handshake) and a stalled download can hold a worker forever.
+
+This module builds a NetworkSession whose connection pool is sized for the
+server's concurrency, keeps idle connections alive, applies timeouts per
+request category (metadata, content transfer, Box AI) and counts pool usage.
+With BOX_HTTP2=1 and httpx[http2] installed, requests are multiplexed over
+HTTP/2 so concurrent calls share one connection per host.
+"""
+
+import logging
+import os
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.connection import HTTPConnection
+
+from box_sdk_gen import BoxNetworkClient, NetworkSession
+
+from box_logging import note_request_id
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("metadata", "content", "ai")
+
+
+@dataclass
+class HttpConfig:
+    """
+    Connection pool and timeout settings, see `from_env` for the variables.
+
+    Timeouts are read timeouts in seconds (time between bytes, not total
+    time); `connect_timeout` applies to every category.
+    """
+
+    pool_connections: int = 4
+    pool_maxsize: int = 64
+    pool_block: bool = False
+    keepalive_idle: int = 60
+    http2: bool = False
+    connect_timeout: float = 10.0
+    metadata_timeout: float = 30.0
+    content_timeout: float = 300.0
+    ai_timeout: float = 180.0
+
+    @classmethod
+    def from_env(cls) -> "HttpConfig":
+        def number(name: str, default: float) -> float:
+            value = os.getenv(name)
+            return float(value) if value else default
+
+        return cls(
+            pool_connections=int(number("BOX_HTTP_POOL_HOSTS", cls.pool_connections)),
+            pool_maxsize=int(number("BOX_HTTP_POOL_SIZE", cls.pool_maxsize)),
+            pool_block=os.getenv("BOX_HTTP_POOL_BLOCK", "0").lower() in ("1", "true", "yes"),
+            keepalive_idle=int(number("BOX_HTTP_KEEPALIVE", cls.keepalive_idle)),
+            http2=os.getenv("BOX_HTTP2", "0").lower() in ("1", "true", "yes"),
+            connect_timeout=number("BOX_HTTP_CONNECT_TIMEOUT", cls.connect_timeout),
+            metadata_timeout=number("BOX_HTTP_TIMEOUT_METADATA", cls.metadata_timeout),
+            content_timeout=number("BOX_HTTP_TIMEOUT_CONTENT", cls.content_timeout),
+            ai_timeout=number("BOX_HTTP_TIMEOUT_AI", cls.ai_timeout),
+        )
+
+    def timeout_for(self, category: str) -> Tuple[float, float]:
+        read_timeout = {
+            "metadata": self.metadata_timeout,
+            "content": self.content_timeout,
+            "ai": self.ai_timeout,
+        }[category]
+        return (self.connect_timeout, read_timeout)
+
+
+def request_category(url: str) -> str:
+    """Classify a Box API URL as "metadata", "content" or "ai"."""
+    parts = urlsplit(url)
+    path = parts.path
+    if "/ai/" in path or path.endswith("/ai"):
+        return "ai"
+    if (
+        parts.netloc.startswith(("upload.", "dl.", "public.", "dl2."))
+        or path.endswith("/content")
+        or "/content/" in path
+        or "/representations" in path
+        or "/upload_sessions" in path
+        or "/zip_downloads" in path
+    ):
+        return "content"
+    return "metadata"
+
+
+def _keepalive_socket_options(idle: int) -> list:
+    """TCP keep-alive so idle pooled connections survive NAT and LB timeouts."""
+    options = list(HTTPConnection.default_socket_options)
+    if idle <= 0:
+        return options
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    for name, value in (("TCP_KEEPIDLE", idle), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class _PooledHTTPAdapter(HTTPAdapter):
+    def __init__(self, config: HttpConfig):
+        self._socket_options = _keepalive_socket_options(config.keepalive_idle)
+        super().__init__(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+            pool_block=config.pool_block,
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self._socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def stats(self) -> dict:
+        opened = requests_sent = idle = 0
+        pools = self.poolmanager.pools
+        with pools.lock:
+            connection_pools = list(pools._container.values())
+        for pool in connection_pools:
+            opened += pool.num_connections
+            requests_sent += pool.num_requests
+            if pool.pool is not None:
+                # The queue is pre-filled with None placeholders for unopened slots
+                idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        return {
+            "protocol": "http/1.1",
+            "hosts": len(connection_pools),
+            "connections_opened": opened,
+            "requests": requests_sent,
+            "idle_connections": idle,
+        }
+
+
+class _HttpxRaw:
+    """Just enough of urllib3's response interface for requests.Response."""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks: Iterator[bytes] = response.iter_bytes()
+        self._buffer = b""
+
+    def read(self, amt: Optional[int] = None, **kwargs) -> bytes:
+        while amt is None or len(self._buffer) < amt:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        if not data:
+            self.close()
+        return data
+
+    def close(self) -> None:
+        self._response.close()
+
+    def release_conn(self) -> None:
+        self.close()
+
+
+class _Http2Adapter(BaseAdapter):
+    """requests transport adapter that sends requests through httpx."""
+
+    def __init__(self, config: HttpConfig):
+        import httpx
+
+        super().__init__()
+        self._httpx = httpx
+        self._client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=config.pool_maxsize,
+                max_keepalive_connections=config.pool_maxsize,
+                keepalive_expiry=config.keepalive_idle or None,
+            ),
+        )
+        self._lock = threading.Lock()
+        self._by_version: Dict[str, int] = {}
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = self._httpx.Timeout(read, connect=connect)
+        body = request.body
+        if body is not None and hasattr(body, "read"):
+            # File and multipart bodies are streamed rather than read into memory
+            reader = body
+            body = iter(lambda: reader.read(65536), b"")
+        try:
+            response = self._client.send(
+                self._client.build_request(
+                    request.method,
+                    request.url,
+                    headers=dict(request.headers),
+                    content=body,
+                    timeout=timeout,
+                ),
+                stream=True,
+                follow_redirects=False,
+            )
+        except self._httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request)
+        except self._httpx.HTTPError as e:
+            raise requests.ConnectionError(e, request=request)
+
+        with self._lock:
+            self._by_version[response.http_version] = (
+                self._by_version.get(response.http_version, 0) + 1
+            )
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.headers = CaseInsensitiveDict(response.headers)
+        result.encoding = get_encoding_from_headers(result.headers)
+        result.raw = _HttpxRaw(response)
+        result.reason = response.reason_phrase
+        result.url = request.url
+        result.request = request
+        result.connection = self
+        if not stream:
+            result.content
+        return result
+
+    def close(self) -> None:
+        self._client.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_version = dict(self._by_version)
+        return {
+            "protocol": "h2",
+            "requests": sum(by_version.values()),
+            "requests_by_version": by_version,
+        }
+
+
+class _TimeoutSession(requests.Session):
+    """Session that applies the category timeout to requests without one."""
+
+    def __init__(self, config: HttpConfig):
+        super().__init__()
+        self.config = config
+        self.requests_by_category = dict.fromkeys(CATEGORIES, 0)
+        self._lock = threading.Lock()
+
+    def request(self, method, url, *args, **kwargs):
+        category = request_category(url)
+        with self._lock:
+            self.requests_by_category[category] += 1
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.config.timeout_for(category)
+        response = super().request(method, url, *args, **kwargs)
+        note_request_id(response.headers.get("box-request-id"))
+        return response
+
+
+class PooledNetworkClient(BoxNetworkClient):
+    """BoxNetworkClient over a shared, tuned connection pool."""
+
+    def __init__(self, config: Optional[HttpConfig] = None):
+        self.config = config or HttpConfig()
+        session = _TimeoutSession(self.config)
+        adapter = None
+        if self.config.http2:
+            try:
+                import h2  # noqa: F401
+
+                adapter = _Http2Adapter(self.config)
+            except ImportError:
+                logger.warning("BOX_HTTP2 is set but httpx[http2] is not installed")
+        if adapter is None:
+            adapter = _PooledHTTPAdapter(self.config)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self.adapter = adapter
+        super().__init__(requests_session=session)
+
+    def stats(self) -> dict:
+        stats = self.adapter.stats()
+        stats["pool_maxsize"] = self.config.pool_maxsize
+        stats["requests_by_category"] = dict(self.requests_session.requests_by_category)
+        return stats
+
+
+def create_network_session(config: Optional[HttpConfig] = None) -> NetworkSession:
+    """NetworkSession for BoxClient(auth, network_session=...)."""
+    return NetworkSession(network_client=PooledNetworkClient(config))
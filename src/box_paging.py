@@ -0,0 +1,266 @@
+"""
+Ranged and paged reads of Box files.
+
+Agents rarely need a whole 300-page document at once, and returning it in one
+string means transferring, decoding and serializing all of it only for the
+agent to truncate it. Reads can instead ask for a window: text windows are
+served from an in-memory cache of the extracted text, so paging through a
+document costs one extraction; byte windows of downloads map to HTTP Range
+requests. Every window reports the total size and an opaque continuation
+cursor for the next one.
+"""
+
+import base64
+import binascii
+import codecs
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+from box_shared_cache import shared_key
+
+if TYPE_CHECKING:
+    from box_shared_cache import SharedCache
+
+# Default window sizes: characters for text, bytes for downloads
+DEFAULT_TEXT_LENGTH = 20_000
+DEFAULT_BYTE_LENGTH = 1024 * 1024
+
+# Window ends are moved back to whitespace when one is this close
+_WORD_BOUNDARY_SLACK = 200
+
+
+def encode_cursor(file_id: str, offset: int, length: int) -> str:
+    payload = json.dumps({"f": file_id, "o": offset, "l": length}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, file_id: str) -> Tuple[int, int]:
+    """Return (offset, length) from a cursor, checking it belongs to file_id."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        cursor_file_id = payload["f"]
+        offset, length = int(payload["o"]), int(payload["l"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    # Cursors come from clients, and end up in slices and Range headers
+    if offset < 0 or length <= 0:
+        raise ValueError("Invalid cursor")
+    if cursor_file_id != file_id:
+        raise ValueError(f"Cursor belongs to file {cursor_file_id}, not {file_id}")
+    return offset, length
+
+
+def resolve_window(
+    file_id: str,
+    offset: Optional[int],
+    length: Optional[int],
+    cursor: Optional[str],
+    default_length: int,
+) -> Tuple[int, int]:
+    """Offset and length requested either explicitly or through a cursor."""
+    if cursor:
+        return decode_cursor(cursor, file_id)
+    offset = offset or 0
+    length = length or default_length
+    if offset < 0 or length <= 0:
+        raise ValueError("offset must be >= 0 and length must be > 0")
+    return offset, length
+
+
+def text_window(file_id: str, text: str, offset: int, length: int) -> dict:
+    """A window of `text` starting at `offset`, ending on a word boundary if possible."""
+    total = len(text)
+    end = min(offset + length, total)
+    if end < total:
+        search_from = max(offset, end - _WORD_BOUNDARY_SLACK)
+        boundary = max(
+            text.rfind(" ", search_from, end), text.rfind("\n", search_from, end)
+        )
+        if boundary > offset:
+            end = boundary + 1
+    return {
+        "file_id": file_id,
+        "offset": offset,
+        "length": max(0, end - offset),
+        "total_length": total,
+        "text": text[offset:end],
+        "next_cursor": encode_cursor(file_id, end, length) if end < total else None,
+    }
+
+
+def decode_utf8_prefix(data: bytes, final: bool) -> Tuple[str, int]:
+    """
+    Decode `data`, leaving out a multi-byte character cut off at the end.
+
+    Returns the text and the number of bytes it covers, so the next range
+    starts at the first byte of the incomplete character.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    text = decoder.decode(data, final=final)
+    pending, _ = decoder.getstate()
+    return text, len(data) - len(pending)
+
+
+@dataclass
+class _TextEntry:
+    text: str
+    size: int
+    created: float
+    # Storage time in the shared tier, which changes when another process
+    # replaces the entry
+    stored: Optional[float] = None
+
+
+class TextCache:
+    """
+    Size-bounded LRU of extracted file text with a TTL.
+
+    Entries are keyed by file and by the identity that read it (see
+    BoxContext.identity_for), since users may not share access to a file.
+    With a shared tier, misses are looked up there, entries are written
+    through, and an entry is served only while the shared tier still holds
+    the same version of it.
+
+    Args:
+        max_bytes: Approximate memory budget (UTF-8 size of cached text).
+        ttl: Seconds an extraction is served before Box is asked again.
+        ttl_by_identity: TTLs of identities that differ from `ttl`.
+        shared: Cache tier shared with the other processes of the host.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        shared: "Optional[SharedCache]" = None,
+        ttl_by_identity: Optional[Dict[str, float]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.ttl_by_identity: Dict[str, float] = dict(ttl_by_identity or {})
+        self.shared = shared
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], _TextEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "TextCache":
+        return cls(
+            max_bytes=int(os.getenv("BOX_TEXT_CACHE_MB", "64")) * 1024 * 1024,
+            ttl=float(os.getenv("BOX_TEXT_CACHE_TTL", "600")),
+        )
+
+    def ttl_for(self, identity: str) -> float:
+        return self.ttl_by_identity.get(identity, self.ttl)
+
+    def get_or_load(
+        self, file_id: str, load: Callable[[], str], identity: str = ""
+    ) -> str:
+        """Cached text of a file, calling `load` to extract it on a miss."""
+        text = self.get(file_id, identity)
+        if text is None:
+            # Extract outside the lock; concurrent misses for one file may both
+            # load, which is cheaper than serializing every extraction.
+            text = load()
+            self.put(file_id, text, identity)
+        return text
+
+    def get(self, file_id: str, identity: str = "") -> Optional[str]:
+        """Cached text of a file, or None on a miss."""
+        key = (identity, file_id)
+        ttl = self.ttl_for(identity)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and self._clock() - entry.created < ttl:
+            if self.shared is None or self.shared.stored("text", shared_key(*key)) == entry.stored:
+                with self._lock:
+                    self.hits += 1
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                return entry.text
+        if self.shared is not None:
+            found = self.shared.get("text", shared_key(*key))
+            if found is not None and time.time() - found[2] < ttl:
+                value, _, stored = found
+                text = value.decode("utf-8")
+                created = self._clock() - (time.time() - stored)
+                self._insert(key, _TextEntry(text, len(value), created, stored))
+                with self._lock:
+                    self.hits += 1
+                return text
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def contains(self, file_id: str, identity: str = "") -> bool:
+        """Whether a fresh entry is cached, without counting a hit or miss."""
+        ttl = self.ttl_for(identity)
+        with self._lock:
+            entry = self._entries.get((identity, file_id))
+            if entry is not None and self._clock() - entry.created < ttl:
+                return True
+        if self.shared is not None:
+            stored = self.shared.stored("text", shared_key(identity, file_id))
+            return stored is not None and time.time() - stored < ttl
+        return False
+
+    def put(self, file_id: str, text: str, identity: str = "") -> None:
+        key = (identity, file_id)
+        value = text.encode("utf-8")
+        if len(value) > self.max_bytes:
+            return
+        stored = None
+        if self.shared is not None:
+            stored = self.shared.put("text", shared_key(*key), file_id, value)
+        self._insert(key, _TextEntry(text, len(value), self._clock(), stored))
+
+    def _insert(self, key: Tuple[str, str], entry: _TextEntry) -> None:
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, file_id: str) -> None:
+        """Drop the cached text of a file for every identity."""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == file_id]:
+                self._remove(key)
+        if self.shared is not None:
+            self.shared.invalidate("text", file_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.shared is not None:
+            self.shared.clear("text")
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,194 @@
+"""
+Background prefetch of the text of likely next reads.
+
+A search or a folder listing is usually followed by box_read_tool on its
+first few results, two round trips one after the other. With BOX_PREFETCH
+set to N, the text of the first N documents of each search or listing is
+extracted in the background and put in the text cache, so the read that
+follows is answered from the cache, or joins the extraction in flight.
+
+Prefetches run on a few threads at the lowest scheduling priority the OS
+allows and are capped per minute, so they never take much of the Box API
+rate limit from foreground calls. The hit rate (prefetched files that were
+then read) shows whether prefetching pays off for a given workload.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prefetched files remembered for the hit rate
+_TRACKED_MAX = 4096
+
+
+def _lower_priority() -> None:
+    """Lowest nice value for the calling thread (Linux sets it per thread)."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+class Prefetcher:
+    """
+    Extracts the text of files in the background, within a budget.
+
+    Args:
+        top_n: Documents prefetched from each search or listing.
+        per_minute: Extractions started in any 60 seconds, at most.
+        max_concurrency: Extractions running at once.
+    """
+
+    def __init__(self, top_n: int, per_minute: int = 30, max_concurrency: int = 2):
+        self.top_n = top_n
+        self.per_minute = per_minute
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._started: deque = deque()
+        self._pending: Dict[Tuple[str, str], Future] = {}
+        # Prefetched or in flight, and not read yet
+        self._unread: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self.scheduled = 0
+        self.skipped_cached = 0
+        self.skipped_budget = 0
+        self.fetched = 0
+        self.failed = 0
+        self.used = 0
+        self.joined = 0
+
+    @classmethod
+    def from_env(cls) -> "Optional[Prefetcher]":
+        """
+        None unless BOX_PREFETCH is a number of documents to prefetch.
+        BOX_PREFETCH_PER_MINUTE (default 30) caps the extractions started
+        per minute and BOX_PREFETCH_CONCURRENCY (default 2) those at once.
+        """
+        top_n = int(os.getenv("BOX_PREFETCH", "0") or 0)
+        if top_n <= 0:
+            return None
+        return cls(
+            top_n,
+            per_minute=int(os.getenv("BOX_PREFETCH_PER_MINUTE", "30")),
+            max_concurrency=max(1, int(os.getenv("BOX_PREFETCH_CONCURRENCY", "2"))),
+        )
+
+    def schedule(
+        self,
+        file_ids: Iterable[str],
+        identity: str,
+        load: Callable[[str], str],
+        store: Callable[[str, str], None],
+        cached: Callable[[str], bool],
+    ) -> int:
+        """
+        Prefetch the first `top_n` of `file_ids` that are not `cached`:
+        `load(file_id)` extracts the text and `store(file_id, text)` keeps it.
+        Returns the number of extractions started.
+        """
+        started = 0
+        for file_id in list(file_ids)[: self.top_n]:
+            key = (identity, file_id)
+            with self._lock:
+                if key in self._pending or cached(file_id):
+                    self.skipped_cached += 1
+                    continue
+                if not self._take_budget():
+                    self.skipped_budget += 1
+                    continue
+                self.scheduled += 1
+                self._pending[key] = self._pool().submit(self._fetch, key, load, store)
+                self._unread[key] = None
+                if len(self._unread) > _TRACKED_MAX:
+                    self._unread.popitem(last=False)
+            started += 1
+        return started
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix="box-prefetch",
+                initializer=_lower_priority,
+            )
+        return self._executor
+
+    def _take_budget(self) -> bool:
+        now = time.monotonic()
+        while self._started and now - self._started[0] >= 60:
+            self._started.popleft()
+        if len(self._started) >= self.per_minute:
+            return False
+        self._started.append(now)
+        return True
+
+    def _fetch(self, key: Tuple[str, str], load, store) -> str:
+        _, file_id = key
+        try:
+            text = load(file_id)
+            store(file_id, text)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                self._unread.pop(key, None)
+            logger.debug("Prefetch of %s failed: %s", file_id, e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+        with self._lock:
+            self.fetched += 1
+        return text
+
+    def pending(self, file_id: str, identity: str = "") -> Optional[Future]:
+        """The prefetch of a file still in flight, to wait for instead of extracting again."""
+        with self._lock:
+            future = self._pending.get((identity, file_id))
+            if future is not None and future.cancelled():
+                future = None
+            self.joined += future is not None
+            return future
+
+    def record_read(self, file_id: str, identity: str = "", served: bool = True) -> None:
+        """
+        Count the first read of a prefetched file as a hit when it was
+        `served` by the prefetch, from the cache or by joining it.
+        """
+        with self._lock:
+            if (identity, file_id) in self._unread:
+                del self._unread[(identity, file_id)]
+                self.used += served
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        # Prefetches cancelled before they started never clear their entry;
+        # forget them so the files are read, or prefetched again, as usual
+        with self._lock:
+            for key, future in list(self._pending.items()):
+                if future.cancelled():
+                    del self._pending[key]
+                    self._unread.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "top_n": self.top_n,
+                "per_minute": self.per_minute,
+                "scheduled": self.scheduled,
+                "in_flight": len(self._pending),
+                "fetched": self.fetched,
+                "failed": self.failed,
+                "skipped_cached": self.skipped_cached,
+                "skipped_budget": self.skipped_budget,
+                "joined": self.joined,
+                "used": self.used,
+                "hit_rate": round(self.used / self.scheduled, 3) if self.scheduled else 0.0,
+            }
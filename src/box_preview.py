@@ -0,0 +1,277 @@
+"""
+Small image previews of Box files for visual inspection.
+
+Looking at a photo or the first page of a report does not need the original
+file: Box renders JPG and PNG representations of images and documents in a
+range of sizes. A preview asks for the smallest representation that covers
+the requested size, so a response is kilobytes instead of megabytes. When
+Box has no representation (unsupported type, still rendering), images are
+downscaled locally from the original if Pillow is installed.
+
+Previews are cached per file version, size and page, so repeated looks at
+an unchanged file do not transfer the image again.
+"""
+
+import io
+import logging
+import mimetypes
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from box_shared_cache import shared_key
+
+if TYPE_CHECKING:
+    from box_sdk_gen import BoxClient
+
+    from box_shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+# Representation sizes Box generates, see
+# https://developer.box.com/guides/representations/supported-file-types/
+JPG_DIMENSIONS = (32, 94, 160, 320, 1024, 2048)
+PNG_DIMENSIONS = (1024, 2048)
+
+
+class PreviewUnavailableError(Exception):
+    """Box has no representation and the file cannot be downscaled locally."""
+
+
+@dataclass
+class Preview:
+    data: bytes
+    mime_type: str
+    # "representation" or "downscaled"
+    source: str
+
+
+def representation_for(size: int, page: int) -> Tuple[str, int, str]:
+    """
+    Representation format, dimension and asset path for a preview.
+
+    Page 1 uses the single-image JPG representation, which comes in small
+    sizes; later pages are only available as paged PNGs.
+    """
+    if page == 1:
+        dimension = next((d for d in JPG_DIMENSIONS if d >= size), JPG_DIMENSIONS[-1])
+        return "jpg", dimension, ""
+    dimension = next((d for d in PNG_DIMENSIONS if d >= size), PNG_DIMENSIONS[-1])
+    return "png", dimension, f"{page}.png"
+
+
+def downscale(data: bytes, size: int) -> Optional[Tuple[bytes, str]]:
+    """
+    Fit an image in a `size` x `size` box. Returns None without Pillow or
+    when `data` is not an image Pillow can read.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) <= size and image.format in ("JPEG", "PNG"):
+                return data, Image.MIME[image.format]
+            image.thumbnail((size, size))
+            output = io.BytesIO()
+            if image.mode in ("RGBA", "LA", "P"):
+                image.save(output, format="PNG", optimize=True)
+                return output.getvalue(), "image/png"
+            image.convert("RGB").save(output, format="JPEG", quality=85)
+            return output.getvalue(), "image/jpeg"
+    except Exception as e:
+        logger.debug("Could not downscale image: %s", e)
+        return None
+
+
+class PreviewCache:
+    """
+    LRU of previews bounded by total size in bytes. With a `shared` tier,
+    misses are looked up there and previews are written through.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, shared: "Optional[SharedCache]" = None):
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._entries: "OrderedDict[tuple, Preview]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[Preview]:
+        with self._lock:
+            preview = self._entries.get(key)
+            if preview is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return preview
+        # Keys include the file version, so shared previews never go stale
+        found = self.shared.get("preview", shared_key(*key)) if self.shared else None
+        if found is not None:
+            data, meta, _ = found
+            preview = Preview(data, meta["mime_type"], meta["source"])
+            self._insert(key, preview)
+            with self._lock:
+                self.hits += 1
+            return preview
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: tuple, preview: Preview) -> None:
+        if len(preview.data) > self.max_bytes:
+            return
+        if self.shared is not None:
+            self.shared.put(
+                "preview",
+                shared_key(*key),
+                key[1],
+                preview.data,
+                {"mime_type": preview.mime_type, "source": preview.source},
+            )
+        self._insert(key, preview)
+
+    def _insert(self, key: tuple, preview: Preview) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.data)
+            self._entries[key] = preview
+            self._bytes += len(preview.data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.data)
+
+    def invalidate(self, file_id: str) -> None:
+        """Drop the previews of a file, for every identity and version."""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == file_id]:
+                self._bytes -= len(self._entries.pop(key).data)
+        if self.shared is not None:
+            self.shared.invalidate("preview", file_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.shared is not None:
+            self.shared.clear("preview")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _get(client: "BoxClient", url: str, binary: bool):
+    from box_sdk_gen import FetchOptions
+    from box_sdk_gen.networking.fetch_options import ResponseFormat
+
+    response = client.make_request(
+        FetchOptions(
+            url=url,
+            method="GET",
+            response_format=ResponseFormat.BINARY if binary else ResponseFormat.JSON,
+        )
+    )
+    return response.content.read() if binary else response.data
+
+
+def _representation(
+    client: "BoxClient", file_info, asset_path: str, wait: float
+) -> Optional[bytes]:
+    entries = file_info.representations.entries if file_info.representations else []
+    entry = next((e for e in entries if e.representation in ("jpg", "png")), None)
+    if entry is None:
+        return None
+
+    state = entry.status.state if entry.status else None
+    deadline = time.monotonic() + wait
+    # "none" and "pending" representations are generated on request;
+    # fetching the info URL starts generation and reports progress.
+    while state in ("none", "pending") and time.monotonic() < deadline:
+        info = _get(client, entry.info.url, binary=False)
+        state = (info.get("status") or {}).get("state")
+        if state in ("none", "pending"):
+            time.sleep(0.5)
+    if state not in ("success", "viewable"):
+        return None
+    return _get(
+        client,
+        entry.content.url_template.replace("{+asset_path}", asset_path),
+        binary=True,
+    )
+
+
+def get_preview(
+    client: "BoxClient",
+    cache: PreviewCache,
+    identity: str,
+    file_id: str,
+    size: int = 320,
+    page: int = 1,
+    max_original_bytes: int = 20 * 1024 * 1024,
+    wait: float = 5.0,
+) -> Tuple[Preview, dict]:
+    """
+    Preview image of a file and its cache-relevant metadata.
+
+    Args:
+        identity: Identity the client acts as; previews are cached per identity.
+        size: Longest side of the preview in pixels.
+        page: Page of a document (1-based).
+        max_original_bytes: Largest original image downscaled locally.
+        wait: Seconds to wait for Box to render a missing representation.
+    """
+    rep_format, dimension, asset_path = representation_for(size, page)
+    file_info = client.files.get_file_by_id(
+        file_id,
+        x_rep_hints=f"[{rep_format}?dimensions={dimension}x{dimension}]",
+        fields=["name", "size", "file_version", "representations"],
+    )
+    version_id = file_info.file_version.id if file_info.file_version else ""
+    details = {"file_name": file_info.name, "file_version_id": version_id}
+
+    key = (identity, file_id, version_id, size, page)
+    preview = cache.get(key)
+    if preview is not None:
+        return preview, details
+
+    data = _representation(client, file_info, asset_path, wait)
+    if data is not None:
+        mime_type = "image/jpeg" if rep_format == "jpg" else "image/png"
+        preview = Preview(data, mime_type, "representation")
+        # Box sizes are coarse (320, 1024, ...); trim to the requested size
+        if size < dimension:
+            scaled = downscale(data, size)
+            if scaled is not None:
+                preview = Preview(scaled[0], scaled[1], "representation")
+    else:
+        original_type, _ = mimetypes.guess_type(file_info.name)
+        if page != 1 or not (original_type or "").startswith("image/"):
+            raise PreviewUnavailableError(
+                f"Box has no preview of {file_info.name} at this size or page"
+            )
+        if (file_info.size or 0) > max_original_bytes:
+            raise PreviewUnavailableError(
+                f"Box has no preview of {file_info.name}, and it is too large to downscale locally"
+            )
+        original = client.downloads.download_file(file_id).read()
+        scaled = downscale(original, size)
+        if scaled is None:
+            raise PreviewUnavailableError(
+                f"Box has no preview of {file_info.name}; install the `preview` "
+                "extra (Pillow) to downscale images locally"
+            )
+        preview = Preview(scaled[0], scaled[1], "downscaled")
+
+    cache.put(key, preview)
+    return preview, details
@@ -0,0 +1,182 @@
+"""
+Progress notifications for long-running tools.
+
+Listing a large tree, uploading a big file or waiting for Box AI can take
+minutes. A client that hears nothing for that long times out and retries,
+doubling the load for work that is still in progress. Tools report progress
+through a ProgressReporter instead: MCP progress notifications carry the
+completed and total units, and a `notifications/message` log entry carries
+the details (bytes transferred, estimated seconds to completion) and any
+partial results already available.
+
+Notifications are only sent when the client asked for them by passing a
+progress token, and are throttled so a fast loop does not flood the client.
+Reporters can be called from worker threads.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from mcp.server.fastmcp import Context
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_LOGGER = "box.progress"
+
+
+class DurationEstimate:
+    """Moving average of how long an operation takes, for completion estimates."""
+
+    def __init__(self, initial: float, weight: float = 0.3):
+        self.value = initial
+        self.weight = weight
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.value += self.weight * (seconds - self.value)
+
+
+class ProgressReporter:
+    """
+    Sends progress of one tool call to the client.
+
+    Args:
+        unit: What `done` and `total` count ("items", "bytes", "seconds"...).
+        min_interval: Seconds between notifications, except the final one.
+    """
+
+    def __init__(
+        self,
+        ctx: Context,
+        unit: str = "items",
+        min_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        meta = ctx.request_context.meta
+        self.enabled = meta is not None and getattr(meta, "progressToken", None) is not None
+        self._ctx = ctx
+        self._loop = asyncio.get_running_loop()
+        self.unit = unit
+        self.min_interval = min_interval
+        self._clock = clock
+        self._started = clock()
+        self._last_sent: Optional[float] = None
+        self._lock = threading.Lock()
+        self.done = 0.0
+        self.total: Optional[float] = None
+        self.bytes = 0
+
+    def __call__(self, done: float, total: Optional[float] = None) -> None:
+        """(done, total) callback, as taken by the bulk transfer helpers."""
+        self.update(done=done, total=total)
+
+    def update(
+        self,
+        done: Optional[float] = None,
+        total: Optional[float] = None,
+        advance: float = 0,
+        bytes: int = 0,
+        force: bool = False,
+    ) -> None:
+        with self._lock:
+            if done is not None:
+                self.done = done
+            if total is not None:
+                self.total = total
+            self.done += advance
+            self.bytes += bytes
+            now = self._clock()
+            finished = self.total is not None and self.done >= self.total
+            if not self.enabled or not (
+                force
+                or finished
+                or self._last_sent is None
+                or now - self._last_sent >= self.min_interval
+            ):
+                return
+            self._last_sent = now
+            done, total, details = self.done, self.total, self._details(now)
+        self._submit(self._ctx.report_progress(done, total))
+        self._submit(self._log(details))
+
+    def partial(self, data: Any) -> None:
+        """Send results that are already available before the tool returns."""
+        if self.enabled:
+            with self._lock:
+                details = self._details(self._clock())
+            details["partial_result"] = data
+            self._submit(self._log(details))
+
+    def eta(self, now: Optional[float] = None) -> Optional[float]:
+        """Estimated seconds to completion, from the rate so far."""
+        elapsed = (now if now is not None else self._clock()) - self._started
+        if not self.total or not self.done or self.unit == "seconds":
+            return None
+        return max(0.0, elapsed * (self.total - self.done) / self.done)
+
+    def _details(self, now: float) -> dict:
+        details = {
+            "unit": self.unit,
+            "done": self.done,
+            "total": self.total,
+            "elapsed_seconds": round(now - self._started, 1),
+        }
+        if self.bytes:
+            details["bytes"] = self.bytes
+        eta = self.eta(now)
+        if eta is not None:
+            details["eta_seconds"] = round(eta, 1)
+        return details
+
+    async def _log(self, data: dict) -> None:
+        await self._ctx.request_context.session.send_log_message(
+            level="info", data=data, logger=PROGRESS_LOGGER
+        )
+
+    async def _notify(self, coroutine) -> None:
+        try:
+            await coroutine
+        except Exception as e:
+            logger.debug("Could not send progress notification: %s", e)
+
+    def _submit(self, coroutine) -> None:
+        coroutine = self._notify(coroutine)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._loop.create_task(coroutine)
+        else:
+            asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def run_with_heartbeat(
+        self,
+        func: Callable[..., Any],
+        *args,
+        estimate: Optional[DurationEstimate] = None,
+        interval: float = 2.0,
+    ) -> Any:
+        """
+        Run a blocking call on a worker thread, reporting elapsed seconds
+        (against `estimate` as the expected total) until it returns.
+        """
+        started = self._clock()
+        task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        while True:
+            finished, _ = await asyncio.wait({task}, timeout=interval)
+            elapsed = self._clock() - started
+            if finished:
+                break
+            expected = estimate.value if estimate else None
+            # Past the estimate, keep the total ahead of the elapsed time
+            total = max(expected, elapsed + interval) if expected else None
+            self.update(done=round(elapsed, 1), total=total and round(total, 1))
+        result = task.result()
+        if estimate:
+            estimate.observe(elapsed)
+        return result
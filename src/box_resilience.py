@@ -0,0 +1,349 @@
+"""
+Hedged requests, circuit breakers and deadlines for Box calls.
+
+A few Box calls take seconds instead of milliseconds (text representations,
+downloads, search under load), and one slow call holds up the agent turn
+waiting for it. Calls that only read are hedged: if one has not answered
+after the usual (95th percentile) time for its endpoint, a duplicate is sent
+and whichever answers first is used. Hedges are limited to a share of the
+calls, so an endpoint that is slow for everyone does not get twice the load.
+
+Each endpoint has a circuit breaker: after several consecutive failures,
+calls fail immediately for a while instead of each waiting for a timeout,
+then a single trial call decides whether the endpoint is back. Every call
+also has a deadline, after which the tool gets an error instead of waiting
+longer.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Deadlines in seconds by endpoint, BOX_DEADLINE_<ENDPOINT> overrides them
+DEFAULT_DEADLINES = {
+    "text_extract": 120.0,
+    "file_info": 30.0,
+    "download": 600.0,
+    "search": 30.0,
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call did not finish within its deadline."""
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """Whether an error says the endpoint is unhealthy, rather than the request wrong."""
+    from box_sdk_gen import BoxSDKError
+
+    # requests.Response is falsy for error statuses, so no `or` here
+    response = getattr(error, "response_info", None)
+    if response is None:
+        response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is not None:
+        return status >= 500 or status == 429
+    # Timeouts and connection errors (requests exceptions are OSErrors too),
+    # which the SDK wraps in a BoxSDKError without a response
+    return isinstance(error, (OSError, BoxSDKError))
+
+
+@dataclass
+class ResilienceConfig:
+    """Hedging, circuit breaker and deadline settings, see `from_env`."""
+
+    hedging: bool = True
+    # Hedges allowed per call of an endpoint
+    hedge_budget: float = 0.1
+    hedge_percentile: float = 95.0
+    hedge_min_delay: float = 0.05
+    # Used until an endpoint has `min_samples` latencies
+    hedge_initial_delay: float = 2.0
+    min_samples: int = 20
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    default_deadline: float = 300.0
+    deadlines: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_DEADLINES))
+
+    @classmethod
+    def from_env(cls) -> "ResilienceConfig":
+        def number(name: str, default: float) -> float:
+            value = os.getenv(name)
+            return float(value) if value else default
+
+        config = cls(
+            hedging=os.getenv("BOX_HEDGING", "1").lower() in ("1", "true", "yes"),
+            hedge_budget=number("BOX_HEDGE_BUDGET", cls.hedge_budget),
+            hedge_initial_delay=number("BOX_HEDGE_DELAY", cls.hedge_initial_delay),
+            failure_threshold=int(number("BOX_CIRCUIT_FAILURES", cls.failure_threshold)),
+            reset_timeout=number("BOX_CIRCUIT_RESET", cls.reset_timeout),
+            default_deadline=number("BOX_DEADLINE", cls.default_deadline),
+        )
+        for endpoint in config.deadlines:
+            config.deadlines[endpoint] = number(
+                f"BOX_DEADLINE_{endpoint.upper()}", config.deadlines[endpoint]
+            )
+        return config
+
+    def deadline_for(self, endpoint: str) -> float:
+        return self.deadlines.get(endpoint, self.default_deadline)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, for `reset_timeout` seconds."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self.opened_at))
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def release(self) -> None:
+        """Let another call be the trial after one ended without an answer."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._trial_running or (
+                self.opened_at is None and self.consecutive_failures >= self.failure_threshold
+            ):
+                self.opened_at = self._clock()
+                self.opened += 1
+            self._trial_running = False
+
+
+class _Endpoint:
+    def __init__(self, config: ResilienceConfig):
+        self.config = config
+        self.breaker = CircuitBreaker(config.failure_threshold, config.reset_timeout)
+        self.latencies: deque = deque(maxlen=200)
+        self.calls = 0
+        self.failures = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+        self.deadlines_exceeded = 0
+
+    def hedge_delay(self) -> float:
+        if len(self.latencies) < self.config.min_samples:
+            return self.config.hedge_initial_delay
+        ordered = sorted(self.latencies)
+        index = int(len(ordered) * self.config.hedge_percentile / 100)
+        return max(self.config.hedge_min_delay, ordered[min(index, len(ordered) - 1)])
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": round(self.hedge_wins / self.hedged, 3) if self.hedged else None,
+            "hedge_delay": round(self.hedge_delay(), 3),
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "rejected": self.rejected,
+            "deadlines_exceeded": self.deadlines_exceeded,
+        }
+
+
+def _discard(future: "asyncio.Future") -> None:
+    """Drop the result of an attempt that lost or was abandoned."""
+    if future.cancelled():
+        return
+    if future.exception() is None:
+        close = getattr(future.result(), "close", None)
+        if callable(close):
+            close()
+
+
+class Resilience:
+    """
+    Runs blocking Box calls on worker threads with hedging, per-endpoint
+    circuit breakers and deadlines.
+
+    Args:
+        max_workers: Threads for calls, including hedges and calls that
+            were abandoned at their deadline and have not returned yet.
+    """
+
+    def __init__(self, config: Optional[ResilienceConfig] = None, max_workers: int = 64):
+        self.config = config or ResilienceConfig()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="box-call")
+        self._endpoints: Dict[str, _Endpoint] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Resilience":
+        return cls(ResilienceConfig.from_env())
+
+    def _endpoint(self, name: str) -> _Endpoint:
+        with self._lock:
+            if name not in self._endpoints:
+                self._endpoints[name] = _Endpoint(self.config)
+            return self._endpoints[name]
+
+    async def call(
+        self,
+        endpoint: str,
+        func: Callable[..., Any],
+        *args,
+        idempotent: bool = False,
+        **kwargs,
+    ) -> Any:
+        """
+        Call `func(*args, **kwargs)` on a worker thread. Only calls that are
+        `idempotent` (safe to run twice at once) are hedged.
+        """
+        state = self._endpoint(endpoint)
+        if not state.breaker.allow():
+            state.rejected += 1
+            raise CircuitOpenError(
+                f"Box {endpoint} calls are failing, retry in {state.breaker.retry_in():.0f}s"
+            )
+        state.calls += 1
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        started = time.monotonic()
+        deadline = started + self.config.deadline_for(endpoint)
+        hedge_at = None
+        if idempotent and self.config.hedging:
+            hedge_at = started + state.hedge_delay()
+
+        def attempt() -> "asyncio.Future":
+            # In the caller's context, like asyncio.to_thread
+            return loop.run_in_executor(self._executor, contextvars.copy_context().run, call)
+
+        attempts = {attempt(): False}
+        error: Optional[BaseException] = None
+        try:
+            while attempts:
+                now = time.monotonic()
+                if now >= deadline:
+                    state.deadlines_exceeded += 1
+                    raise DeadlineExceeded(
+                        f"Box {endpoint} call did not finish within "
+                        f"{self.config.deadline_for(endpoint):.0f}s"
+                    )
+                wake = deadline if hedge_at is None else min(deadline, hedge_at)
+                done, _ = await asyncio.wait(
+                    attempts, timeout=wake - now, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    is_hedge = attempts.pop(future)
+                    if future.exception() is not None:
+                        error = future.exception()
+                        continue
+                    state.latencies.append(time.monotonic() - started)
+                    state.breaker.record_success()
+                    if is_hedge:
+                        state.hedge_wins += 1
+                    return future.result()
+                if hedge_at is not None and time.monotonic() >= hedge_at and attempts:
+                    hedge_at = None
+                    if state.hedged < self.config.hedge_budget * state.calls:
+                        state.hedged += 1
+                        attempts[attempt()] = True
+            raise error
+        except asyncio.CancelledError:
+            state.breaker.release()
+            raise
+        except Exception as e:
+            if is_endpoint_failure(e):
+                state.failures += 1
+                state.breaker.record_failure()
+            else:
+                # The endpoint answered; the request itself was wrong
+                state.breaker.record_success()
+            raise
+        finally:
+            for future in attempts:
+                future.add_done_callback(_discard)
+
+    def call_blocking(self, endpoint: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call `func(*args, **kwargs)` on the current thread, behind the circuit
+        breaker of `endpoint`, for background work that runs on threads of
+        its own. It is neither hedged nor bounded by a deadline.
+        """
+        state = self._endpoint(endpoint)
+        if not state.breaker.allow():
+            state.rejected += 1
+            raise CircuitOpenError(
+                f"Box {endpoint} calls are failing, retry in {state.breaker.retry_in():.0f}s"
+            )
+        state.calls += 1
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_endpoint_failure(e):
+                state.failures += 1
+                state.breaker.record_failure()
+            else:
+                state.breaker.record_success()
+            raise
+        state.latencies.append(time.monotonic() - started)
+        state.breaker.record_success()
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {
+            "hedging": self.config.hedging,
+            "endpoints": {name: state.stats() for name, state in endpoints.items()},
+        }
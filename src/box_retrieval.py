@@ -0,0 +1,351 @@
+"""
+Local retrieval of the files and passages relevant to a question.
+
+Agents tend to pick the file_ids for box_ask_ai_tool_multi_file by reading
+many candidates first, or pass dozens of files and let Box AI sort them out.
+Extracted text is instead split into overlapping chunks, embedded as hashed
+TF-IDF vectors and kept in a memory-mapped NumPy matrix, so a question is
+answered locally with a batched cosine top-k over every chunk, and the AI
+call gets a small, precise set of files.
+
+Hashed vectors need no model download and no vocabulary: words and word
+pairs are hashed into a fixed number of dimensions, and the IDF weights are
+computed from the stored vectors at query time, so adding a document never
+rewrites the others. Chunk text and metadata live in SQLite next to the
+matrix. Needs NumPy (the `retrieval` extra).
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DIMENSIONS = 1024
+CHUNK_CHARS = 1000
+CHUNK_OVERLAP = 200
+# Rows scored at a time, bounding the memory a query copies out of the matrix
+BLOCK_ROWS = 32768
+INITIAL_ROWS = 1024
+# Identities whose IDF weights are kept between searches
+WEIGHT_CACHE_SIZE = 16
+
+_WORD = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    identity TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    name TEXT,
+    start INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_file ON chunks (identity, file_id);
+CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);
+"""
+
+
+def chunk_text(
+    text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP
+) -> List[Tuple[int, str]]:
+    """(offset, text) chunks of about `size` characters, split on whitespace."""
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            boundary = max(
+                text.rfind(" ", start + size // 2, end), text.rfind("\n", start + size // 2, end)
+            )
+            if boundary > start:
+                end = boundary
+        piece = text[start:end].strip()
+        if piece:
+            chunks.append((start, piece))
+        if end >= len(text):
+            break
+        # Start the next chunk on a word, `overlap` characters back
+        back = max(end - overlap, start + 1)
+        space = text.find(" ", back, end)
+        start = space + 1 if space != -1 else back
+    return chunks
+
+
+def _features(text: str) -> List[str]:
+    words = _WORD.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def embed(texts: List[str], dimensions: int = DIMENSIONS) -> np.ndarray:
+    """Unit-length hashed term-frequency vectors, one row per text."""
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for i, text in enumerate(texts):
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode()) for feature in _features(text)), dtype=np.uint32
+        )
+        if hashes.size:
+            # A sign bit per feature keeps collisions from only ever adding up
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix[i], hashes % dimensions, signs)
+    matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class VectorIndex:
+    """
+    Chunk vectors of extracted text, safe to use from several threads.
+
+    Args:
+        directory: Where the matrix (vectors.f32) and chunk database live.
+        max_chars: Longer texts are indexed up to this many characters.
+    """
+
+    def __init__(self, directory: str, dimensions: int = DIMENSIONS, max_chars: int = 5_000_000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dimensions = dimensions
+        self.max_chars = max_chars
+        self._db = sqlite3.connect(
+            os.path.join(directory, "chunks.db"), check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        stored = self._db.execute("SELECT value FROM meta WHERE key = 'dimensions'").fetchone()
+        if stored is not None and int(stored[0]) != dimensions:
+            raise ValueError(f"{directory} holds {stored[0]}-dimensional vectors, not {dimensions}")
+        self._db.execute("INSERT OR IGNORE INTO meta VALUES ('dimensions', ?)", (str(dimensions),))
+        self._path = os.path.join(directory, "vectors.f32")
+        if not os.path.exists(self._path):
+            with open(self._path, "wb") as f:
+                f.truncate(INITIAL_ROWS * dimensions * 4)
+        self._vectors = self._open()
+        self._lock = threading.Lock()
+        # identity -> (version, rows, squared IDF weights, weighted row norms)
+        self._weights: Dict[str, tuple] = {}
+        self._generation = 0
+        self.searches = 0
+
+    def _open(self) -> np.memmap:
+        rows = os.path.getsize(self._path) // (self.dimensions * 4)
+        return np.memmap(self._path, dtype=np.float32, mode="r+", shape=(rows, self.dimensions))
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the matrix to at least `rows` rows (another process may have already)."""
+        if rows <= len(self._vectors):
+            return
+        self._vectors.flush()
+        if os.path.getsize(self._path) < rows * self.dimensions * 4:
+            with open(self._path, "r+b") as f:
+                f.truncate(max(rows, 2 * len(self._vectors)) * self.dimensions * 4)
+        self._vectors = self._open()
+
+    def _changed(self) -> None:
+        self._generation += 1
+
+    def _release(self, rows: List[int]) -> None:
+        for row in rows:
+            self._vectors[row] = 0
+        self._db.executemany("INSERT OR IGNORE INTO free_rows VALUES (?)", [(r,) for r in rows])
+
+    def add(self, file_id: str, text: str, identity: str = "", name: Optional[str] = None) -> None:
+        """Index (or re-index) the text of a file."""
+        chunks = chunk_text(text[: self.max_chars])
+        vectors = embed([chunk for _, chunk in chunks], self.dimensions)
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._changed()
+            old = self._db.execute(
+                "SELECT row, name FROM chunks WHERE identity = ? AND file_id = ?",
+                (identity, file_id),
+            ).fetchall()
+            name = name or next((n for _, n in old if n), None)
+            self._db.execute(
+                "DELETE FROM chunks WHERE identity = ? AND file_id = ?", (identity, file_id)
+            )
+            self._release([row for row, _ in old])
+
+            rows = [
+                row
+                for (row,) in self._db.execute(
+                    "SELECT row FROM free_rows ORDER BY row LIMIT ?", (len(chunks),)
+                )
+            ]
+            self._db.executemany("DELETE FROM free_rows WHERE row = ?", [(r,) for r in rows])
+            if len(rows) < len(chunks):
+                (top,) = self._db.execute(
+                    "SELECT MAX(row) FROM (SELECT row FROM chunks UNION ALL SELECT row FROM free_rows)"
+                ).fetchone()
+                first = -1 if top is None else top
+                first = max(first, max(rows, default=-1)) + 1
+                rows += range(first, first + len(chunks) - len(rows))
+            self._reserve(max(rows, default=-1) + 1)
+            # Vectors are written before the rows are committed, so readers
+            # never see a chunk without its vector
+            for row, vector in zip(rows, vectors):
+                self._vectors[row] = vector
+            self._vectors.flush()
+            self._db.executemany(
+                "INSERT INTO chunks (row, identity, file_id, name, start, text)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (row, identity, file_id, name, start, chunk)
+                    for row, (start, chunk) in zip(rows, chunks)
+                ],
+            )
+
+    def remove(self, file_id: str, identity: Optional[str] = None) -> None:
+        """Drop a file, for one identity or for all of them."""
+        condition, params = "file_id = ?", [file_id]
+        if identity is not None:
+            condition, params = condition + " AND identity = ?", params + [identity]
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._changed()
+            rows = [r for (r,) in self._db.execute(f"SELECT row FROM chunks WHERE {condition}", params)]
+            self._db.execute(f"DELETE FROM chunks WHERE {condition}", params)
+            self._release(rows)
+            self._vectors.flush()
+
+    def invalidate(self, file_id: str) -> None:
+        self.remove(file_id)
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._changed()
+            self._db.execute("DELETE FROM chunks")
+            self._db.execute("DELETE FROM free_rows")
+            self._vectors[:] = 0
+            self._vectors.flush()
+
+    def _blocks(self, vectors: np.ndarray, rows: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+        """(position in rows, vectors of the rows) in blocks of BLOCK_ROWS."""
+        for i in range(0, rows.size, BLOCK_ROWS):
+            block = rows[i : i + BLOCK_ROWS]
+            low, high = int(block[0]), int(block[-1]) + 1
+            if high - low == block.size:
+                # Contiguous rows are a view of the mapped file, not a copy
+                yield i, vectors[low:high]
+            else:
+                yield i, vectors[block]
+
+    def _weighted(self, identity: str) -> tuple:
+        """
+        Rows of an identity's chunks with the IDF weights and row norms for
+        them, recomputed only after the index changed (in any process).
+        """
+        (data_version,) = self._db.execute("PRAGMA data_version").fetchone()
+        version = (self._generation, data_version)
+        cached = self._weights.get(identity)
+        if cached is not None and cached[0] == version:
+            return cached[1:]
+
+        rows = np.fromiter(
+            (r for (r,) in self._db.execute(
+                "SELECT row FROM chunks WHERE identity = ? ORDER BY row", (identity,)
+            )),
+            dtype=np.int64,
+        )
+        if rows.size:
+            self._reserve(int(rows[-1]) + 1)
+        # IDF over the chunks of this identity: hashed dimensions take the
+        # place of terms
+        frequency = np.zeros(self.dimensions)
+        for _, matrix in self._blocks(self._vectors, rows):
+            frequency += np.count_nonzero(matrix, axis=0)
+        idf = np.log((1 + rows.size) / (1 + frequency)) + 1
+        idf_squared = (idf * idf).astype(np.float32)
+        norms = np.empty(rows.size, dtype=np.float32)
+        for i, matrix in self._blocks(self._vectors, rows):
+            norms[i : i + len(matrix)] = np.sqrt((matrix * matrix) @ idf_squared)
+
+        if len(self._weights) >= WEIGHT_CACHE_SIZE:
+            self._weights.clear()
+        self._weights[identity] = (version, rows, idf_squared, norms)
+        return rows, idf_squared, norms
+
+    def search(
+        self,
+        question: str,
+        identity: str = "",
+        max_files: int = 5,
+        passages_per_file: int = 2,
+    ) -> List[dict]:
+        """
+        Files whose chunks are closest to `question`, best first, each with
+        its best passages.
+        """
+        query = embed([question], self.dimensions)[0]
+        if not query.any():
+            raise ValueError("question must contain at least one word")
+        with self._lock:
+            rows, idf_squared, norms = self._weighted(identity)
+            vectors = self._vectors
+        self.searches += 1
+        if not rows.size:
+            return []
+
+        # Cosine similarity of the IDF-weighted vectors
+        weighted_query = query * idf_squared
+        query_norm = np.sqrt(query * query @ idf_squared)
+        scores = np.empty(rows.size, dtype=np.float32)
+        for i, matrix in self._blocks(vectors, rows):
+            scores[i : i + len(matrix)] = matrix @ weighted_query
+        scores /= np.maximum(norms * query_norm, 1e-12)
+
+        candidates = min(rows.size, max_files * passages_per_file * 4)
+        best = np.argpartition(-scores, candidates - 1)[:candidates]
+        best = best[np.argsort(-scores[best])]
+        best = [i for i in best if scores[i] > 0]
+        with self._lock:
+            details = {
+                row: (file_id, name, start, text)
+                for row, file_id, name, start, text in self._db.execute(
+                    "SELECT row, file_id, name, start, text FROM chunks WHERE row IN"
+                    f" ({','.join('?' * len(best))})",
+                    [int(rows[i]) for i in best],
+                )
+            }
+
+        files: dict = {}
+        for i in best:
+            row = int(rows[i])
+            # Removed since the weights were computed
+            if row not in details:
+                continue
+            file_id, name, start, text = details[row]
+            if file_id not in files:
+                if len(files) == max_files:
+                    continue
+                files[file_id] = {
+                    "file_id": file_id,
+                    "name": name,
+                    "score": round(float(scores[i]), 4),
+                    "passages": [],
+                }
+            if len(files[file_id]["passages"]) < passages_per_file:
+                files[file_id]["passages"].append(
+                    {"offset": start, "score": round(float(scores[i]), 4), "text": text}
+                )
+        return list(files.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            chunks, files = self._db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT identity || ':' || file_id) FROM chunks"
+            ).fetchone()
+            capacity = len(self._vectors)
+        return {
+            "directory": self.directory,
+            "dimensions": self.dimensions,
+            "chunks": chunks,
+            "files": files,
+            "rows": capacity,
+            "searches": self.searches,
+        }
@@ -0,0 +1,193 @@
+"""
+Cache tier shared by the server processes of a host.
+
+Each server process keeps its caches in its own memory, so with several
+worker processes every worker extracts and downloads the same files again.
+SharedCache is a SQLite database (in WAL mode, so readers never wait for a
+writer) that the in-memory caches read on a miss and write through to.
+Invalidating a file deletes its rows, which every worker sees on its next
+read. Failures of the shared tier are logged and treated as misses; the
+tier never fails a tool call.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    item TEXT NOT NULL,
+    value BLOB NOT NULL,
+    meta TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_item ON entries (namespace, item);
+CREATE INDEX IF NOT EXISTS entries_stored ON entries (stored);
+"""
+
+# Writes between two checks of the total size
+_EVICT_EVERY = 64
+
+
+def shared_key(*parts) -> str:
+    return json.dumps(parts)
+
+
+class SharedCache:
+    """
+    Values by namespace and key in a SQLite file, bounded by total size.
+
+    Args:
+        path: Database file; every process that shares the cache opens it.
+        max_bytes: Oldest entries are deleted beyond this total size.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._connect().executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "Optional[SharedCache]":
+        """
+        None unless BOX_SHARED_CACHE names the database file, or when it
+        cannot be opened; the caches then stay per process.
+        """
+        path = os.getenv("BOX_SHARED_CACHE")
+        if not path:
+            return None
+        try:
+            return cls(
+                os.path.expanduser(path),
+                max_bytes=int(os.getenv("BOX_SHARED_CACHE_MB", "256")) * 1024 * 1024,
+            )
+        except sqlite3.Error as e:
+            logger.warning("Shared cache %s unavailable, caching per process: %s", path, e)
+            return None
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections are not shared
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _failed(self, action: str, error: Exception) -> None:
+        self.errors += 1
+        logger.warning("Shared cache %s failed: %s", action, error)
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[bytes, dict, float]]:
+        """The value, metadata and storage time (epoch seconds) of an entry."""
+        try:
+            row = self._connect().execute(
+                "SELECT value, meta, stored FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._failed("read", e)
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return bytes(row[0]), json.loads(row[1]), row[2]
+
+    def stored(self, namespace: str, key: str) -> Optional[float]:
+        """When an entry was stored, without reading its value; None if absent."""
+        try:
+            row = self._connect().execute(
+                "SELECT stored FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._failed("read", e)
+            return None
+        return row[0] if row else None
+
+    def put(
+        self, namespace: str, key: str, item: str, value: bytes, meta: Optional[dict] = None
+    ) -> Optional[float]:
+        """Store an entry of file `item`; returns its storage time, None on failure."""
+        if len(value) > self.max_bytes:
+            return None
+        stored = time.time()
+        try:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, item, value, json.dumps(meta or {}), len(value), stored),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict(connection)
+        except sqlite3.Error as e:
+            self._failed("write", e)
+            return None
+        return stored
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        (total,) = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Oldest entries first, down to 90% of the limit
+        excess = total - int(self.max_bytes * 0.9)
+        connection.execute(
+            """
+            DELETE FROM entries WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, size, SUM(size) OVER (ORDER BY stored, rowid) AS running
+                    FROM entries
+                ) WHERE running - size < ?
+            )
+            """,
+            (excess,),
+        )
+
+    def invalidate(self, namespace: str, item: str) -> None:
+        """Delete every entry of file `item` in `namespace`."""
+        try:
+            self._connect().execute(
+                "DELETE FROM entries WHERE namespace = ? AND item = ?", (namespace, item)
+            )
+        except sqlite3.Error as e:
+            self._failed("delete", e)
+
+    def clear(self, namespace: str) -> None:
+        try:
+            self._connect().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+        except sqlite3.Error as e:
+            self._failed("delete", e)
+
+    def stats(self) -> dict:
+        stats = {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+        try:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            stats.update(entries=entries, bytes=size)
+        except sqlite3.Error as e:
+            self._failed("read", e)
+        return stats
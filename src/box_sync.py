@@ -0,0 +1,635 @@
+"""
+Incremental two-way sync of a Box folder and a local directory.
+
+Re-uploading or re-listing a whole folder to find what changed costs one
+request per folder and a hash of every local file. Instead a manifest in the
+local directory records, for every synced file, its Box id, path, SHA-1 and
+local size and mtime, plus the position in the Box events stream at the time
+of the last sync. A sync then asks Box only for the events since that
+position, fetches the items they mention, stats local files (hashing only
+those whose size or mtime changed) and applies the smallest set of
+downloads, uploads, renames and deletes that brings both sides back in line.
+
+A file changed on both sides since the last sync is a conflict. Conflicts
+are reported and left alone unless a policy says which side wins; they are
+checked again on every sync until they are resolved.
+
+A cancelled sync stops starting changes, keeps what was already applied and
+records the rest like failures, to be picked up by the next sync. A download
+it cut short keeps its `.part` file, which the next sync continues.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from box_cancel import CancelToken, OperationCancelled
+from box_events import event_item
+from box_transfer import (
+    PART_SUFFIX,
+    ProgressCallback,
+    download_file_to,
+    ensure_folder,
+    safe_name,
+    sha1_of_file,
+    upload_file_from,
+    walk_folder,
+)
+
+if TYPE_CHECKING:
+    from box_sdk_gen import BoxClient
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".box-sync.json"
+MANIFEST_VERSION = 1
+CONFLICT_POLICIES = ("report", "local", "remote")
+EVENTS_PAGE_SIZE = 500
+
+_FILE_FIELDS = ["id", "type", "name", "size", "sha1", "etag", "item_status", "path_collection"]
+_FOLDER_FIELDS = ["id", "type", "name", "item_status", "path_collection"]
+
+
+@dataclass
+class Manifest:
+    folder_id: str
+    stream_position: Optional[str] = None
+    # Relative path -> {"id", "sha1", "etag", "size", "mtime"}
+    files: Dict[str, dict] = field(default_factory=dict)
+    # Relative path -> Box folder id
+    folders: Dict[str, str] = field(default_factory=dict)
+    # Box file ids to check again on the next sync (conflicts, failures)
+    pending: List[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, local_dir: str, folder_id: str) -> Optional["Manifest"]:
+        path = os.path.join(local_dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"{path} was written by an incompatible version")
+        if data["folder_id"] != folder_id:
+            raise ValueError(f"{local_dir} is synced with Box folder {data['folder_id']}")
+        return cls(
+            folder_id=data["folder_id"],
+            stream_position=data.get("stream_position"),
+            files=data.get("files", {}),
+            folders=data.get("folders", {}),
+            pending=data.get("pending", []),
+        )
+
+    def save(self, local_dir: str) -> None:
+        path = os.path.join(local_dir, MANIFEST_NAME)
+        data = {
+            "version": MANIFEST_VERSION,
+            "folder_id": self.folder_id,
+            "stream_position": self.stream_position,
+            "files": self.files,
+            "folders": self.folders,
+            "pending": self.pending,
+        }
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+
+@dataclass
+class _RemoteFile:
+    # Path in the synced folder, None when deleted or moved out of it
+    path: Optional[str]
+    # Current Box file when it was fetched; None when only its folder moved
+    entry: object = None
+
+
+@dataclass
+class _Item:
+    """One file on both sides and what the sync does with it."""
+
+    # Path after the sync
+    path: str
+    file_id: Optional[str] = None
+    # Manifest path and record from the last sync
+    record_path: Optional[str] = None
+    record: Optional[dict] = None
+    # Current local path, None when missing locally
+    local_path: Optional[str] = None
+    entry: object = None
+    actions: List[str] = field(default_factory=list)
+    conflict: Optional[str] = None
+    # planned, done, conflict, failed or cancelled
+    status: str = "planned"
+    bytes: int = 0
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        result = {"path": self.path, "file_id": self.file_id, "status": self.status}
+        if self.actions:
+            result["actions"] = self.actions
+        if self.local_path and self.local_path != self.path:
+            result["from_path"] = self.local_path
+        for key in ("conflict", "error"):
+            if getattr(self, key):
+                result[key] = getattr(self, key)
+        if self.bytes:
+            result["bytes"] = self.bytes
+        return result
+
+
+def _remote_path(item, root_id: str) -> Optional[str]:
+    """Path of a Box item inside the synced folder, None when outside or trashed."""
+    if item is None or (item.item_status and item.item_status != "active"):
+        return None
+    ancestors = item.path_collection.entries if item.path_collection else []
+    ids = [ancestor.id for ancestor in ancestors]
+    if root_id not in ids:
+        return None
+    names = [safe_name(ancestor.name) for ancestor in ancestors[ids.index(root_id) + 1:]]
+    return "/".join(names + [safe_name(item.name)])
+
+
+def _fetch(client: "BoxClient", item_type: str, item_id: str):
+    from box_sdk_gen import BoxAPIError
+
+    try:
+        if item_type == "folder":
+            return client.folders.get_folder_by_id(item_id, fields=_FOLDER_FIELDS)
+        return client.files.get_file_by_id(item_id, fields=_FILE_FIELDS)
+    except BoxAPIError as e:
+        if e.response_info.status_code == 404:
+            return None
+        raise
+
+
+def _stream_position(client: "BoxClient") -> str:
+    from box_sdk_gen.managers.events import GetEventsStreamType
+
+    events = client.events.get_events(
+        stream_type=GetEventsStreamType.CHANGES, stream_position="now"
+    )
+    return str(events.next_stream_position)
+
+
+def _changed_items(client: "BoxClient", position: str) -> Tuple[Set[str], Set[str], str]:
+    """Ids of the files and folders changed since `position`, and the new position."""
+    from box_sdk_gen.managers.events import GetEventsStreamType
+
+    files, folders = set(), set()
+    while True:
+        events = client.events.get_events(
+            stream_type=GetEventsStreamType.CHANGES,
+            stream_position=position,
+            limit=EVENTS_PAGE_SIZE,
+        )
+        for event in events.entries or []:
+            item_type, item_id = event_item(event.source)
+            if item_type == "file":
+                files.add(item_id)
+            elif item_type == "folder":
+                folders.add(item_id)
+        position = str(events.next_stream_position)
+        if not events.entries:
+            return files, folders, position
+
+
+def _full_scan(
+    client: "BoxClient", manifest: Manifest, cancel: CancelToken
+) -> Dict[str, _RemoteFile]:
+    folders: Dict[str, str] = {}
+    remote = {
+        entry.id: _RemoteFile(path, entry)
+        for path, entry in walk_folder(
+            client, manifest.folder_id, folders=folders, cancel=cancel
+        )
+    }
+    for record in manifest.files.values():
+        remote.setdefault(record["id"], _RemoteFile(None))
+    manifest.folders = folders
+    return remote
+
+
+def _incremental_scan(
+    client: "BoxClient", manifest: Manifest, max_concurrency: int, cancel: CancelToken
+) -> Tuple[Dict[str, _RemoteFile], str]:
+    """Remote changes since the manifest's stream position."""
+    root_id = manifest.folder_id
+    file_ids, folder_ids, position = _changed_items(client, manifest.stream_position)
+    file_ids.update(manifest.pending)
+    folder_ids.discard(root_id)
+
+    folder_ids, file_ids = sorted(folder_ids), sorted(file_ids)
+    def fetch(item_type: str, item_id: str):
+        cancel.check()
+        return _fetch(client, item_type, item_id)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        fetched = pool.map(lambda folder_id: fetch("folder", folder_id), folder_ids)
+        folder_items = dict(zip(folder_ids, fetched))
+        fetched = pool.map(lambda file_id: fetch("file", file_id), file_ids)
+        file_items = dict(zip(file_ids, fetched))
+
+    # Current Box path of each known file, following folder renames and moves
+    paths: Dict[str, Optional[str]] = {
+        record["id"]: path for path, record in manifest.files.items()
+    }
+    remote: Dict[str, _RemoteFile] = {}
+    folders = manifest.folders
+
+    def known_path(folder_id: str) -> Optional[str]:
+        return next((path for path, id_ in folders.items() if id_ == folder_id), None)
+
+    # Parents before children, so a child's own move overrides its parent's
+    ordered = sorted(folder_ids, key=lambda folder_id: (
+        known_path(folder_id) is None, (known_path(folder_id) or "").count("/")
+    ))
+    for folder_id in ordered:
+        old_path, new_path = known_path(folder_id), _remote_path(folder_items[folder_id], root_id)
+        if old_path == new_path:
+            continue
+        if old_path is not None:
+            prefix = old_path + "/"
+            for path, id_ in list(folders.items()):
+                if path == old_path or path.startswith(prefix):
+                    del folders[path]
+                    if new_path is not None:
+                        folders[new_path + path[len(old_path):]] = id_
+            for file_id, path in paths.items():
+                if path is not None and path.startswith(prefix):
+                    paths[file_id] = new_path + path[len(old_path):] if new_path else None
+        else:
+            # Created, copied or moved into the synced folder
+            subfolders: Dict[str, str] = {}
+            for path, entry in walk_folder(client, folder_id, folders=subfolders, cancel=cancel):
+                remote[entry.id] = _RemoteFile(f"{new_path}/{path}", entry)
+            folders[new_path] = folder_id
+            folders.update({f"{new_path}/{path}": id_ for path, id_ in subfolders.items()})
+
+    for path, record in manifest.files.items():
+        if paths[record["id"]] != path:
+            remote[record["id"]] = _RemoteFile(paths[record["id"]])
+    for file_id, item in file_items.items():
+        path = _remote_path(item, root_id)
+        if path is not None or file_id in paths:
+            remote[file_id] = _RemoteFile(path, item if path is not None else None)
+    return remote, position
+
+
+def _scan_local(local_dir: str) -> Dict[str, os.stat_result]:
+    files = {}
+    for root, _, filenames in os.walk(local_dir):
+        relative = os.path.relpath(root, local_dir).replace(os.sep, "/")
+        prefix = "" if relative == "." else relative + "/"
+        for name in filenames:
+            if name.endswith(PART_SUFFIX) or name.startswith(MANIFEST_NAME):
+                continue
+            files[prefix + name] = os.stat(os.path.join(root, name))
+    return files
+
+
+def _plan(
+    manifest: Manifest,
+    remote: Dict[str, _RemoteFile],
+    local: Dict[str, os.stat_result],
+    local_dir: str,
+    policy: str,
+) -> List[_Item]:
+    hashes: Dict[str, str] = {}
+
+    def sha1(path: str) -> str:
+        if path not in hashes:
+            hashes[path] = sha1_of_file(os.path.join(local_dir, *path.split("/")))
+        return hashes[path]
+
+    def locally_modified(path: str, record: dict) -> bool:
+        stat = local[path]
+        if stat.st_size == record["size"] and stat.st_mtime_ns == record["mtime"]:
+            return False
+        return sha1(path) != record["sha1"]
+
+    def conflict(item: _Item, reason: str, local_wins: List[str], remote_wins: List[str]):
+        item.conflict = reason
+        item.actions += {"local": local_wins, "remote": remote_wins}.get(policy, [])
+
+    # A tracked file missing locally and an untracked one with the same
+    # content is a local rename or move
+    untracked = {path for path in local if path not in manifest.files}
+    by_content: Dict[str, List[str]] = {}
+    for path in untracked:
+        by_content.setdefault(sha1(path), []).append(path)
+    moved: Dict[str, str] = {}
+    for path, record in manifest.files.items():
+        candidates = by_content.get(record["sha1"])
+        if path not in local and candidates and len(candidates) == 1:
+            moved[record["id"]] = candidates.pop()
+            untracked.discard(moved[record["id"]])
+
+    items = []
+    for record_path, record in manifest.files.items():
+        file_id = record["id"]
+        change = remote.get(file_id)
+        remote_path = change.path if change else record_path
+        if remote_path is None and record_path not in local and file_id not in moved:
+            # Deleted on both sides
+            continue
+        item = _Item(
+            path=record_path,
+            file_id=file_id,
+            record_path=record_path,
+            record=record,
+            local_path=moved.get(file_id) or (record_path if record_path in local else None),
+            entry=change.entry if change else None,
+        )
+        items.append(item)
+        remote_modified = item.entry is not None and item.entry.sha_1 != record["sha1"]
+        local_modified = item.local_path == record_path and locally_modified(record_path, record)
+        if remote_modified and local_modified and sha1(record_path) == item.entry.sha_1:
+            # Same change on both sides
+            remote_modified = local_modified = False
+
+        if remote_path is None:
+            item.path = item.local_path
+            if local_modified:
+                conflict(item, "modified locally, deleted in Box", ["upload"], ["delete_local"])
+                if policy == "local":
+                    # Uploaded as a new file
+                    item.file_id = None
+            else:
+                item.actions.append("delete_local")
+            continue
+        if item.local_path is None:
+            item.path = remote_path
+            if remote_modified:
+                conflict(item, "deleted locally, modified in Box", ["delete_remote"], ["download"])
+            else:
+                item.actions.append("delete_remote")
+            continue
+
+        local_moved, remote_moved = item.local_path != record_path, remote_path != record_path
+        if local_moved and remote_moved and item.local_path != remote_path:
+            item.path = {"local": item.local_path}.get(policy, remote_path)
+            conflict(item, "renamed locally and in Box", ["rename_remote"], ["rename_local"])
+        elif remote_moved:
+            item.path = remote_path
+            item.actions.append("rename_local")
+        elif local_moved:
+            item.path = item.local_path
+            item.actions.append("rename_remote")
+        if local_modified and remote_modified:
+            conflict(item, "modified locally and in Box", ["upload"], ["download"])
+        elif remote_modified:
+            item.actions.append("download")
+        elif local_modified:
+            item.actions.append("upload")
+
+    # Files that left their path free for another one
+    vacated = {
+        item.local_path
+        for item in items
+        if item.path != item.local_path or "delete_local" in item.actions
+    }
+    tracked = {record["id"] for record in manifest.files.values()}
+    for file_id, change in remote.items():
+        if file_id in tracked or change.path is None:
+            continue
+        item = _Item(path=change.path, file_id=file_id, entry=change.entry)
+        items.append(item)
+        if change.path in untracked:
+            untracked.discard(change.path)
+            item.local_path = change.path
+            if sha1(change.path) != change.entry.sha_1:
+                conflict(item, "created locally and in Box", ["upload"], ["download"])
+        elif change.path in local and change.path not in vacated:
+            conflict(item, "path is used by another local file", [], ["download"])
+        else:
+            item.actions.append("download")
+
+    items += [_Item(path=path, local_path=path, actions=["upload"]) for path in sorted(untracked)]
+    for item in items:
+        if item.conflict and not item.actions:
+            item.status = "conflict"
+    return items
+
+
+def _remote_folder(client: "BoxClient", manifest: Manifest, path: str) -> str:
+    """Id of the Box folder for a relative directory path, creating missing levels."""
+    folder_id = manifest.folder_id
+    current = ""
+    for name in [part for part in path.split("/") if part]:
+        current = f"{current}/{name}" if current else name
+        if current not in manifest.folders:
+            manifest.folders[current] = ensure_folder(client, folder_id, name, {})[0]
+        folder_id = manifest.folders[current]
+    return folder_id
+
+
+def _remove_empty_parents(local_dir: str, path: str) -> None:
+    directory = os.path.dirname(path)
+    while directory and os.path.abspath(directory) != os.path.abspath(local_dir):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
+
+
+def _apply(
+    client: "BoxClient",
+    item: _Item,
+    local_dir: str,
+    parent_id: Optional[str],
+    cancel: CancelToken,
+) -> Optional[dict]:
+    """
+    Carry out an item's actions; returns its new manifest record, or None
+    when the file no longer exists on either side.
+    """
+    from box_sdk_gen.managers.files import UpdateFileByIdParent
+
+    def local(path: str) -> str:
+        return os.path.join(local_dir, *path.split("/"))
+
+    target = local(item.path)
+    name = item.path.rsplit("/", 1)[-1]
+    record = dict(item.record or {})
+    if item.entry is not None and "download" not in item.actions and "upload" not in item.actions:
+        record.update(sha1=item.entry.sha_1, etag=item.entry.etag)
+
+    for action in item.actions:
+        if action == "delete_local":
+            os.remove(local(item.local_path))
+            _remove_empty_parents(local_dir, local(item.local_path))
+            return None
+        if action == "delete_remote":
+            etag = item.entry.etag if item.entry is not None else record.get("etag")
+            client.files.delete_file_by_id(item.file_id, if_match=etag)
+            return None
+        if action == "rename_local":
+            if os.path.exists(target):
+                raise FileExistsError(f"{item.path} already exists locally")
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            os.rename(local(item.local_path), target)
+            _remove_empty_parents(local_dir, local(item.local_path))
+        elif action == "rename_remote":
+            moved = client.files.update_file_by_id(
+                item.file_id, name=name, parent=UpdateFileByIdParent(id=parent_id)
+            )
+            record["etag"] = moved.etag
+        elif action == "download":
+            entry = item.entry or SimpleNamespace(
+                id=item.file_id, size=None, sha_1=record.get("sha1"), etag=record.get("etag")
+            )
+            result = download_file_to(client, entry, target, cancel=cancel)
+            if result.status == "failed":
+                raise RuntimeError(result.error)
+            item.bytes += result.bytes
+            record.update(sha1=entry.sha_1, etag=entry.etag)
+        elif action == "upload":
+            existing = None
+            if item.file_id:
+                existing = SimpleNamespace(type="file", id=item.file_id, sha_1=None)
+            result = upload_file_from(client, target, name, parent_id, existing, cancel=cancel)
+            if result.status == "failed":
+                raise RuntimeError(result.error)
+            item.file_id = result.file_id
+            item.bytes += result.bytes
+            # The upload changed the etag, and Box does not return the new one
+            record.update(sha1=result.sha1, etag=None)
+
+    stat = os.stat(target)
+    record.update(id=item.file_id, size=stat.st_size, mtime=stat.st_mtime_ns)
+    if "sha1" not in record:
+        record["sha1"] = sha1_of_file(target)
+    return record
+
+
+def sync_folder(
+    client: "BoxClient",
+    folder_id: str,
+    local_dir: str,
+    conflict_policy: str = "report",
+    full_rescan: bool = False,
+    dry_run: bool = False,
+    max_concurrency: int = 8,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[CancelToken] = None,
+) -> dict:
+    """
+    Bring a Box folder and a local directory in line with each other.
+
+    The first sync (or one with `full_rescan`) lists the whole folder; later
+    ones only look at what the Box events stream reports as changed since
+    the previous sync.
+
+    Args:
+        conflict_policy: "report" leaves conflicts alone, "local" or "remote"
+            makes that side's version win.
+        dry_run: Plan the actions without carrying them out.
+        progress: Called with (files done, files total) as changes are applied.
+        cancel: When cancelled, changes not started yet are skipped and
+            OperationCancelled is raised once the manifest is saved.
+    """
+    from box_sdk_gen import BoxAPIError
+
+    if conflict_policy not in CONFLICT_POLICIES:
+        raise ValueError(f"conflict_policy must be one of {', '.join(CONFLICT_POLICIES)}")
+    started = time.monotonic()
+    cancel = cancel or CancelToken()
+    os.makedirs(local_dir, exist_ok=True)
+    manifest = Manifest.load(local_dir, folder_id) or Manifest(folder_id)
+
+    mode = "incremental"
+    remote = None
+    if manifest.stream_position and not full_rescan:
+        try:
+            remote, position = _incremental_scan(client, manifest, max_concurrency, cancel)
+        except BoxAPIError as e:
+            # Box only keeps a few weeks of events
+            logger.warning("Falling back to a full scan of folder %s: %s", folder_id, e)
+    if remote is None:
+        mode = "full"
+        # Taken before listing, so changes made during the listing are seen next time
+        position = _stream_position(client)
+        remote = _full_scan(client, manifest, cancel)
+
+    items = _plan(manifest, remote, _scan_local(local_dir), local_dir, conflict_policy)
+    changed = [item for item in items if item.actions or item.conflict]
+
+    if not dry_run:
+        parents: Dict[str, Optional[str]] = {}
+        for item in changed:
+            if item.status == "planned" and {"upload", "rename_remote"} & set(item.actions):
+                directory = item.path.rpartition("/")[0]
+                try:
+                    if directory not in parents:
+                        parents[directory] = _remote_folder(client, manifest, directory)
+                except Exception as e:
+                    item.status, item.error = "failed", f"Could not create folder {directory}: {e}"
+
+        planned = [item for item in items if item.status == "planned"]
+        applied = [0]
+        lock = threading.Lock()
+
+        def apply(item: _Item) -> Optional[dict]:
+            if item.status != "planned":
+                return item.record
+            try:
+                cancel.check()
+                record = _apply(
+                    client, item, local_dir, parents.get(item.path.rpartition("/")[0]), cancel
+                )
+                item.status = "done"
+                return record
+            except OperationCancelled as e:
+                item.status, item.error = "cancelled", str(e)
+                return item.record
+            except Exception as e:
+                item.status, item.error = "failed", str(e)
+                return item.record
+            finally:
+                if progress:
+                    with lock:
+                        applied[0] += 1
+                        done = applied[0]
+                    progress(done, len(planned))
+
+        # Deletes and renames free paths that downloads may reuse
+        first = [item for item in items if not {"download", "upload"} & set(item.actions)]
+        second = [item for item in items if {"download", "upload"} & set(item.actions)]
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            records = list(zip(first, pool.map(apply, first)))
+            records += list(zip(second, pool.map(apply, second)))
+
+        manifest.files = {}
+        manifest.pending = []
+        for item, record in records:
+            unsettled = item.status in ("conflict", "failed", "cancelled")
+            if record is not None:
+                manifest.files[item.record_path if unsettled else item.path] = record
+            if unsettled and item.file_id:
+                manifest.pending.append(item.file_id)
+        manifest.stream_position = position
+        manifest.save(local_dir)
+        cancel.check()
+
+    summary: dict = {"files": len(items), "changed": len(changed)}
+    for item in changed:
+        summary[item.status] = summary.get(item.status, 0) + 1
+        for action in item.actions:
+            summary[action] = summary.get(action, 0) + 1
+    summary["bytes"] = sum(item.bytes for item in changed)
+    summary["seconds"] = round(time.monotonic() - started, 3)
+    return {
+        "folder_id": folder_id,
+        "local_path": local_dir,
+        "mode": mode,
+        "dry_run": dry_run,
+        "summary": summary,
+        "changes": [item.to_dict() for item in changed],
+    }
@@ -0,0 +1,308 @@
+"""
+Local full-text index of extracted file text.
+
+Every keyword lookup through Box search is a round trip to the API, even
+when the agent has already read the documents it is looking in. Text
+extracted by box_read_tool is kept in a SQLite FTS5 index instead, and a
+background indexer can keep chosen folders indexed, so keyword searches over
+that corpus are answered locally with ranked snippets in milliseconds.
+
+Documents are stored per identity (see BoxContext.identity_for), so a search
+only returns text its caller was able to read. The index is dropped entry by
+entry through the InvalidationBus, like the other caches.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from box_sdk_gen import BoxClient
+
+logger = logging.getLogger(__name__)
+
+# Weight of a match in the file name relative to one in the text
+NAME_WEIGHT = 5.0
+SNIPPET_TOKENS = 24
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    identity TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    name TEXT,
+    sha1 TEXT,
+    root_id TEXT,
+    size INTEGER NOT NULL,
+    indexed_at REAL NOT NULL,
+    UNIQUE (identity, file_id)
+);
+CREATE INDEX IF NOT EXISTS documents_root ON documents (identity, root_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    name, text, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def match_expression(query: str) -> str:
+    """
+    FTS5 query matching documents that contain every word of `query`.
+
+    Words are quoted so that punctuation and FTS5 operators in user input
+    are searched for rather than interpreted.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        raise ValueError("query must contain at least one word")
+    return " ".join(f'"{word}"' for word in words)
+
+
+class TextIndex:
+    """
+    SQLite FTS5 index of extracted text, safe to use from several threads.
+
+    Args:
+        path: Database file, or ":memory:".
+        max_chars: Longer texts are indexed up to this many characters.
+    """
+
+    def __init__(self, path: str, max_chars: int = 10_000_000):
+        self.path = path
+        self.max_chars = max_chars
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            # Readers in other server processes do not block the writer
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.added = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["TextIndex"]:
+        """The index at BOX_TEXT_INDEX, or None when it is not set."""
+        path = os.getenv("BOX_TEXT_INDEX")
+        if not path:
+            return None
+        return cls(os.path.expanduser(path))
+
+    def add(
+        self,
+        file_id: str,
+        text: str,
+        identity: str = "",
+        name: Optional[str] = None,
+        sha1: Optional[str] = None,
+        root_id: Optional[str] = None,
+    ) -> None:
+        """Index (or re-index) the text of a file."""
+        text = text[: self.max_chars]
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            row = self._db.execute(
+                "SELECT id, name, root_id FROM documents WHERE identity = ? AND file_id = ?",
+                (identity, file_id),
+            ).fetchone()
+            if row is not None:
+                # Reads through box_read_tool do not know the name or folder
+                name = name or row[1]
+                root_id = root_id or row[2]
+                self._db.execute("DELETE FROM documents_fts WHERE rowid = ?", (row[0],))
+                self._db.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+            cursor = self._db.execute(
+                "INSERT INTO documents (identity, file_id, name, sha1, root_id, size, indexed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (identity, file_id, name, sha1, root_id, len(text), time.time()),
+            )
+            self._db.execute(
+                "INSERT INTO documents_fts (rowid, name, text) VALUES (?, ?, ?)",
+                (cursor.lastrowid, name or "", text),
+            )
+        self.added += 1
+
+    def search(self, query: str, identity: str = "", limit: int = 10) -> List[dict]:
+        """Documents matching every word of `query`, best first, with a snippet."""
+        expression = match_expression(query)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT d.file_id, d.name, bm25(documents_fts, ?, 1.0) AS score,"
+                " snippet(documents_fts, 1, '[', ']', '...', ?), d.indexed_at"
+                " FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid"
+                " WHERE documents_fts MATCH ? AND d.identity = ?"
+                " ORDER BY score LIMIT ?",
+                (NAME_WEIGHT, SNIPPET_TOKENS, expression, identity, limit),
+            ).fetchall()
+        self.searches += 1
+        return [
+            {
+                "file_id": file_id,
+                "name": name,
+                # bm25() is lower for better matches
+                "score": round(-score, 3),
+                "snippet": snippet,
+                "indexed_at": round(indexed_at),
+            }
+            for file_id, name, score, snippet, indexed_at in rows
+        ]
+
+    def documents(self, root_id: str, identity: str = "") -> Dict[str, Optional[str]]:
+        """file_id -> sha1 of the documents indexed from the folder `root_id`."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT file_id, sha1 FROM documents WHERE identity = ? AND root_id = ?",
+                (identity, root_id),
+            ).fetchall()
+        return dict(rows)
+
+    def remove(self, file_id: str, identity: Optional[str] = None) -> None:
+        """Drop a file, for one identity or for all of them."""
+        condition, params = "file_id = ?", [file_id]
+        if identity is not None:
+            condition, params = condition + " AND identity = ?", params + [identity]
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                "DELETE FROM documents_fts WHERE rowid IN"
+                f" (SELECT id FROM documents WHERE {condition})",
+                params,
+            )
+            self._db.execute(f"DELETE FROM documents WHERE {condition}", params)
+
+    def invalidate(self, file_id: str) -> None:
+        self.remove(file_id)
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM documents_fts")
+            self._db.execute("DELETE FROM documents")
+
+    def stats(self) -> dict:
+        with self._lock:
+            documents, chars = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents"
+            ).fetchone()
+        return {
+            "path": self.path,
+            "documents": documents,
+            "characters": chars,
+            "added": self.added,
+            "searches": self.searches,
+        }
+
+
+class TextIndexer:
+    """
+    Daemon thread that keeps the files of some folders in a TextIndex.
+
+    Each pass lists the folders recursively and extracts only the files
+    whose SHA-1 changed since they were indexed; files no longer in a folder
+    are dropped. Files are indexed for the server's own identity.
+
+    Args:
+        client_provider: Returns the Box client; called on every pass.
+        interval: Seconds between the start of two passes.
+        max_file_size: Larger files are not extracted.
+        mirrors: Other indexes (with the add and remove methods of
+            TextIndex) that are given the same files.
+    """
+
+    def __init__(
+        self,
+        client_provider: Callable[[], "BoxClient"],
+        index: TextIndex,
+        folder_ids: List[str],
+        interval: float = 3600,
+        max_concurrency: int = 4,
+        max_file_size: int = 100 * 1024 * 1024,
+        mirrors: Sequence = (),
+    ):
+        self._client_provider = client_provider
+        self.index = index
+        self.folder_ids = folder_ids
+        self.interval = interval
+        self.max_concurrency = max_concurrency
+        self.max_file_size = max_file_size
+        self.mirrors = list(mirrors)
+        self.passes = 0
+        self.extracted = 0
+        self.removed = 0
+        self.failures = 0
+        self.last_pass_seconds: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="box-text-indexer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.index_once()
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Text indexing pass failed: %s", e)
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def index_once(self) -> None:
+        """Bring the index in line with the current content of the folders."""
+        from box_transfer import walk_folder
+
+        started = time.monotonic()
+        client = self._client_provider()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            for root_id in self.folder_ids:
+                indexed = self.index.documents(root_id)
+                seen = set()
+                for _, entry in walk_folder(client, root_id):
+                    seen.add(entry.id)
+                    if entry.size and entry.size > self.max_file_size:
+                        continue
+                    if entry.id in indexed and indexed[entry.id] == entry.sha_1:
+                        continue
+                    pool.submit(self._extract, client, entry, root_id)
+                for file_id in set(indexed) - seen:
+                    for index in [self.index] + self.mirrors:
+                        index.remove(file_id, identity="")
+                    self.removed += 1
+        self.passes += 1
+        self.last_pass_seconds = round(time.monotonic() - started, 3)
+
+    def _extract(self, client: "BoxClient", entry, root_id: str) -> None:
+        from box_ai_agents_toolkit import box_file_text_extract
+
+        try:
+            text = box_file_text_extract(client, entry.id)
+            for mirror in self.mirrors:
+                mirror.add(entry.id, text, name=entry.name)
+            # Last, so a file whose mirrors failed is extracted again next pass
+            self.index.add(entry.id, text, name=entry.name, sha1=entry.sha_1, root_id=root_id)
+            self.extracted += 1
+        except Exception as e:
+            self.failures += 1
+            logger.warning("Could not index file %s: %s", entry.id, e)
+
+    def stats(self) -> dict:
+        return {
+            "folders": self.folder_ids,
+            "passes": self.passes,
+            "extracted": self.extracted,
+            "removed": self.removed,
+            "failures": self.failures,
+            "last_pass_seconds": self.last_pass_seconds,
+        }
@@ -0,0 +1,286 @@
+"""
+Cross-process OAuth token storage and proactive token refresh.
+
+Every server process on a host reads and writes one JSON token file, guarded
+by an advisory file lock. A background thread in each process renews the
+access token shortly before it expires; whichever process takes the lock
+first performs the refresh and the others pick up the new token from the
+file. This keeps refreshes off the request path and stops replicas from
+racing each other with the same single-use refresh token.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from box_sdk_gen import (
+    AccessToken,
+    BoxOAuth,
+    FileWithInMemoryCacheTokenStorage,
+    NetworkSession,
+    OAuthConfig,
+    TokenStorage,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Box access tokens last about an hour; used when a token has no expires_in
+DEFAULT_EXPIRES_IN = 3600
+
+
+class SharedFileTokenStorage(TokenStorage):
+    """
+    Token storage backed by a JSON file shared between processes.
+
+    The file records the token and its absolute expiry time. Reads are served
+    from memory and only hit the disk when the file has changed, so checking
+    the token on every API call stays cheap.
+    """
+
+    def __init__(
+        self,
+        filename: str = ".auth.oauth.json",
+        legacy_filename: Optional[str] = ".auth.oauth",
+    ):
+        self.filename = filename
+        self.lock_filename = f"{filename}.lock"
+        # Token storage written by box_ai_agents_toolkit's authorize_app
+        self.legacy_filename = legacy_filename
+        self._record: Optional[dict] = None
+        self._record_mtime: Optional[float] = None
+        # Modification time of the legacy storage when last imported
+        self._legacy_mtime: Optional[float] = None
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_file = None
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Hold the token lock across threads and processes. Re-entrant."""
+        with self._thread_lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                self._lock_file = open(self.lock_filename, "a+")
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def store(self, token: AccessToken) -> None:
+        expires_in = token.expires_in or DEFAULT_EXPIRES_IN
+        self._write({"token": token.to_dict(), "expires_at": time.time() + expires_in})
+
+    def get(self) -> Optional[AccessToken]:
+        record = self._load()
+        return AccessToken.from_dict(record["token"]) if record else None
+
+    def clear(self) -> None:
+        with self.lock():
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            self._record = None
+            self._record_mtime = None
+
+    def expires_at(self) -> Optional[float]:
+        """Absolute expiry time (epoch seconds) of the stored token, if any."""
+        record = self._load()
+        return record["expires_at"] if record else None
+
+    def _write(self, record: dict) -> None:
+        with self.lock():
+            tmp_filename = f"{self.filename}.{os.getpid()}.tmp"
+            fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(tmp_filename, self.filename)
+            self._record = record
+            self._record_mtime = os.stat(self.filename).st_mtime
+
+    def _load(self) -> Optional[dict]:
+        try:
+            mtime: Optional[float] = os.stat(self.filename).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        # authorize_app writes the legacy storage only, so a legacy file newer
+        # than the shared one holds a fresh authorization
+        legacy_mtime = self._legacy_modified()
+        if legacy_mtime is not None and legacy_mtime != self._legacy_mtime:
+            if mtime is None or legacy_mtime > mtime:
+                record = self._import_legacy()
+                if record is not None:
+                    return record
+        if mtime is None:
+            return None
+        if mtime != self._record_mtime:
+            try:
+                with open(self.filename, "r", encoding="utf-8") as f:
+                    self._record = json.load(f)
+                self._record_mtime = mtime
+            except (OSError, ValueError):
+                # Caught mid-replace on a platform without atomic rename;
+                # keep serving the token we already have.
+                logger.debug("Could not read token file %s", self.filename)
+        return self._record
+
+    def _legacy_paths(self) -> List[str]:
+        if not self.legacy_filename:
+            return []
+        # shelve may add a suffix depending on the dbm backend
+        candidates = [self.legacy_filename, f"{self.legacy_filename}.db", f"{self.legacy_filename}.dat"]
+        return [path for path in candidates if os.path.exists(path)]
+
+    def _legacy_modified(self) -> Optional[float]:
+        paths = self._legacy_paths()
+        return max(os.stat(path).st_mtime for path in paths) if paths else None
+
+    def _import_legacy(self) -> Optional[dict]:
+        """Copy the token of the toolkit's shelve storage to the shared file."""
+        token = FileWithInMemoryCacheTokenStorage(self.legacy_filename).get()
+        # The shelve file does not record when the token was issued; its
+        # modification time is the best available estimate.
+        issued_at = self._legacy_modified()
+        self._legacy_mtime = issued_at
+        if token is None or issued_at is None:
+            return None
+        expires_in = token.expires_in or DEFAULT_EXPIRES_IN
+        with self.lock():
+            # Another process may have imported it while we waited
+            try:
+                if os.stat(self.filename).st_mtime >= issued_at:
+                    return None
+            except FileNotFoundError:
+                pass
+            self._write({"token": token.to_dict(), "expires_at": issued_at + expires_in})
+        logger.info("Imported OAuth token from %s", self.legacy_filename)
+        return self._record
+
+
+class SharedTokenOAuth(BoxOAuth):
+    """
+    BoxOAuth whose refreshes are serialized across processes.
+
+    Box refresh tokens are single use. If another process refreshed while we
+    waited for the lock, the token it stored is returned instead of spending
+    the (now invalid) refresh token again.
+    """
+
+    token_storage: SharedFileTokenStorage
+
+    def refresh_token(
+        self, *, network_session: Optional[NetworkSession] = None
+    ) -> AccessToken:
+        stale = self.token_storage.get()
+        with self.token_storage.lock():
+            current = self.token_storage.get()
+            if (
+                current is not None
+                and stale is not None
+                and current.access_token != stale.access_token
+            ):
+                return current
+            return super().refresh_token(network_session=network_session)
+
+    def refresh_if_expiring(
+        self, margin: float, network_session: Optional[NetworkSession] = None
+    ) -> bool:
+        """Refresh when the stored token expires within `margin` seconds."""
+        with self.token_storage.lock():
+            expires_at = self.token_storage.expires_at()
+            if expires_at is None or expires_at - time.time() > margin:
+                return False
+            super().refresh_token(network_session=network_session)
+            return True
+
+
+class TokenRefresher:
+    """
+    Daemon thread that renews the access token before it expires.
+
+    It wakes up `margin` seconds ahead of expiry. When the refresh fails
+    (network error, revoked grant) it retries every `retry_interval` seconds
+    and leaves in-line refresh by the SDK as the last resort.
+    """
+
+    def __init__(
+        self,
+        auth: SharedTokenOAuth,
+        margin: float = 600,
+        retry_interval: float = 30,
+        max_sleep: float = 300,
+        network_session: Optional[NetworkSession] = None,
+    ):
+        self.auth = auth
+        self.network_session = network_session
+        self.margin = margin
+        self.retry_interval = retry_interval
+        # Re-check periodically so tokens refreshed by other processes, or a
+        # fresh authorization, are noticed without a restart.
+        self.max_sleep = max_sleep
+        self.refreshes = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="box-token-refresher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def seconds_until_due(self) -> float:
+        expires_at = self.auth.token_storage.expires_at()
+        if expires_at is None:
+            return self.max_sleep
+        return max(0.0, expires_at - self.margin - time.time())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            delay = min(self.seconds_until_due(), self.max_sleep)
+            if delay > 0:
+                self._stop.wait(delay)
+                continue
+            try:
+                if self.auth.refresh_if_expiring(self.margin, self.network_session):
+                    self.refreshes += 1
+                    logger.info("Refreshed Box access token ahead of expiry")
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Proactive Box token refresh failed: %s", e)
+                self._stop.wait(self.retry_interval)
+
+    def stats(self) -> dict:
+        expires_at = self.auth.token_storage.expires_at()
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "expires_in": round(expires_at - time.time()) if expires_at else None,
+        }
+
+
+def get_shared_oauth(config: OAuthConfig, filename: str) -> SharedTokenOAuth:
+    """Build a SharedTokenOAuth using the client credentials from `config`."""
+    return SharedTokenOAuth(
+        OAuthConfig(
+            client_id=config.client_id,
+            client_secret=config.client_secret,
+            token_storage=SharedFileTokenStorage(filename),
+        )
+    )
@@ -0,0 +1,660 @@
+"""
+Bulk transfers between Box folders and the local filesystem.
+
+Copying a folder one `box_download_file_tool` call at a time costs an agent
+turn, a metadata call and a full in-memory copy per file. The helpers here
+walk a folder once, transfer files on a bounded thread pool and stream every
+file in chunks, so memory use does not depend on file size.
+
+Transfers are restartable: a file whose copy on the other side has the same
+SHA-1 is skipped, and an interrupted download continues from its `.part`
+file with an HTTP Range request. A cancelled transfer stops between chunks:
+files in flight are removed, or their upload session deleted, and files not
+started yet are dropped. Parts of a chunked upload are buffered only while
+the memory budget allows it, and otherwise streamed from disk.
+"""
+
+import base64
+import hashlib
+import io
+import logging
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
+from box_cancel import CancelToken, OperationCancelled
+from box_memory import ByteBudget
+
+if TYPE_CHECKING:
+    from box_sdk_gen import BoxClient
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+# The SDK's download stream grows its buffer 1 KiB at a time, so the cost
+# of one read grows with the square of its size; keep network reads small.
+NETWORK_READ_SIZE = 64 * 1024
+PART_SUFFIX = ".part"
+# Box recommends chunked uploads above 50 MB
+CHUNKED_UPLOAD_MIN_SIZE = 50 * 1024 * 1024
+
+_ITEM_FIELDS = ["id", "type", "name", "size", "sha1", "etag"]
+
+# Called with (files done, files total) as a transfer progresses
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass
+class TransferResult:
+    path: str
+    file_id: Optional[str]
+    # downloaded, resumed, uploaded, updated, skipped or failed
+    status: str
+    bytes: int = 0
+    sha1: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+def sha1_of_file(path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def local_copy_matches(path: str, size: Optional[int], sha1: Optional[str]) -> bool:
+    """True when `path` exists with the given size and SHA-1."""
+    try:
+        if size is not None and os.path.getsize(path) != size:
+            return False
+    except OSError:
+        return False
+    return sha1 is not None and sha1_of_file(path) == sha1
+
+
+def safe_name(name: str) -> str:
+    """A Box item name made safe to use as one local path component."""
+    # Box names cannot contain slashes, but "." and ".." are valid names
+    if name in (".", ".."):
+        return name.replace(".", "_")
+    return name.replace("/", "_").replace("\\", "_")
+
+
+def walk_folder(
+    client: "BoxClient",
+    folder_id: str,
+    recursive: bool = True,
+    folders: Optional[Dict[str, str]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Iterator[Tuple[str, object]]:
+    """
+    Yield (relative path, file) for the files of a folder, using "/" separators.
+    When given, `folders` collects the relative path and id of each subfolder.
+    """
+    cancel = cancel or CancelToken()
+    pending = [(folder_id, "")]
+    while pending:
+        current_id, prefix = pending.pop()
+        marker = None
+        while True:
+            cancel.check()
+            items = client.folders.get_folder_items(
+                current_id, fields=_ITEM_FIELDS, usemarker=True, marker=marker, limit=1000
+            )
+            for entry in items.entries or []:
+                path = prefix + safe_name(entry.name)
+                if entry.type == "folder":
+                    if recursive:
+                        pending.append((entry.id, path + "/"))
+                        if folders is not None:
+                            folders[path] = entry.id
+                elif entry.type == "file":
+                    yield path, entry
+            marker = items.next_marker
+            if not marker:
+                break
+
+
+def download_file_to(
+    client: "BoxClient",
+    entry,
+    target: str,
+    retry: bool = True,
+    cancel: Optional[CancelToken] = None,
+) -> TransferResult:
+    """
+    Stream one file to `target`, continuing a previous partial download.
+
+    Raises OperationCancelled when `cancel` is cancelled, leaving the partial
+    file for the next call to continue from; other failures are reported in
+    the result.
+    """
+    cancel = cancel or CancelToken()
+    cancel.check()
+    result = TransferResult(path=target, file_id=entry.id, status="downloaded")
+    part = target + PART_SUFFIX
+    try:
+        if local_copy_matches(target, entry.size, entry.sha_1):
+            result.status = "skipped"
+            return result
+
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        sha1 = hashlib.sha1()
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if offset and (entry.size is None or offset >= entry.size):
+            offset = 0
+        if offset:
+            with open(part, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha1.update(chunk)
+            result.status = "resumed"
+
+        stream = client.downloads.download_file(
+            entry.id, range=f"bytes={offset}-" if offset else None
+        )
+        with open(part, "ab" if offset else "wb") as f:
+            for chunk in cancel.chunks(iter(lambda: stream.read(NETWORK_READ_SIZE), b"")):
+                sha1.update(chunk)
+                f.write(chunk)
+                result.bytes += len(chunk)
+
+        if entry.sha_1 and sha1.hexdigest() != entry.sha_1:
+            os.remove(part)
+            if offset and retry:
+                # The partial file was stale or the server ignored the range
+                return download_file_to(client, entry, target, retry=False, cancel=cancel)
+            raise ValueError("SHA-1 of the downloaded content does not match Box")
+        os.replace(part, target)
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        result.status = "failed"
+        result.error = str(e)
+    return result
+
+
+def _summary(results: List[TransferResult], started: float) -> dict:
+    summary: dict = {"files": len(results)}
+    for result in results:
+        summary[result.status] = summary.get(result.status, 0) + 1
+    summary["bytes"] = sum(result.bytes for result in results)
+    summary["seconds"] = round(time.monotonic() - started, 3)
+    return summary
+
+
+def download_folder(
+    client: "BoxClient",
+    folder_id: str,
+    local_path: str,
+    recursive: bool = True,
+    max_concurrency: int = 8,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[CancelToken] = None,
+) -> dict:
+    """
+    Download the files of a Box folder into a directory, or into a zip
+    archive when `local_path` ends with ".zip".
+    """
+    started = time.monotonic()
+    cancel = cancel or CancelToken()
+    files = list(walk_folder(client, folder_id, recursive, cancel=cancel))
+    if local_path.lower().endswith(".zip"):
+        results = _download_to_zip(client, files, local_path, max_concurrency, progress, cancel)
+    else:
+        results = _download_to_directory(
+            client, files, local_path, max_concurrency, progress, cancel
+        )
+    return {
+        "folder_id": folder_id,
+        "local_path": local_path,
+        "summary": _summary(results, started),
+        "files": [result.to_dict() for result in results],
+    }
+
+
+def _download_to_directory(
+    client, files, directory: str, max_concurrency: int, progress, cancel: CancelToken
+) -> List[TransferResult]:
+    results = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = [
+            pool.submit(
+                download_file_to,
+                client,
+                entry,
+                os.path.join(directory, *path.split("/")),
+                cancel=cancel,
+            )
+            for path, entry in files
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if progress:
+                progress(len(results), len(files))
+    # Report paths relative to the target directory
+    for result in results:
+        result.path = os.path.relpath(result.path, directory).replace(os.sep, "/")
+    return sorted(results, key=lambda result: result.path)
+
+
+def _zip_entry_sha1(archive: zipfile.ZipFile, name: str) -> str:
+    sha1 = hashlib.sha1()
+    with archive.open(name) as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _download_to_zip(
+    client, files, zip_path: str, max_concurrency: int, progress, cancel: CancelToken
+) -> List[TransferResult]:
+    """
+    Files are downloaded in parallel into a staging directory next to the
+    archive, then copied into it one at a time (zip writes are sequential).
+    The staging directory holds the partial downloads of interrupted runs.
+    """
+    staging = zip_path + ".parts"
+    os.makedirs(staging, exist_ok=True)
+    try:
+        archive = zipfile.ZipFile(
+            zip_path,
+            "a" if os.path.exists(zip_path) else "w",
+            compression=zipfile.ZIP_DEFLATED,
+        )
+    except zipfile.BadZipFile:
+        # Interrupted before the archive was finalized; its files are
+        # downloaded again from the staging directory or from Box
+        logger.warning("Starting over damaged archive %s", zip_path)
+        archive = zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    results = []
+    with archive, ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        in_archive = set(archive.namelist())
+        futures = {}
+        for path, entry in files:
+            if path in in_archive:
+                if _zip_entry_sha1(archive, path) == entry.sha_1:
+                    results.append(TransferResult(path, entry.id, "skipped"))
+                else:
+                    results.append(
+                        TransferResult(
+                            path,
+                            entry.id,
+                            "failed",
+                            error="The archive has a different version of this file; use a new archive",
+                        )
+                    )
+                continue
+            target = os.path.join(staging, *path.split("/"))
+            futures[pool.submit(download_file_to, client, entry, target, cancel=cancel)] = path
+
+        for future in as_completed(futures):
+            result = future.result()
+            staged, result.path = result.path, futures[future]
+            if result.status != "failed":
+                if result.status == "skipped":
+                    # Fully downloaded by an interrupted run
+                    result.status = "resumed"
+                try:
+                    with open(staged, "rb") as source, archive.open(
+                        result.path, "w", force_zip64=True
+                    ) as destination:
+                        shutil.copyfileobj(source, destination, CHUNK_SIZE)
+                    os.remove(staged)
+                except Exception as e:
+                    result.status = "failed"
+                    result.error = str(e)
+            results.append(result)
+            if progress:
+                progress(len(results), len(files))
+
+    if not any(result.status == "failed" for result in results):
+        shutil.rmtree(staging, ignore_errors=True)
+    return sorted(results, key=lambda result: result.path)
+
+
+def _list_folder(client: "BoxClient", folder_id: str) -> Dict[str, object]:
+    """Items of one folder (not recursive) by name."""
+    items_by_name = {}
+    marker = None
+    while True:
+        items = client.folders.get_folder_items(
+            folder_id, fields=_ITEM_FIELDS, usemarker=True, marker=marker, limit=1000
+        )
+        for entry in items.entries or []:
+            items_by_name[entry.name] = entry
+        marker = items.next_marker
+        if not marker:
+            return items_by_name
+
+
+def ensure_folder(
+    client: "BoxClient", parent_id: str, name: str, existing: Dict[str, object]
+) -> Tuple[str, Dict[str, object], bool]:
+    """
+    Id and items of the folder `name` in `parent_id`, and whether it had to
+    be created.
+    """
+    from box_sdk_gen import BoxAPIError, CreateFolderParent
+
+    entry = existing.get(name)
+    if entry is not None:
+        if entry.type != "folder":
+            raise ValueError(f"{name} already exists in Box and is not a folder")
+        return entry.id, _list_folder(client, entry.id), False
+    try:
+        folder = client.folders.create_folder(name, CreateFolderParent(id=parent_id))
+        return folder.id, {}, True
+    except BoxAPIError as e:
+        # Created concurrently by someone else since we listed the parent
+        conflicts = (e.response_info.context_info or {}).get("conflicts") or []
+        if e.response_info.status_code == 409 and conflicts:
+            folder_id = conflicts[0]["id"]
+            return folder_id, _list_folder(client, folder_id), False
+        raise
+
+
+class _FileSlice:
+    """`length` bytes of a file from `offset`, read as a stream."""
+
+    def __init__(self, file, offset: int, length: int):
+        self._file = file
+        self._offset = offset
+        self._length = length
+        self._position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self._length - self._position
+        if size < 0 or size > remaining:
+            size = remaining
+        self._file.seek(self._offset + self._position)
+        data = self._file.read(size)
+        self._position += len(data)
+        return data
+
+    def __len__(self) -> int:
+        return self._length
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, position: int, whence: int = 0) -> int:
+        base = {0: 0, 1: self._position, 2: self._length}[whence]
+        self._position = min(max(0, base + position), self._length)
+        return self._position
+
+    def seekable(self) -> bool:
+        return True
+
+
+def _upload_in_parts(
+    client: "BoxClient",
+    f,
+    name: str,
+    size: int,
+    parent_id: str,
+    cancel: CancelToken,
+    budget: Optional[ByteBudget] = None,
+    on_bytes: Optional[Callable[[int], None]] = None,
+):
+    """
+    Chunked upload that checks `cancel` between parts and deletes the upload
+    session when it does not complete, instead of leaving it open in Box.
+    A part is buffered when `budget` can hold it; otherwise it is hashed on
+    disk first and then streamed from the file.
+    """
+
+    def digest(sha1) -> str:
+        return "sha=" + base64.b64encode(sha1.digest()).decode()
+
+    session = client.chunked_uploads.create_file_upload_session(parent_id, size, name)
+    try:
+        parts, file_sha1, offset = [], hashlib.sha1(), 0
+        while offset < size:
+            cancel.check()
+            length = min(session.part_size, size - offset)
+            part_sha1 = hashlib.sha1()
+            reservation = budget.try_reserve(length) if budget is not None else None
+            f.seek(offset)
+            if budget is None or reservation is not None:
+                body = io.BytesIO(f.read(length))
+                hashed = body.getbuffer()
+                if len(hashed) != length:
+                    raise ValueError(f"{name} became shorter while it was uploaded")
+                part_sha1.update(hashed)
+                file_sha1.update(hashed)
+                del hashed
+            else:
+                remaining = length
+                while remaining:
+                    block = f.read(min(CHUNK_SIZE, remaining))
+                    if not block:
+                        raise ValueError(f"{name} became shorter while it was uploaded")
+                    part_sha1.update(block)
+                    file_sha1.update(block)
+                    remaining -= len(block)
+                body = _FileSlice(f, offset, length)
+            try:
+                uploaded = client.chunked_uploads.upload_file_part(
+                    session.id,
+                    body,
+                    digest(part_sha1),
+                    f"bytes {offset}-{offset + length - 1}/{size}",
+                )
+            finally:
+                del body
+                if reservation is not None:
+                    reservation.release()
+            parts.append(uploaded.part)
+            offset += length
+            if on_bytes is not None:
+                on_bytes(length)
+        # Box answers 202 without the file while it still processes parts
+        for _ in range(10):
+            cancel.check()
+            committed = client.chunked_uploads.create_file_upload_session_commit(
+                session.id, parts, digest(file_sha1)
+            )
+            if committed is not None:
+                return committed.entries[0]
+            cancel.sleep(1)
+        raise TimeoutError(f"Box did not finish processing the parts of {name}")
+    except BaseException:
+        try:
+            client.chunked_uploads.delete_file_upload_session_by_id(session.id)
+        except Exception as e:
+            logger.warning("Could not delete upload session %s: %s", session.id, e)
+        raise
+
+
+class _ProgressReader:
+    """File wrapper that reports the number of bytes read."""
+
+    def __init__(self, file, callback: Callable[[int], None]):
+        self._file = file
+        self._callback = callback
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._callback(len(data))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def upload_file_from(
+    client: "BoxClient",
+    path: str,
+    name: str,
+    parent_id: str,
+    existing=None,
+    on_bytes: Optional[Callable[[int], None]] = None,
+    cancel: Optional[CancelToken] = None,
+    budget: Optional[ByteBudget] = None,
+) -> TransferResult:
+    """
+    Upload one local file into a Box folder, as a new version of `existing`
+    when given. `on_bytes` is called with the size of each block sent, and
+    parts of a chunked upload are buffered within `budget`.
+    Raises OperationCancelled when `cancel` is cancelled; other failures are
+    reported in the result.
+    """
+    from box_sdk_gen import PreflightFileUploadCheckParent
+    from box_sdk_gen.managers.uploads import (
+        UploadFileAttributes,
+        UploadFileAttributesParentField,
+        UploadFileVersionAttributes,
+    )
+
+    cancel = cancel or CancelToken()
+    cancel.check()
+    result = TransferResult(path=path, file_id=None, status="uploaded")
+    try:
+        size = os.path.getsize(path)
+        result.sha1 = sha1_of_file(path)
+        if existing is not None:
+            if existing.type != "file":
+                raise ValueError(f"{name} already exists in Box and is not a file")
+            result.file_id = existing.id
+            if existing.sha_1 == result.sha1:
+                result.status = "skipped"
+                return result
+
+        with open(path, "rb") as raw:
+            f = _ProgressReader(raw, on_bytes) if on_bytes is not None else raw
+            if existing is not None:
+                result.status = "updated"
+                uploaded = client.uploads.upload_file_version(
+                    existing.id,
+                    UploadFileVersionAttributes(name=name),
+                    f,
+                    content_md_5=result.sha1,
+                ).entries[0]
+            else:
+                # Rejects names, sizes and permissions before any bytes are sent
+                client.uploads.preflight_file_upload_check(
+                    name=name, size=size, parent=PreflightFileUploadCheckParent(id=parent_id)
+                )
+                if size >= CHUNKED_UPLOAD_MIN_SIZE:
+                    uploaded = _upload_in_parts(
+                        client, raw, name, size, parent_id, cancel, budget, on_bytes
+                    )
+                else:
+                    uploaded = client.uploads.upload_file(
+                        UploadFileAttributes(
+                            name=name, parent=UploadFileAttributesParentField(id=parent_id)
+                        ),
+                        f,
+                        content_md_5=result.sha1,
+                    ).entries[0]
+        result.file_id = uploaded.id
+        result.bytes = size
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        result.status = "failed"
+        result.error = str(e)
+    return result
+
+
+def upload_directory(
+    client: "BoxClient",
+    local_dir: str,
+    folder_id: str,
+    max_concurrency: int = 8,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[CancelToken] = None,
+    budget: Optional[ByteBudget] = None,
+) -> dict:
+    """
+    Mirror the contents of `local_dir` into a Box folder.
+
+    Subdirectories become folders (created level by level, siblings in
+    parallel), files are uploaded in parallel. Files whose Box copy has the
+    same SHA-1 are skipped; changed files are uploaded as new versions.
+    """
+    started = time.monotonic()
+    cancel = cancel or CancelToken()
+    if not os.path.isdir(local_dir):
+        raise ValueError(f"{local_dir} is not a directory")
+
+    directories, files = [], []
+    for root, dirnames, filenames in os.walk(local_dir):
+        relative = os.path.relpath(root, local_dir).replace(os.sep, "/")
+        prefix = "" if relative == "." else relative + "/"
+        directories += [prefix + name for name in dirnames]
+        files += [prefix + name for name in filenames]
+
+    # Relative directory -> Box folder id and the items it already contains
+    folder_ids: Dict[str, str] = {"": folder_id}
+    folder_items: Dict[str, Dict[str, object]] = {"": _list_folder(client, folder_id)}
+    folder_errors: Dict[str, str] = {}
+    folders_created = 0
+    results: List[TransferResult] = []
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        depths = max((directory.count("/") + 1 for directory in directories), default=0)
+        for depth in range(1, depths + 1):
+            futures = {}
+            for directory in directories:
+                if directory.count("/") + 1 != depth:
+                    continue
+                parent, _, name = directory.rpartition("/")
+                if parent in folder_errors:
+                    folder_errors[directory] = folder_errors[parent]
+                    continue
+                futures[
+                    pool.submit(
+                        ensure_folder, client, folder_ids[parent], name, folder_items[parent]
+                    )
+                ] = directory
+            for future in as_completed(futures):
+                cancel.check()
+                directory = futures[future]
+                try:
+                    folder_ids[directory], folder_items[directory], created = future.result()
+                    folders_created += created
+                except Exception as e:
+                    folder_errors[directory] = f"Could not create folder {directory}: {e}"
+
+        futures = {}
+        for path in files:
+            parent, _, name = path.rpartition("/")
+            if parent in folder_errors:
+                results.append(TransferResult(path, None, "failed", error=folder_errors[parent]))
+                continue
+            future = pool.submit(
+                upload_file_from,
+                client,
+                os.path.join(local_dir, *path.split("/")),
+                name,
+                folder_ids[parent],
+                folder_items[parent].get(name),
+                cancel=cancel,
+                budget=budget,
+            )
+            futures[future] = path
+        for future in as_completed(futures):
+            result = future.result()
+            result.path = futures[future]
+            results.append(result)
+            if progress:
+                progress(len(results), len(files))
+
+    results.sort(key=lambda result: result.path)
+    return {
+        "local_path": local_dir,
+        "folder_id": folder_id,
+        "folders_created": folders_created,
+        "summary": _summary(results, started),
+        "files": [result.to_dict() for result in results],
+    }
@@ -0,0 +1,217 @@
+"""
+Several server processes behind one listening socket.
+
+One process runs every tool call on one event loop, and the JSON, base64
+and text work in the tools holds the GIL, so a single process is the
+throughput ceiling of the SSE transport. With BOX_MCP_WORKERS set above 1,
+a supervisor binds the listening socket and starts that many worker
+processes serving it; the kernel hands each new connection to one of them.
+A worker that exits is started again, after a delay that grows while it
+keeps crashing.
+
+An SSE session lives in the worker that accepted its stream, but the client
+posts each message on a new connection, which any worker may accept. Every
+worker names itself in the message endpoint it gives its clients and also
+listens on a Unix socket in the supervisor's runtime directory, and a
+message that reaches another worker is forwarded to it there.
+
+Workers share extracted text and previews through a SQLite cache tier
+(BOX_SHARED_CACHE, in the runtime directory unless set), and OAuth tokens
+through the shared token file.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+_WORKER_PATH = re.compile(r"/w(\d+)/?$")
+
+# A worker that ran this long before exiting is restarted at once
+_HEALTHY_AFTER = 30.0
+_MAX_RESTART_DELAY = 30.0
+
+
+def worker_socket_path(runtime_dir: str, worker: int) -> str:
+    return os.path.join(runtime_dir, f"worker-{worker}.sock")
+
+
+class MessageRouter:
+    """
+    ASGI app at the message path: messages for this worker's sessions go to
+    `local`, the others are forwarded to the worker named in the path.
+    """
+
+    def __init__(self, worker: int, runtime_dir: str, local: Callable):
+        self.worker = worker
+        self.runtime_dir = runtime_dir
+        self.local = local
+        self.forwarded = 0
+        self._clients: Dict[int, "httpx.AsyncClient"] = {}
+
+    async def __call__(self, scope, receive, send) -> None:
+        match = _WORKER_PATH.search(scope.get("path", ""))
+        target = int(match.group(1)) if match else self.worker
+        if scope["type"] != "http" or target == self.worker:
+            await self.local(scope, receive, send)
+            return
+        await self._forward(target, scope, receive, send)
+
+    def _client(self, target: int) -> "httpx.AsyncClient":
+        import httpx
+
+        client = self._clients.get(target)
+        if client is None:
+            client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(
+                    uds=worker_socket_path(self.runtime_dir, target)
+                ),
+                base_url="http://worker",
+                timeout=30,
+            )
+            self._clients[target] = client
+        return client
+
+    async def _forward(self, target: int, scope, receive, send) -> None:
+        import httpx
+        from starlette.responses import Response
+
+        body, more = b"", True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+        # Under a Mount, Starlette keeps the full path in `path`
+        url = scope["path"]
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode("latin-1")
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope["headers"]
+            if key.lower() in (b"content-type", b"authorization")
+        }
+        try:
+            forwarded = await self._client(target).request(
+                scope["method"], url, content=body, headers=headers
+            )
+            response = Response(
+                forwarded.content,
+                status_code=forwarded.status_code,
+                media_type=forwarded.headers.get("content-type"),
+            )
+            self.forwarded += 1
+        except httpx.TransportError as e:
+            # The worker restarted since, and its sessions with it
+            logger.warning("Could not forward a message to worker %d: %s", target, e)
+            response = Response("Could not find session", status_code=404)
+        await response(scope, receive, send)
+
+
+def serve_worker(app_factory: Callable[[int, str], Callable]) -> None:
+    """Serve `app_factory(worker, runtime_dir)` in a process started by Supervisor."""
+    import uvicorn
+
+    worker = int(os.environ["BOX_MCP_WORKER"])
+    runtime_dir = os.environ["BOX_MCP_RUNTIME_DIR"]
+    shared = socket.socket(fileno=int(os.environ["BOX_MCP_WORKER_FD"]))
+    path = worker_socket_path(runtime_dir, worker)
+    if os.path.exists(path):
+        os.remove(path)
+    private = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    private.bind(path)
+    private.listen(256)
+
+    config = uvicorn.Config(
+        app_factory(worker, runtime_dir),
+        log_config=None,
+        log_level="warning",
+        timeout_graceful_shutdown=5,
+    )
+    asyncio.run(uvicorn.Server(config).serve(sockets=[shared, private]))
+
+
+class Supervisor:
+    """
+    Starts `workers` copies of `command` on one listening socket and starts
+    them again when they exit, until it is sent SIGTERM or SIGINT.
+    """
+
+    def __init__(self, command: List[str], workers: int, host: str, port: int):
+        self.command = command
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.restarts = 0
+        self._stopping = False
+
+    def run(self) -> None:
+        listener = socket.create_server((self.host, self.port), backlog=2048)
+        listener.set_inheritable(True)
+        runtime_dir = tempfile.mkdtemp(prefix="box-mcp-")
+        env = dict(os.environ)
+        env.setdefault("BOX_SHARED_CACHE", os.path.join(runtime_dir, "cache.sqlite"))
+        env.update(BOX_MCP_RUNTIME_DIR=runtime_dir, BOX_MCP_WORKER_FD=str(listener.fileno()))
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._stop)
+
+        processes: Dict[int, Optional[subprocess.Popen]] = {}
+        started: Dict[int, float] = {}
+        delays: Dict[int, float] = {}
+        due: Dict[int, float] = dict.fromkeys(range(self.workers), 0.0)
+        logger.info("Serving on %s:%d with %d workers", self.host, self.port, self.workers)
+        try:
+            while not self._stopping:
+                now = time.monotonic()
+                for worker, at in list(due.items()):
+                    if at <= now:
+                        del due[worker]
+                        processes[worker] = subprocess.Popen(
+                            self.command,
+                            env={**env, "BOX_MCP_WORKER": str(worker)},
+                            pass_fds=[listener.fileno()],
+                        )
+                        started[worker] = now
+                for worker, process in list(processes.items()):
+                    if process is None or process.poll() is None:
+                        continue
+                    processes[worker] = None
+                    lived = now - started[worker]
+                    delay = 0.0 if lived >= _HEALTHY_AFTER else min(
+                        _MAX_RESTART_DELAY, max(1.0, 2 * delays.get(worker, 0.5))
+                    )
+                    delays[worker] = delay
+                    due[worker] = now + delay
+                    self.restarts += 1
+                    logger.warning(
+                        "Worker %d exited with %s after %.0fs, restarting in %.0fs",
+                        worker, process.returncode, lived, delay,
+                    )
+                time.sleep(0.5)
+        finally:
+            running = [p for p in processes.values() if p is not None and p.poll() is None]
+            for process in running:
+                process.terminate()
+            deadline = time.monotonic() + 10
+            for process in running:
+                try:
+                    process.wait(max(0.0, deadline - time.monotonic()))
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            listener.close()
+            shutil.rmtree(runtime_dir, ignore_errors=True)
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
@@ -1,87 +1,541 @@
+import asyncio
 import base64
 import json
+import mimetypes
 import os
+import sys
+import tempfile
+import threading
 
 # from mcp.server import Server
 import logging
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
-from typing import Any, AsyncIterator, List, cast, Union
-
-
-from box_ai_agents_toolkit import (
-    BoxClient,
-    DocumentFiles,
-    File,
-    Folder,
-    ImageFiles,
-    SearchForContentContentTypes,
-    box_claude_ai_agent_ask,
-    box_claude_ai_agent_extract,
-    box_create_folder,
-    box_delete_folder,
-    box_file_ai_ask,
-    box_hubs_ai_ask,
-    box_multi_file_ai_ask,
-    box_file_ai_extract,
-    box_file_download,
-    box_file_text_extract,
-    box_folder_list_content,
-    box_locate_folder_by_name,
-    box_search,
-    box_update_folder,
-    box_upload_file,
-    authorize_app,
-    get_oauth_client,
-    box_docgen_create_batch,
-    box_docgen_get_job_by_id,
-    box_docgen_list_jobs,
-    box_docgen_list_jobs_by_batch,
-    box_docgen_template_create,
-    box_docgen_template_list,
-    box_docgen_template_delete,
-    box_docgen_template_get_by_id,
-    box_docgen_template_list_tags,
-    box_docgen_template_list_jobs,
-    box_docgen_create_batch_from_user_input
-)
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, List, cast, Union
+
+
+from mcp.server.fastmcp import Context, FastMCP, Image
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 
-from mcp.server.fastmcp import Context, FastMCP
+from box_admission import Admission
+from box_blob_store import Blob, BlobStore
+from box_cancel import (
+    ClosingStream,
+    OperationCancelled,
+    client_connection,
+    closing_receive,
+    request_token,
+)
+from box_events import ALL, InvalidationBus
+from box_extract import TextExtractor
+from box_logging import configure_logging, dropped_records, tool_call
+from box_memory import AllocationTracker, ByteBudget
+from box_prefetch import Prefetcher
+from box_preview import PreviewCache
+from box_progress import DurationEstimate, ProgressReporter
+from box_resilience import Resilience
+from box_shared_cache import SharedCache
+from box_text_index import TextIndex
+from box_paging import (
+    DEFAULT_BYTE_LENGTH,
+    DEFAULT_TEXT_LENGTH,
+    TextCache,
+    decode_utf8_prefix,
+    encode_cursor,
+    resolve_window,
+    text_window,
+)
 
-# # Disable all logging
-logging.basicConfig(level=logging.CRITICAL)
-for logger_name in logging.root.manager.loggerDict:
-    logging.getLogger(logger_name).setLevel(logging.CRITICAL)
+if TYPE_CHECKING:
+    from box_ai_agents_toolkit import BoxClient
+    from box_cancel import CancelToken
 
-# Override the logging call that's visible in the original code
+# Logs go to stderr or BOX_LOG_FILE through a background queue; stdout
+# carries the stdio transport
+configure_logging()
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.CRITICAL)
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _get_box_client(context: "BoxContext") -> "BoxClient":
+    """
+    Create the Box client used by the tools.
+
+    BOX_DEVELOPER_TOKEN and BOX_API_BASE_URL allow running the server against
+    a local Box API stand-in, see benchmarks/box_api_stub.py.
+    """
+    # Imported here so that starting the server and answering initialize and
+    # tools/list does not pay for loading the Box SDK and toolkit.
+    from box_ai_agents_toolkit import BoxClient, get_auth_config
+    from box_sdk_gen import BaseUrls, BoxDeveloperTokenAuth
+
+    from box_network import HttpConfig, create_network_session
+
+    network_session = create_network_session(HttpConfig.from_env())
+    context.network_client = network_session.network_client
+
+    developer_token = os.getenv("BOX_DEVELOPER_TOKEN")
+    if developer_token:
+        client = BoxClient(
+            BoxDeveloperTokenAuth(developer_token), network_session=network_session
+        )
+    else:
+        from box_token_store import TokenRefresher, get_shared_oauth
+
+        # Tokens live in a file shared by every server process on the host,
+        # and are renewed ahead of expiry by a background thread.
+        auth = get_shared_oauth(
+            get_auth_config(), os.getenv("BOX_TOKEN_STORE", ".auth.oauth.json")
+        )
+        client = BoxClient(auth, network_session=network_session).with_extra_headers(
+            extra_headers={"x-box-ai-library": "mcp-server-box"}
+        )
+        if _env_flag("BOX_TOKEN_REFRESH", default=True):
+            context.token_refresher = TokenRefresher(
+                auth,
+                margin=float(os.getenv("BOX_TOKEN_REFRESH_MARGIN", "600")),
+                network_session=network_session,
+            )
+            context.token_refresher.start()
+
+    base_url = os.getenv("BOX_API_BASE_URL")
+    if base_url:
+        client = client.with_custom_base_urls(
+            BaseUrls(
+                base_url=base_url,
+                upload_url=os.getenv("BOX_UPLOAD_BASE_URL", f"{base_url}/api"),
+                oauth_2_url=os.getenv("BOX_OAUTH2_BASE_URL", f"{base_url}/oauth2"),
+            )
+        )
+    return client
+
+
+def _vector_index_from_env() -> Any:
+    """The retrieval index at BOX_RETRIEVAL_INDEX, which needs the `retrieval` extra."""
+    directory = os.getenv("BOX_RETRIEVAL_INDEX")
+    if not directory:
+        return None
+    from box_retrieval import VectorIndex
+
+    return VectorIndex(os.path.expanduser(directory))
+
+
+def _as_user_ids_from_env() -> "frozenset | None":
+    """
+    Managed users clients may act as, from BOX_AS_USER_ALLOWLIST ("*" for
+    any) when BOX_ALLOW_AS_USER is set; None while As-User is off.
+    """
+    if not _env_flag("BOX_ALLOW_AS_USER"):
+        return None
+    allowed = frozenset(u.strip() for u in os.getenv("BOX_AS_USER_ALLOWLIST", "").split(","))
+    allowed -= {""}
+    if not allowed:
+        logger.warning("BOX_ALLOW_AS_USER is set without BOX_AS_USER_ALLOWLIST; As-User stays off")
+        return None
+    return allowed
 
 
 @dataclass
 class BoxContext:
-    client: BoxClient = None
+    """
+    Process-wide state shared by the tools and by every client session.
+
+    The Box client is created on first access rather than at startup, so a
+    freshly spawned server answers initialize and tools/list immediately and
+    only the first tool call that talks to Box pays for client construction.
+    """
+
+    client_factory: Callable[["BoxContext"], "BoxClient"] = _get_box_client
+    token_refresher: Any = None
+    client_pool: Any = None
+    network_client: Any = None
+    event_listener: Any = None
+    text_indexer: Any = None
+    invalidations: InvalidationBus = field(default_factory=InvalidationBus)
+    shared_cache: "SharedCache | None" = field(default_factory=SharedCache.from_env)
+    text_cache: TextCache = field(default_factory=TextCache.from_env)
+    blob_store: BlobStore = field(default_factory=BlobStore.from_env)
+    text_index: "TextIndex | None" = field(default_factory=TextIndex.from_env)
+    vector_index: Any = field(default_factory=_vector_index_from_env)
+    resilience: Resilience = field(default_factory=Resilience.from_env)
+    text_extractor: TextExtractor = field(default_factory=TextExtractor.from_env)
+    admission: Admission = field(default_factory=Admission.from_env)
+    prefetcher: "Prefetcher | None" = field(default_factory=Prefetcher.from_env)
+    memory_budget: ByteBudget = field(default_factory=ByteBudget.from_env)
+    allocations: AllocationTracker = field(default_factory=AllocationTracker.from_env)
+    as_user_ids: "frozenset | None" = field(default_factory=_as_user_ids_from_env)
+    preview_cache: PreviewCache = field(
+        default_factory=lambda: PreviewCache(
+            int(os.getenv("BOX_PREVIEW_CACHE_MB", "32")) * 1024 * 1024
+        )
+    )
+    _client: "BoxClient | None" = None
+    _client_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        self.invalidations.subscribe(self._invalidate_caches)
+        if self.shared_cache is not None:
+            self.text_cache.shared = self.shared_cache
+            self.preview_cache.shared = self.shared_cache
+
+    def _invalidate_caches(self, item_type: str, item_id: str) -> None:
+        # Box reports a trashed, moved or re-shared folder, not the files in
+        # it, and the caches do not know which of their files are inside
+        if item_id == ALL or item_type == "folder":
+            self.text_cache.clear()
+            self.preview_cache.clear()
+            for index in self._text_indexes():
+                index.clear()
+        elif item_type == "file":
+            self.text_cache.invalidate(item_id)
+            self.preview_cache.invalidate(item_id)
+            for index in self._text_indexes():
+                index.invalidate(item_id)
+
+    def _text_indexes(self) -> list:
+        return [i for i in (self.text_index, self.vector_index) if i is not None]
+
+    def index_text(self, file_id: str, text: str, identity: str = "") -> None:
+        """Add the text extracted from a file to the local indexes."""
+        for index in self._text_indexes():
+            index.add(file_id, text, identity=identity)
+
+    def prefetch(self, client: "BoxClient", identity: str, files: List[tuple]) -> None:
+        """
+        Warm the text cache for the first documents among `files`, the
+        (id, name) of the files of a search or listing, if prefetch is on.
+        """
+        if self.prefetcher is None:
+            return
+        from box_ai_agents_toolkit import DocumentFiles, box_file_text_extract
+
+        extensions = {e.value for e in DocumentFiles}
+
+        def is_document(name: str) -> bool:
+            mime_type, _ = mimetypes.guess_type(name)
+            extension = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+            return bool(mime_type and mime_type.startswith("text/")) or extension in extensions
+
+        def load(file_id: str) -> str:
+            text = self.resilience.call_blocking(
+                "text_extract", box_file_text_extract, client, file_id
+            )
+            if not text:
+                # No text from Box yet, as for a file just uploaded; caching
+                # it would keep box_read_tool from extracting the file locally
+                raise ValueError(f"Box has no text for file {file_id} yet")
+            return text
+
+        def store(file_id: str, text: str) -> None:
+            self.text_cache.put(file_id, text, identity=identity)
+            self.index_text(file_id, text, identity)
+
+        self.prefetcher.schedule(
+            [file_id for file_id, name in files if is_document(name or "")],
+            identity,
+            load=load,
+            store=store,
+            cached=lambda file_id: self.text_cache.contains(file_id, identity=identity),
+        )
+
+    def start_event_listener(self) -> None:
+        """
+        Invalidate caches from the Box events stream. Text cached for the
+        server's own identity then stays valid until the file changes, so its
+        TTL is raised unless configured. The stream is that of the server's
+        own user and may miss changes visible only to As-User or per-token
+        identities, whose entries keep the configured TTL.
+        """
+        from box_events import EventListener
+
+        if self.event_listener is None:
+            self.extend_text_ttl()
+            self.event_listener = EventListener(lambda: self.client, self.invalidations)
+            self.event_listener.start()
+
+    def extend_text_ttl(self) -> None:
+        """Keep text cached for the server's own identity for 24 hours, unless configured."""
+        if "BOX_TEXT_CACHE_TTL" not in os.environ:
+            self.text_cache.ttl_by_identity[""] = 24 * 3600
+
+    def start_text_indexer(self, folder_ids: List[str]) -> None:
+        """Keep the files of `folder_ids` in the local text index."""
+        from box_text_index import TextIndexer
+
+        if self.text_indexer is None and self.text_index is not None:
+            self.text_indexer = TextIndexer(
+                lambda: self.client,
+                self.text_index,
+                folder_ids,
+                interval=float(os.getenv("BOX_TEXT_INDEX_INTERVAL", "3600")),
+                mirrors=[self.vector_index] if self.vector_index is not None else [],
+            )
+            self.text_indexer.start()
+
+    @property
+    def client(self) -> "BoxClient":
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self.client_factory(self)
+        return self._client
+
+    def client_for(self, ctx: Context) -> "BoxClient":
+        """
+        Client for the identity named in the request's _meta, if any.
+
+        Clients may pass `box_access_token` (the user's own token) in the
+        request _meta, and `box_as_user_id` (act as a managed user through
+        the As-User header) when the server allows that user. Without
+        either, the server's own client is used.
+        """
+        as_user_id, access_token = self._identity(ctx)
+        if not as_user_id and not access_token:
+            return self.client
+
+        if self.client_pool is None:
+            from box_client_pool import BoxClientPool
+
+            base_client = self.client
+            with self._client_lock:
+                if self.client_pool is None:
+                    self.client_pool = BoxClientPool(
+                        base_client,
+                        max_clients=int(os.getenv("BOX_CLIENT_POOL_SIZE", "256")),
+                        idle_ttl=float(os.getenv("BOX_CLIENT_POOL_TTL", "900")),
+                    )
+        return self.client_pool.get(as_user_id=as_user_id, access_token=access_token)
+
+    def identity_for(self, ctx: Context) -> str:
+        """
+        Key of the identity `client_for(ctx)` acts as, "" for the server's own.
+
+        Caches of file content are scoped by it, so users never see content
+        cached for someone with different access.
+        """
+        from box_client_pool import identity_key
+
+        return identity_key(*self._identity(ctx))
+
+    def _identity(self, ctx: Context) -> tuple:
+        meta = ctx.request_context.meta
+        as_user_id = getattr(meta, "box_as_user_id", None) if meta else None
+        access_token = getattr(meta, "box_access_token", None) if meta else None
+        if as_user_id:
+            # As-User acts with the server's own credentials, so any client
+            # could otherwise act as any managed user of the enterprise
+            as_user_id = str(as_user_id)
+            if self.as_user_ids is None:
+                raise PermissionError("Acting as another user is not enabled on this server")
+            if "*" not in self.as_user_ids and as_user_id not in self.as_user_ids:
+                raise PermissionError(f"Acting as user {as_user_id} is not allowed")
+        return (as_user_id or None, access_token)
+
+    def shutdown(self) -> None:
+        """Stop the worker pools, when the server exits."""
+        self.text_extractor.shutdown()
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+
+    def stats(self) -> dict:
+        """Operational counters for the components created so far."""
+        stats: dict = {"client_created": self._client is not None}
+        stats["text_cache"] = self.text_cache.stats()
+        stats["blob_store"] = self.blob_store.stats()
+        stats["preview_cache"] = self.preview_cache.stats()
+        if self.shared_cache is not None:
+            stats["shared_cache"] = self.shared_cache.stats()
+        if self.network_client is not None:
+            stats["http"] = self.network_client.stats()
+        if self.client_pool is not None:
+            stats["client_pool"] = self.client_pool.stats()
+        if self.token_refresher is not None:
+            stats["token_refresher"] = self.token_refresher.stats()
+        stats["invalidations"] = self.invalidations.stats()
+        stats["resilience"] = self.resilience.stats()
+        stats["text_extraction"] = self.text_extractor.stats()
+        stats["admission"] = self.admission.stats()
+        if self.prefetcher is not None:
+            stats["prefetch"] = self.prefetcher.stats()
+        stats["memory_budget"] = self.memory_budget.stats()
+        stats["logging"] = {"dropped_records": dropped_records()}
+        stats["allocations"] = self.allocations.stats()
+        if self.event_listener is not None:
+            stats["event_listener"] = self.event_listener.stats()
+        if self.text_index is not None:
+            stats["text_index"] = self.text_index.stats()
+        if self.text_indexer is not None:
+            stats["text_indexer"] = self.text_indexer.stats()
+        if self.vector_index is not None:
+            stats["vector_index"] = self.vector_index.stats()
+        return stats
+
+
+# One context per process: with the SSE transport the lifespan runs once per
+# connection, and connections should share the client and its token refresher.
+_box_context = BoxContext()
+
+
+def admitted(category: str):
+    """Run a tool within the concurrency limit and queue of `category`."""
+    return _box_context.admission.limited(category)
+
+
+def _prewarm() -> None:
+    """Import the Box toolkit ahead of the first tool call."""
+    import box_ai_agents_toolkit  # noqa: F401
 
 
 @asynccontextmanager
 async def box_lifespan(server: FastMCP) -> AsyncIterator[BoxContext]:
     """Manage Box client lifecycle with OAuth handling"""
     try:
-        client = get_oauth_client()
-        yield BoxContext(client=client)
+        # Optionally load the toolkit in the background once the server is up,
+        # trading a little CPU during startup for a faster first tool call.
+        if _env_flag("BOX_MCP_PREWARM"):
+            threading.Thread(target=_prewarm, daemon=True).start()
+        # With several workers only the first one polls the events stream and
+        # indexes folders. The others see its text invalidations through the
+        # shared cache, and the index through its database.
+        background = os.getenv("BOX_MCP_WORKER", "0") == "0"
+        if _env_flag("BOX_EVENTS_INVALIDATION"):
+            if background:
+                _box_context.start_event_listener()
+            elif _box_context.shared_cache is not None:
+                _box_context.extend_text_ttl()
+        index_folders = [f.strip() for f in os.getenv("BOX_TEXT_INDEX_FOLDERS", "").split(",")]
+        if background and any(index_folders):
+            _box_context.start_text_indexer([f for f in index_folders if f])
+        yield _box_context
     # except Exception as e:
     #     logger.error(f"Error: {e}")
     finally:
-        # Cleanup (if needed)
+        # With the SSE transport this runs when each connection closes; the
+        # pools shared by all connections stop when the server exits
         pass
 
 
+class BoxMCP(FastMCP):
+    """
+    FastMCP that serves downloads with the MIME type of the downloaded file,
+    cancels the tool calls still running when the client goes away, logs
+    each tool call and records its allocation peak when enabled.
+    """
+
+    async def call_tool(self, name: str, arguments: dict) -> Any:
+        async with tool_call(name) as outcome, _box_context.allocations.track(name):
+            result = await super().call_tool(name, arguments)
+            # Tools report failures in their answer rather than raising
+            text = getattr(result[0], "text", "") if result else ""
+            if text.startswith("Error") or text.startswith('{"error"'):
+                outcome["error"] = text
+            return result
+
+    async def run_stdio_async(self) -> None:
+        from mcp.server.stdio import stdio_server
+
+        async with stdio_server() as (read_stream, write_stream):
+            with client_connection() as connection:
+                await self._mcp_server.run(
+                    ClosingStream(read_stream, connection.close),
+                    write_stream,
+                    self._mcp_server.create_initialization_options(),
+                )
+
+    async def _serve_sse(self, sse, request):
+        """Run the session of one SSE client, as a connection of its own."""
+        from starlette.responses import Response
+        with client_connection() as connection:
+            try:
+                async with sse.connect_sse(
+                    request.scope,
+                    closing_receive(request.receive, connection.close),
+                    request._send,
+                ) as (read_stream, write_stream):
+                    await self._mcp_server.run(
+                        read_stream,
+                        write_stream,
+                        self._mcp_server.create_initialization_options(),
+                    )
+            except Exception as e:
+                # The answers to the calls cancelled by a disconnect have
+                # nowhere to go, and end the session with a broken stream
+                if not connection.closed:
+                    raise
+                logger.debug("SSE session ended after the client disconnected: %r", e)
+        # The stream has been answered already; Starlette needs a response
+        return Response()
+
+    def sse_app(self):
+        from mcp.server.sse import SseServerTransport
+        from starlette.applications import Starlette
+        from starlette.routing import Mount, Route
+
+        sse = SseServerTransport(self.settings.message_path)
+
+        async def handle_sse(request):
+            return await self._serve_sse(sse, request)
+
+        return Starlette(
+            debug=self.settings.debug,
+            routes=[
+                Route(self.settings.sse_path, endpoint=handle_sse),
+                Mount(self.settings.message_path, app=sse.handle_post_message),
+            ],
+        )
+
+    def worker_app(self, worker: int, runtime_dir: str):
+        """
+        SSE app of one of several worker processes (see box_workers). The
+        message endpoint names the worker, so messages reaching another
+        worker are forwarded to this one.
+        """
+        from mcp.server.sse import SseServerTransport
+        from starlette.applications import Starlette
+        from starlette.routing import Mount, Route
+
+        from box_workers import MessageRouter
+
+        sse = SseServerTransport(f"{self.settings.message_path}w{worker}/")
+
+        async def handle_sse(request):
+            return await self._serve_sse(sse, request)
+
+        return Starlette(
+            debug=self.settings.debug,
+            routes=[
+                Route(self.settings.sse_path, endpoint=handle_sse),
+                Mount(
+                    self.settings.message_path,
+                    app=MessageRouter(worker, runtime_dir, sse.handle_post_message),
+                ),
+            ],
+        )
+
+    async def read_resource(self, uri) -> List[ReadResourceContents]:
+        contents = await super().read_resource(uri)
+        blob = _box_context.blob_store.get_by_uri(str(uri))
+        if blob is None:
+            return list(contents)
+        return [
+            ReadResourceContents(content=content.content, mime_type=blob.mime_type)
+            for content in contents
+        ]
+
+
 # Initialize FastMCP server
-mcp = FastMCP("Box MCP Server", lifespan=box_lifespan)
+mcp = BoxMCP("Box MCP Server", lifespan=box_lifespan)
 # mcp = Server("Box MCP Server", lifespan=box_lifespan)
 
 
 @mcp.tool()
+@admitted("metadata")
 async def box_who_am_i(ctx: Context) -> str:
     """
     Get the current user's information.
@@ -93,7 +547,7 @@ async def box_who_am_i(ctx: Context) -> str:
     # Get the Box client
     box_client: BoxClient = cast(
         BoxContext, ctx.request_context.lifespan_context
-    ).client
+    ).client_for(ctx)
 
     # Get the current user's information
     current_user = box_client.users.get_user_me()
@@ -110,6 +564,7 @@ async def box_authorize_app_tool() -> str:
     return:
         str: Message
     """
+    from box_ai_agents_toolkit import authorize_app
 
     #logger.info("Authorizing Box application")
     result = authorize_app()
@@ -120,6 +575,20 @@ async def box_authorize_app_tool() -> str:
 
 
 @mcp.tool()
+async def box_server_stats_tool(ctx: Context) -> str:
+    """
+    Get operational statistics of this MCP server, such as client pool usage.
+    This does not call the Box API.
+
+    return:
+        str: The statistics in a json string format.
+    """
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    return json.dumps(box_context.stats())
+
+
+@mcp.tool()
+@admitted("metadata")
 async def box_search_tool(
     ctx: Context,
     query: str,
@@ -143,10 +612,11 @@ async def box_search_tool(
     return:
         str: The search results.
     """
+    from box_ai_agents_toolkit import SearchForContentContentTypes, box_search
+
     # Get the Box client
-    box_client: BoxClient = cast(
-        BoxContext, ctx.request_context.lifespan_context
-    ).client
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = box_context.client_for(ctx)
 
     # Convert the where to look for query to content types
     content_types: List[SearchForContentContentTypes] = []
@@ -155,8 +625,24 @@ async def box_search_tool(
             content_types.append(SearchForContentContentTypes[content_type])
 
     # Search for files with the query
-    search_results = box_search(
-        box_client, query, file_extensions, content_types, ancestor_folder_ids
+    try:
+        search_results = await box_context.resilience.call(
+            "search",
+            box_search,
+            box_client,
+            query,
+            file_extensions,
+            content_types,
+            ancestor_folder_ids,
+            idempotent=True,
+        )
+    except Exception as e:
+        return f"Error searching Box: {str(e)}"
+
+    box_context.prefetch(
+        box_client,
+        box_context.identity_for(ctx),
+        [(file.id, file.name) for file in search_results if getattr(file, "type", "file") == "file"],
     )
 
     # Return the "id", "name", "description" of the search results
@@ -170,15 +656,99 @@ async def box_search_tool(
 
 
 @mcp.tool()
-async def box_read_tool(ctx: Context, file_id: str) -> str:
+@admitted("metadata")
+async def box_local_search_tool(
+    ctx: Context,
+    query: str,
+    limit: int = 10,
+    fallback_to_box_search: bool = True,
+) -> str:
+    """
+    Search the text of files already read through box_read_tool or indexed in the
+    background (see BOX_TEXT_INDEX_FOLDERS). Answers from a local index in milliseconds,
+    with ranked snippets around the matches. Use this before box_search_tool for
+    keyword lookups in documents you have worked with.
+
+    Args:
+        query (str): Words that must all appear in the file text or name.
+        limit (int, optional): Maximum number of results. Defaults to 10.
+        fallback_to_box_search (bool, optional): When the index has fewer than limit
+            matches, add matching files from Box search. Defaults to True.
+    return:
+        str: JSON with the results, best first. Each has file_id, name and source:
+             "index" results include a score and a snippet with matches in [brackets],
+             "box_search" results the file description.
+    """
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    limit = min(max(limit, 1), 100)
+    results = []
+    if box_context.text_index is not None:
+        try:
+            results = await asyncio.to_thread(
+                box_context.text_index.search,
+                query,
+                identity=box_context.identity_for(ctx),
+                limit=limit,
+            )
+        except Exception as e:
+            return f"Error searching the local index: {str(e)}"
+        for result in results:
+            result["source"] = "index"
+    elif not fallback_to_box_search:
+        return "Error searching the local index: set BOX_TEXT_INDEX to enable it"
+
+    if fallback_to_box_search and len(results) < limit:
+        from box_ai_agents_toolkit import box_search
+
+        box_client: BoxClient = box_context.client_for(ctx)
+        try:
+            files = await box_context.resilience.call(
+                "search", box_search, box_client, query, idempotent=True
+            )
+        except Exception as e:
+            return f"Error searching Box: {str(e)}"
+        found = {result["file_id"] for result in results}
+        for file in files:
+            if len(results) >= limit:
+                break
+            if file.id not in found:
+                results.append(
+                    {
+                        "file_id": file.id,
+                        "name": file.name,
+                        "description": file.description or "",
+                        "source": "box_search",
+                    }
+                )
+    return json.dumps({"results": results})
+
+
+@mcp.tool()
+@admitted("transfer")
+async def box_read_tool(
+    ctx: Context,
+    file_id: str,
+    offset: int | None = None,
+    length: int | None = None,
+    cursor: str | None = None,
+) -> str:
     """
     Read the text content of a file in Box.
+    Long documents can be read in windows: pass offset and/or length, then
+    pass the returned next_cursor as cursor to read the following window.
+    If Box is slow to extract the text or has none, the file is extracted locally.
 
     Args:
         file_id (str): The ID of the file to read.
+        offset (int, optional): Character offset to start reading at.
+        length (int, optional): Maximum number of characters to return. Defaults to 20000 when reading a window.
+        cursor (str, optional): The next_cursor of a previous call. Takes precedence over offset and length.
     return:
-        str: The text content of the file.
+        str: The text content of the file. When reading a window, a JSON object
+             with text, offset, length, total_length and next_cursor (null at the end).
     """
+    from box_ai_agents_toolkit import box_file_text_extract
+
     # log parameters and its type
     # logging.info(f"file_id: {file_id}, type: {type(file_id)}")
     
@@ -187,16 +757,64 @@ async def box_read_tool(ctx: Context, file_id: str) -> str:
         file_id = str(file_id)
 
     # Get the Box client
-    box_client: BoxClient = cast(
-        BoxContext, ctx.request_context.lifespan_context
-    ).client
-
-    response = box_file_text_extract(box_client, file_id)
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = box_context.client_for(ctx)
+
+    identity = box_context.identity_for(ctx)
+
+    # Extracted text is cached, so reading a document window by window
+    # only extracts it once
+    text = box_context.text_cache.get(file_id, identity=identity)
+    prefetcher = box_context.prefetcher
+    if text is None and prefetcher is not None:
+        # A prefetch still extracting the file is waited for, not repeated
+        pending = prefetcher.pending(file_id, identity)
+        if pending is not None:
+            try:
+                text = await asyncio.wrap_future(pending)
+            except Exception:
+                pass
+    if prefetcher is not None:
+        prefetcher.record_read(file_id, identity, served=text is not None)
+    if text is None:
+        # When Box is slow to extract the text, or has none, the file is
+        # also downloaded and extracted locally
+        try:
+            extraction = await box_context.text_extractor.extract(
+                box_client,
+                file_id,
+                lambda: box_context.resilience.call(
+                    "text_extract", box_file_text_extract, box_client, file_id, idempotent=True
+                ),
+                run=box_context.resilience.call,
+            )
+        except Exception as e:
+            return f"Error reading file: {str(e)}"
+        text = extraction.text
+        try:
+            await ctx.request_context.session.send_log_message(
+                level="info" if extraction.fallback else "debug",
+                data={"file_id": file_id, **extraction.to_dict()},
+                logger="box.extract",
+            )
+        except Exception:
+            pass
+        box_context.text_cache.put(file_id, text, identity=identity)
+        await asyncio.to_thread(box_context.index_text, file_id, text, identity)
+    if offset is None and length is None and cursor is None:
+        return text
 
-    return response
+    try:
+        start, window = resolve_window(
+            file_id, offset, length, cursor, DEFAULT_TEXT_LENGTH
+        )
+    except ValueError as e:
+        return f"Error reading file: {str(e)}"
+    return json.dumps(text_window(file_id, text, start, window))
 
 
 @mcp.tool()
+@admitted("ai")
 async def box_ask_ai_tool(ctx: Context, file_id: str, prompt: str) -> str:
     """
     Ask box ai about a file in Box.
@@ -207,6 +825,8 @@ async def box_ask_ai_tool(ctx: Context, file_id: str, prompt: str) -> str:
     return:
         str: The text content of the file.
     """
+    from box_ai_agents_toolkit import box_file_ai_ask
+
     # log parameters and its type
     # logging.info(f"file_id: {file_id}, type: {type(file_id)}")
 
@@ -217,14 +837,19 @@ async def box_ask_ai_tool(ctx: Context, file_id: str, prompt: str) -> str:
     # Get the Box client
     box_client: BoxClient = cast(
         BoxContext, ctx.request_context.lifespan_context
-    ).client
+    ).client_for(ctx)
     #ai_agent = box_claude_ai_agent_ask()
-    response = box_file_ai_ask(box_client, file_id, prompt=prompt)
+    response = await asyncio.to_thread(box_file_ai_ask, box_client, file_id, prompt=prompt)
 
     return response
 
 
+# Typical duration of a multi-file Box AI request, updated as requests complete
+_AI_ASK_DURATION = DurationEstimate(initial=20.0)
+
+
 @mcp.tool()
+@admitted("ai")
 async def box_ask_ai_tool_multi_file(
     ctx: Context, file_ids: List[str], prompt: str
 ) -> str:
@@ -246,19 +871,58 @@ async def box_ask_ai_tool_multi_file(
     Raises:
         Exception: If there is an issue with the Box client, AI agent, or file processing.
     """
+    from box_ai_agents_toolkit import box_multi_file_ai_ask
 
     # Get the Box client
     box_client: BoxClient = cast(
         BoxContext, ctx.request_context.lifespan_context
-    ).client
+    ).client_for(ctx)
     # ai_agent = box_claude_ai_agent_ask()
-    response = box_multi_file_ai_ask(
-        box_client, file_ids, prompt=prompt
+    # Box AI answers in one response; report elapsed time against the usual
+    # duration meanwhile so the client does not give up on the call.
+    response = await ProgressReporter(ctx, unit="seconds").run_with_heartbeat(
+        box_multi_file_ai_ask, box_client, file_ids, prompt, estimate=_AI_ASK_DURATION
     )
 
     return response
 
+
 @mcp.tool()
+async def box_find_relevant_files_tool(
+    ctx: Context, question: str, max_files: int = 5, passages_per_file: int = 2
+) -> str:
+    """
+    Find the files most relevant to a question among the files already read through
+    box_read_tool or indexed in the background, with their best matching passages.
+    Answered locally, without calling Box. Use it to choose the file_ids for
+    box_ask_ai_tool_multi_file instead of reading candidate files first.
+
+    Args:
+        question (str): The question or topic to find files for.
+        max_files (int, optional): Maximum number of files. Defaults to 5.
+        passages_per_file (int, optional): Passages returned per file. Defaults to 2.
+    return:
+        str: JSON with the files, most relevant first, each with file_id, name, score
+             and passages (offset in the extracted text, score and text).
+    """
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    if box_context.vector_index is None:
+        return "Error finding relevant files: set BOX_RETRIEVAL_INDEX to enable retrieval"
+    try:
+        files = await asyncio.to_thread(
+            box_context.vector_index.search,
+            question,
+            identity=box_context.identity_for(ctx),
+            max_files=min(max(max_files, 1), 50),
+            passages_per_file=min(max(passages_per_file, 1), 10),
+        )
+    except Exception as e:
+        return f"Error finding relevant files: {str(e)}"
+    return json.dumps({"files": files})
+
+
+@mcp.tool()
+@admitted("ai")
 async def box_hubs_ask_ai_tool(ctx: Context, hubs_id: Any, prompt: str) -> str:
     """
     Ask box ai about a hub in Box. Currently there is no way to discover a hub 
@@ -270,8 +934,10 @@ async def box_hubs_ask_ai_tool(ctx: Context, hubs_id: Any, prompt: str) -> str:
     return:
         str: The text content of the file.
     """
+    from box_ai_agents_toolkit import box_claude_ai_agent_ask, box_hubs_ai_ask
+
     # log parameters and its type
-    logging.info(f"file_id: {hubs_id}, type: {type(hubs_id)}")
+    logger.debug("hubs_id: %s, type: %s", hubs_id, type(hubs_id))
 
     # check if file id isn't a string and convert to a string
     if not isinstance(hubs_id, str):
@@ -280,14 +946,17 @@ async def box_hubs_ask_ai_tool(ctx: Context, hubs_id: Any, prompt: str) -> str:
     # Get the Box client
     box_client: BoxClient = cast(
         BoxContext, ctx.request_context.lifespan_context
-    ).client
+    ).client_for(ctx)
     ai_agent = box_claude_ai_agent_ask()
-    response = box_hubs_ai_ask(box_client, hubs_id, prompt=prompt, ai_agent=ai_agent)
+    response = await asyncio.to_thread(
+        box_hubs_ai_ask, box_client, hubs_id, prompt=prompt, ai_agent=ai_agent
+    )
 
     return response
 
 
 @mcp.tool()
+@admitted("metadata")
 async def box_search_folder_by_name(ctx: Context, folder_name: str) -> str:
     """
     Locate a folder in Box by its name.
@@ -297,13 +966,18 @@ async def box_search_folder_by_name(ctx: Context, folder_name: str) -> str:
     return:
         str: The folder ID.
     """
+    from box_ai_agents_toolkit import box_locate_folder_by_name
 
     # Get the Box client
-    box_client: BoxClient = cast(
-        BoxContext, ctx.request_context.lifespan_context
-    ).client
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = box_context.client_for(ctx)
 
-    search_results = box_locate_folder_by_name(box_client, folder_name)
+    try:
+        search_results = await box_context.resilience.call(
+            "search", box_locate_folder_by_name, box_client, folder_name, idempotent=True
+        )
+    except Exception as e:
+        return f"Error searching Box: {str(e)}"
 
     # Return the "id", "name", "description" of the search results
     search_results = [f"{folder.name} (id:{folder.id})" for folder in search_results]
@@ -312,6 +986,7 @@ async def box_search_folder_by_name(ctx: Context, folder_name: str) -> str:
 
 
 @mcp.tool()
+@admitted("ai")
 async def box_ai_extract_data(ctx: Context, file_id: str, fields: str) -> str:
     """ "
     Extract data from a single file in Box using AI.
@@ -322,22 +997,25 @@ async def box_ai_extract_data(ctx: Context, file_id: str, fields: str) -> str:
     return:
         str: The extracted data in a json string format.
     """
+    from box_ai_agents_toolkit import box_file_ai_extract
+
     # Get the Box client
     box_client: BoxClient = cast(
         BoxContext, ctx.request_context.lifespan_context
-    ).client
+    ).client_for(ctx)
 
     # check if file id isn't a string and convert to a string
     if not isinstance(file_id, str):
         file_id = str(file_id)
 
     # ai_agent = box_claude_ai_agent_extract()
-    response = box_file_ai_extract(box_client, file_id, fields)
+    response = await asyncio.to_thread(box_file_ai_extract, box_client, file_id, fields)
 
     return json.dumps(response)
 
 
 @mcp.tool()
+@admitted("metadata")
 async def box_list_folder_content_by_folder_id(
     ctx: Context,
     folder_id: str,
@@ -354,44 +1032,97 @@ async def box_list_folder_content_by_folder_id(
         str: The content of the folder in a json string format, including the "id", "name", "type", and "description".
     """
     # Get the Box client
-    box_client: BoxClient = cast(
-        BoxContext, ctx.request_context.lifespan_context
-    ).client
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = box_context.client_for(ctx)
 
     # check if file id isn't a string and convert to a string
     if not isinstance(folder_id, str):
         folder_id = str(folder_id)
 
-    response: List[Union[File, Folder]] = box_folder_list_content(
-        box_client, folder_id, is_recursive
+    # Listed on a worker thread, so progress and the folders listed so far
+    # reach the client while a large tree is still being walked
+    with request_token() as cancel:
+        try:
+            response = await asyncio.to_thread(
+                _list_folder_content,
+                box_client,
+                folder_id,
+                is_recursive,
+                ProgressReporter(ctx, unit="folders"),
+                cancel,
+            )
+        except OperationCancelled as e:
+            return f"Error listing folder: {str(e)}"
+    box_context.prefetch(
+        box_client,
+        box_context.identity_for(ctx),
+        [(item["id"], item["name"]) for item in response if item["type"] == "file"],
     )
+    return json.dumps(response)
 
-    # Convert the response to a json string
 
-    response = [
-        {
-            "id": item.id,
-            "name": item.name,
-            "type": item.type,
-            "description": item.description if hasattr(item, "description") else None,
-        }
-        for item in response
-    ]
-    return json.dumps(response)
+def _list_folder_content(
+    box_client: "BoxClient",
+    folder_id: str,
+    is_recursive: bool,
+    progress: ProgressReporter,
+    cancel: "CancelToken",
+) -> List[dict]:
+    """Folder items as dicts, subfolder contents before the subfolder itself."""
+
+    def list_folder(current_id: str) -> List[dict]:
+        entries, marker = [], None
+        while True:
+            cancel.check()
+            page = box_client.folders.get_folder_items(
+                current_id,
+                fields=["id", "name", "type", "description"],
+                usemarker=True,
+                marker=marker,
+                limit=1000,
+            )
+            entries += [item for item in page.entries or [] if item.type != "web_link"]
+            marker = page.next_marker
+            if not marker:
+                break
+        items = [
+            {
+                "id": item.id,
+                "name": item.name,
+                "type": item.type,
+                "description": getattr(item, "description", None),
+            }
+            for item in entries
+        ]
+        subfolders = [item.id for item in entries if item.type == "folder"] if is_recursive else []
+        progress.update(advance=1, total=(progress.total or 1) + len(subfolders))
+        progress.partial({"folder_id": current_id, "items": items})
+
+        result = []
+        for item, entry in zip(items, entries):
+            if entry.type == "folder" and is_recursive:
+                result.extend(list_folder(entry.id))
+            result.append(item)
+        return result
+
+    return list_folder(folder_id)
 
 
 @mcp.tool()
+@admitted("metadata")
 async def box_manage_folder_tool(
     ctx: Context,
-    action: str,
+    action: str = "",          # Required unless operations is given
     folder_id: str = "",       # Required for delete and update; empty means not provided
     name: str = "",            # Required for create; empty means not provided
     parent_id: str = "",       # Optional for create; empty means root
     description: str = "",     # Optional for update
     recursive: bool = False,     # Optional for delete
+    operations: List[dict] | None = None,  # Batch of operations; replaces the arguments above
+    max_concurrency: int = 4,
 ) -> str:
     """
-    Manage Box folders - create, delete, or update.
+    Manage Box folders - create, delete, or update, one folder or a batch of them.
 
     Args:
         action (str): The action to perform: "create", "delete", or "update"
@@ -401,14 +1132,47 @@ async def box_manage_folder_tool(
                        Root folder is "0" or 0.
         description (str): Description for the folder (optional for update)
         recursive (bool): Whether to delete recursively (optional for delete)
+        operations (list[dict] | None): Run several operations in one call instead. Each is a dict
+                       with "action" and the arguments above. A create can set "ref", and later
+                       operations can use "$<ref>" as folder_id or parent_id, e.g.
+                       [{"action": "create", "name": "Project", "ref": "p"},
+                        {"action": "create", "name": "Specs", "parent_id": "$p"}].
+                       Operations on different folders run concurrently, operations on the
+                       same folder run in order.
+        max_concurrency (int): Batch operations run at the same time, 1 to 16. Defaults to 4.
 
     return:
-        str: Result of the operation
+        str: Result of the operation, or for a batch JSON with a summary and the status of
+             each operation (done, failed, or skipped when an operation it depends on failed)
     """
+    from box_ai_agents_toolkit import (
+        box_create_folder,
+        box_delete_folder,
+        box_update_folder,
+    )
+
     # Get the Box client
     box_client: BoxClient = cast(
         BoxContext, ctx.request_context.lifespan_context
-    ).client
+    ).client_for(ctx)
+
+    if operations:
+        from box_folder_batch import run_folder_operations
+
+        try:
+            with request_token() as cancel:
+                result = await asyncio.to_thread(
+                    run_folder_operations,
+                    box_client,
+                    operations,
+                    max_concurrency=min(max(max_concurrency, 1), 16),
+                    rate=float(os.getenv("BOX_BATCH_RATE", "10")),
+                    progress=ProgressReporter(ctx, unit="operations"),
+                    cancel=cancel,
+                )
+        except (ValueError, OperationCancelled) as e:
+            return f"Error: {str(e)}"
+        return json.dumps(result)
 
     # Validate and normalize inputs
     if action.lower() not in ["create", "delete", "update"]:
@@ -432,7 +1196,8 @@ async def box_manage_folder_tool(
             # Default to root folder ("0") if no parent_id provided
             parent_id_str = parent_id or "0"
 
-            new_folder = box_create_folder(
+            new_folder = await asyncio.to_thread(
+                box_create_folder,
                 client=box_client, name=name, parent_id=parent_id_str
             )
             return f"Folder created successfully. Folder ID: {new_folder.id}, Name: {new_folder.name}"
@@ -445,7 +1210,8 @@ async def box_manage_folder_tool(
             return "Error: folder_id is required for delete action"
 
         try:
-            box_delete_folder(
+            await asyncio.to_thread(
+                box_delete_folder,
                 client=box_client, folder_id=folder_id, recursive=recursive
             )
             return f"Folder with ID {folder_id} deleted successfully"
@@ -458,7 +1224,8 @@ async def box_manage_folder_tool(
             return "Error: folder_id is required for update action"
 
         try:
-            updated_folder = box_update_folder(
+            updated_folder = await asyncio.to_thread(
+                box_update_folder,
                 client=box_client,
                 folder_id=folder_id,
                 name=name,
@@ -471,6 +1238,7 @@ async def box_manage_folder_tool(
 
 
 @mcp.tool()
+@admitted("transfer")
 async def box_upload_file_from_path_tool(
     ctx: Context,
     file_path: str,
@@ -488,40 +1256,45 @@ async def box_upload_file_from_path_tool(
     return:
         str: Information about the uploaded file (ID and name).
     """
+    from box_transfer import upload_file_from
 
     # Get the Box client
-    box_client: BoxClient = cast(
-        BoxContext, ctx.request_context.lifespan_context
-    ).client
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = box_context.client_for(ctx)
+
+    # Normalize the path and check if file exists
+    file_path_expanded = os.path.expanduser(file_path)
+    if not os.path.isfile(file_path_expanded):
+        return f"Error: file '{file_path}' not found."
 
+    # Determine the file name to use
+    actual_file_name = new_file_name.strip() or os.path.basename(file_path_expanded)
+
+    # Streamed from disk on a worker thread (chunked upload for large files),
+    # reporting bytes sent as it goes
+    progress = ProgressReporter(ctx, unit="bytes")
+    progress.update(total=os.path.getsize(file_path_expanded))
     try:
-        # Normalize the path and check if file exists
-        file_path_expanded = os.path.expanduser(file_path)
-        if not os.path.isfile(file_path_expanded):
-            return f"Error: file '{file_path}' not found."
-
-        # Determine the file name to use
-        actual_file_name = new_file_name.strip() or os.path.basename(file_path_expanded)
-        # Determine file extension to detect binary types
-        _, ext = os.path.splitext(actual_file_name)
-        binary_exts = {".docx", ".pptx", ".xlsx", ".pdf", ".jpg", ".jpeg", ".png", ".gif"}
-        # Read file content as bytes for binary types, else as text
-        if ext.lower() in binary_exts:
-            # Binary file: read raw bytes
-            with open(file_path_expanded, "rb") as f:
-                content = f.read()
-        else:
-            # Text file: read as UTF-8
-            with open(file_path_expanded, "r", encoding="utf-8") as f:
-                content = f.read()
-        # Upload using toolkit (supports str or bytes)
-        result = box_upload_file(box_client, content, actual_file_name, folder_id)
-        return f"File uploaded successfully. File ID: {result['id']}, Name: {result['name']}"
-    except Exception as e:
+        with request_token() as cancel:
+            result = await asyncio.to_thread(
+                upload_file_from,
+                box_client,
+                file_path_expanded,
+                actual_file_name,
+                str(folder_id or "0"),
+                on_bytes=lambda sent: progress.update(advance=sent, bytes=sent),
+                cancel=cancel,
+                budget=box_context.memory_budget,
+            )
+    except OperationCancelled as e:
         return f"Error uploading file: {str(e)}"
+    if result.status == "failed":
+        return f"Error uploading file: {result.error}"
+    return f"File uploaded successfully. File ID: {result.file_id}, Name: {actual_file_name}"
 
 
 @mcp.tool()
+@admitted("transfer")
 async def box_upload_file_from_content_tool(
     ctx: Context,
     content: str | bytes,  # Accept both string and bytes
@@ -538,67 +1311,281 @@ async def box_upload_file_from_content_tool(
         folder_id (str): The ID of the destination folder. Defaults to root ("0").
         is_base64 (bool): Whether the content is base64 encoded. Defaults to False.
     """
+    from box_transfer import upload_file_from
+
     # Get the Box client
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = box_context.client_for(ctx)
+
+    # The content is spooled to disk so that only one budgeted part of it is
+    # buffered again while uploading, instead of a decoded copy of the whole;
+    # decoding and writing it happen on the worker thread with the upload
+    def spool_and_upload(spool_path: str, cancel: "CancelToken"):
+        with open(spool_path, "wb") as spool:
+            _spool_content(spool, content, is_base64)
+        return upload_file_from(
+            box_client,
+            spool_path,
+            file_name,
+            str(folder_id or "0"),
+            cancel=cancel,
+            budget=box_context.memory_budget,
+        )
 
+    fd, spool_path = tempfile.mkstemp(prefix="box-upload-")
+    os.close(fd)
     try:
-        # Handle base64 encoded content
-        if is_base64 and isinstance(content, str):
-            content = base64.b64decode(content)
-        
-        # Upload using toolkit
-        result = box_upload_file(box_client, content, file_name, folder_id)
-        return f"File uploaded successfully. File ID: {result['id']}, Name: {result['name']}"
+        with request_token() as cancel:
+            result = await asyncio.to_thread(spool_and_upload, spool_path, cancel)
     except Exception as e:
         return f"Error uploading file: {str(e)}"
+    finally:
+        os.unlink(spool_path)
+    if result.status == "failed":
+        return f"Error uploading file: {result.error}"
+    return f"File uploaded successfully. File ID: {result.file_id}, Name: {file_name}"
+
+
+def _spool_content(spool, content: "str | bytes", is_base64: bool) -> None:
+    """Write upload content to `spool`, decoding base64 a slice at a time."""
+    step = 1024 * 1024
+    if isinstance(content, bytes):
+        spool.write(content)
+    elif not is_base64:
+        for start in range(0, len(content), step):
+            spool.write(content[start : start + step].encode("utf-8"))
+    else:
+        carry = ""
+        for start in range(0, len(content), step):
+            carry += "".join(content[start : start + step].split())
+            whole = len(carry) - len(carry) % 4
+            spool.write(base64.b64decode(carry[:whole]))
+            carry = carry[whole:]
+        # Leftover characters fail here as they would decoded all at once
+        spool.write(base64.b64decode(carry))
+
+
+def _download_window(
+    box_client: "BoxClient", file_id: str, offset: int, length: int
+) -> dict:
+    """Download `length` bytes of a file from `offset` with an HTTP Range request."""
+    file_info = box_client.files.get_file_by_id(file_id, fields=["name", "size"])
+    total = file_info.size or 0
+    end = min(offset + length, total)
+
+    mime_type, _ = mimetypes.guess_type(file_info.name)
+    is_text = mime_type is not None and (
+        mime_type.startswith("text/")
+        or mime_type in ("application/json", "application/xml")
+    )
+    # Text windows take up to 3 more bytes, to finish a character at `offset`
+    # longer than the window
+    fetch_end = min(end + 3, total) if is_text else end
+    data = b""
+    if offset < fetch_end:
+        data = _read_range(
+            box_client.downloads.download_file(
+                file_id, range=f"bytes={offset}-{fetch_end - 1}"
+            ),
+            offset,
+            fetch_end - offset,
+        )
+
+    window = {
+        "file_id": file_id,
+        "file_name": file_info.name,
+        "mime_type": mime_type,
+        "offset": offset,
+        "total_size": total,
+    }
+    if is_text:
+        # Stop before a character cut in half; the next window starts with
+        # it. A window within a single character grows until it covers it,
+        # so that following the cursors always advances.
+        size = max(end - offset, 0)
+        while True:
+            window["content"], consumed = decode_utf8_prefix(
+                data[:size], final=offset + size >= total
+            )
+            if consumed or size >= len(data):
+                break
+            size += 1
+    else:
+        window["content_base64"] = base64.b64encode(data).decode("utf-8")
+        consumed = len(data)
+    window["length"] = consumed
+    next_offset = offset + consumed
+    window["next_cursor"] = (
+        encode_cursor(file_id, next_offset, length) if next_offset < total else None
+    )
+    return window
+
+
+def _read_range(stream, offset: int, length: int) -> bytes:
+    """
+    The `length` bytes at `offset` from the stream of a Range request, also
+    when the server ignored the header and sends the whole file. Never holds
+    more than the window, and closes the stream.
+    """
+    step = 64 * 1024
+    try:
+        data = bytearray()
+        while len(data) <= length:
+            chunk = stream.read(min(step, length + 1 - len(data)))
+            if not chunk:
+                return bytes(data)
+            data += chunk
+        # More than was asked for: the file is coming from its start, so
+        # skip to `offset` and keep only the window
+        window = data[offset : offset + length]
+        position = len(data)
+        while len(window) < length:
+            chunk = stream.read(step)
+            if not chunk:
+                break
+            start = max(offset - position, 0)
+            window += chunk[start : start + length - len(window)]
+            position += len(chunk)
+        return bytes(window)
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+
+def _read_download(box_client: "BoxClient", file_id: str) -> bytes:
+    stream = box_client.downloads.download_file(file_id)
+    return b"".join(iter(lambda: stream.read(64 * 1024), b""))
+
+
+def _save_download(
+    box_client: "BoxClient",
+    file_info,
+    save_path: "str | None",
+    cancel: "CancelToken",
+) -> str:
+    """
+    Stream a file to `save_path` (a file, or a directory to save it in;
+    the temporary directory when None) and return the path it was saved to.
+    A download interrupted before continues from the `.part` file it left.
+    """
+    from box_transfer import download_file_to
+
+    path = save_path or tempfile.gettempdir()
+    if os.path.isdir(path):
+        path = os.path.join(path, file_info.name)
+    result = download_file_to(box_client, file_info, path, cancel=cancel)
+    if result.status == "failed":
+        raise RuntimeError(result.error)
+    return path
+
+
+def _read_chunks(path: str):
+    with open(path, "rb") as f:
+        yield from iter(lambda: f.read(64 * 1024), b"")
+
+
+def _document_response(file_name: str, content: bytes) -> str:
+    try:
+        return f"File downloaded successfully: {file_name}\n\n{content.decode('utf-8')}"
+    except UnicodeDecodeError:
+        # Handle case where file can't be decoded as UTF-8 despite being a "document"
+        return f"File {file_name} is a document but couldn't be decoded as text. It may be in a binary format."
+
+
+def _blob_response(store: BlobStore, blob: Blob) -> str:
+    response = (
+        f"File downloaded successfully: {blob.file_name}\n"
+        f"MIME type: {blob.mime_type}\n"
+        f"Size: {blob.size} bytes\n"
+        f"Resource URI: {blob.uri}\n"
+    )
+    chunks = store.chunk_count(blob)
+    if blob.size > store.max_read_bytes:
+        response += "Too large to read whole, read it in chunks.\n"
+    if chunks > 1:
+        response += f"Chunks: {blob.uri}/chunks/0 to {blob.uri}/chunks/{chunks - 1}\n"
+    return response + f"Available for {int(store.ttl)} seconds."
 
 
 @mcp.tool()
+@admitted("transfer")
 async def box_download_file_tool(
-    ctx: Context, file_id: str, save_file: bool = False, save_path: str | None = None
+    ctx: Context,
+    file_id: str,
+    save_file: bool = False,
+    save_path: str | None = None,
+    offset: int | None = None,
+    length: int | None = None,
+    cursor: str | None = None,
 ) -> str:
     """
     Download a file from Box and return its content as a string.
-    Supports text files (returns content directly) and images (returns base64-encoded).
-    Other file types will return an error message.
+    Text files up to 1 MiB are returned directly. Images, other binary files and
+    larger text files are returned as a box-download:// resource URI to read with
+    resources/read, either whole or chunk by chunk.
     Optionally saves the file locally.
+    Large files can be downloaded in windows of bytes: pass offset and/or length,
+    then pass the returned next_cursor as cursor to download the following window.
 
     Args:
         file_id (str): The ID of the file to download.
         save_file (bool, optional): Whether to save the file locally. Defaults to False.
         save_path (str, optional): Path where to save the file. If not provided but save_file is True,
                                   uses a temporary directory. Defaults to None.
+        offset (int, optional): Byte offset to start downloading at.
+        length (int, optional): Maximum number of bytes to download. Defaults to 1 MiB when downloading a window.
+        cursor (str, optional): The next_cursor of a previous call. Takes precedence over offset and length.
 
     return:
         str: For text files: content as string.
-             For images: base64-encoded string with metadata.
-             For unsupported files: error message.
+             For other files: resource URI, chunk URIs, MIME type and size.
              If save_file is True, includes the path where the file was saved.
+             When downloading a window, a JSON object with content (text files) or
+             content_base64, offset, length, total_size and next_cursor (null at the end).
     """
+    from box_ai_agents_toolkit import DocumentFiles, ImageFiles
+
     # Get the Box client
-    box_client: BoxClient = cast(
-        BoxContext, ctx.request_context.lifespan_context
-    ).client
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = box_context.client_for(ctx)
 
     # Convert file_id to string if it's not already
     if not isinstance(file_id, str):
         file_id = str(file_id)
 
-    try:
-        # Use the box_api function for downloading
-        saved_path, file_content, mime_type = box_file_download(
-            client=box_client, file_id=file_id, save_file=save_file, save_path=save_path
-        )
+    if offset is not None or length is not None or cursor is not None:
+        if save_file:
+            return "Error downloading file: save_file cannot be combined with offset, length or cursor"
+        try:
+            start, window = resolve_window(
+                file_id, offset, length, cursor, DEFAULT_BYTE_LENGTH
+            )
+            # The window is held as bytes, encoded and in the response; under
+            # memory pressure a smaller window is returned, the cursor continues
+            budget = box_context.memory_budget
+            reservation = budget.try_reserve(3 * window)
+            if reservation is None:
+                window = max(64 * 1024, budget.available() // 3)
+                reservation = budget.try_reserve(3 * window)
+            if reservation is None:
+                return "Error downloading file: the server is short of memory, retry later or with a smaller length"
+            with reservation:
+                result = await box_context.resilience.call(
+                    "download", _download_window, box_client, file_id, start, window, idempotent=True
+                )
+                return json.dumps(result)
+        except Exception as e:
+            return f"Error downloading file: {str(e)}"
 
+    try:
         # Get file info to include name in response
-        file_info = box_client.files.get_file_by_id(file_id)
+        file_info = await box_context.resilience.call(
+            "file_info", box_client.files.get_file_by_id, file_id, idempotent=True
+        )
         file_name = file_info.name
         file_extension = file_name.split(".")[-1].lower() if "." in file_name else ""
-
-        # Prepare response based on content type
-        response = ""
-        if saved_path:
-            response += f"File saved to: {saved_path}\n\n"
+        mime_type, _ = mimetypes.guess_type(file_name)
 
         # Check if file is a document (text-based file)
         is_document = (
@@ -614,35 +1601,328 @@ async def box_download_file_tool(
             or file_extension in [e.value for e in ImageFiles]
         )
 
+        size = file_info.size or 0
+        budget = box_context.memory_budget
+        inline_max = int(os.getenv("BOX_INLINE_TEXT_MAX_BYTES", str(1024 * 1024)))
+        reservation = None
+        if not save_file and is_document and size <= inline_max:
+            # Raw bytes, decoded text and the response are held at once
+            reservation = budget.try_reserve(3 * size)
+        if not save_file and reservation is None:
+            # Binary and large files, and text files when the memory budget
+            # is exhausted, are streamed to the download store and served as
+            # a resource instead of being inlined in the response
+            if size > box_context.blob_store.max_bytes:
+                return (
+                    f"Error downloading file: {file_name} is too large to download at once, "
+                    "use offset and length to download it in parts"
+                )
+            # Hedged up to the first byte; the body is read from the winner
+            stream = await box_context.resilience.call(
+                "download", box_client.downloads.download_file, file_id, idempotent=True
+            )
+            # A cancelled download stops between chunks and its blob is removed
+            with request_token() as cancel:
+                blob = await asyncio.to_thread(
+                    box_context.blob_store.put,
+                    cancel.chunks(iter(lambda: stream.read(64 * 1024), b"")),
+                    file_id,
+                    file_name,
+                    mime_type,
+                )
+            return _blob_response(box_context.blob_store, blob)
+
+        if not save_file:
+            with reservation:
+                file_content = await box_context.resilience.call(
+                    "download", _read_download, box_client, file_id, idempotent=True
+                )
+                return _document_response(file_name, file_content)
+
+        # Saved files are streamed to disk rather than buffered whole
+        with request_token() as cancel:
+            saved_path = await box_context.resilience.call(
+                "download",
+                _save_download,
+                box_client,
+                file_info,
+                save_path,
+                cancel,
+                # Two attempts saving at once would write the same file
+                idempotent=False,
+            )
+        response = f"File saved to: {saved_path}\n\n"
+
         if is_document:
-            # Text file - return content directly
-            try:
-                content_text = file_content.decode("utf-8")
+            # Text file - return content directly if the memory budget allows
+            reservation = budget.try_reserve(3 * size)
+            if reservation is None:
                 response += (
-                    f"File downloaded successfully: {file_name}\n\n{content_text}"
+                    f"File {file_name} is too large to return here right now; "
+                    "read it with box_read_tool, or with offset and length."
                 )
-            except UnicodeDecodeError:
-                # Handle case where file can't be decoded as UTF-8 despite being a "document"
-                response += f"File {file_name} is a document but couldn't be decoded as text. It may be in a binary format."
+            else:
+                with reservation:
+                    with open(saved_path, "rb") as f:
+                        response += _document_response(file_name, f.read())
 
         elif is_image:
-            # Image file - return base64 encoded
-            base64_data = base64.b64encode(file_content).decode("utf-8")
-            response += f"Image downloaded successfully: {file_name}\nMIME type: {mime_type}\nBase64 encoded data:\n{base64_data}"
+            # Image file - served as a resource rather than inline base64
+            blob = await asyncio.to_thread(
+                box_context.blob_store.put, _read_chunks(saved_path), file_id, file_name, mime_type
+            )
+            response += _blob_response(box_context.blob_store, blob)
 
         else:
             # Unsupported file type for content display (but still saved if requested)
-            if not saved_path:
-                response += f"File {file_name} has unsupported type ({mime_type or 'unknown'}). Only text and image files are supported for content display."
-            else:
-                response += f"File {file_name} has unsupported type ({mime_type or 'unknown'}) for content display, but was saved successfully."
+            response += f"File {file_name} has unsupported type ({mime_type or 'unknown'}) for content display, but was saved successfully."
 
         return response
 
     except Exception as e:
         return f"Error downloading file: {str(e)}"
-    
+
+
 @mcp.tool()
+@admitted("transfer")
+async def box_preview_file_tool(
+    ctx: Context, file_id: str, size: int = 320, page: int = 1
+) -> list:
+    """
+    Get a small preview image of a file in Box: an image, or a page of a document.
+    Use it instead of box_download_file_tool to look at a file; the preview is
+    kilobytes where the original may be megabytes.
+
+    Args:
+        file_id (str): The ID of the file to preview.
+        size (int, optional): Longest side of the preview in pixels, up to 2048. Defaults to 320.
+        page (int, optional): Page of a document to preview, starting at 1. Defaults to 1.
+
+    return:
+        list: A short description of the preview and the preview image, or an error message.
+    """
+    from box_preview import get_preview
+
+    box_context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = box_context.client_for(ctx)
+
+    if not 1 <= size <= 2048 or page < 1:
+        return ["Error previewing file: size must be between 1 and 2048 and page at least 1"]
+
+    try:
+        preview, details = await asyncio.to_thread(
+            get_preview,
+            box_client,
+            box_context.preview_cache,
+            box_context.identity_for(ctx),
+            str(file_id),
+            size=size,
+            page=page,
+            wait=float(os.getenv("BOX_PREVIEW_WAIT", "5")),
+        )
+    except Exception as e:
+        return [f"Error previewing file: {str(e)}"]
+
+    return [
+        f"Preview of {details['file_name']} (page {page}, {len(preview.data)} bytes)",
+        Image(data=preview.data, format=preview.mime_type.split("/")[1]),
+    ]
+
+
+@mcp.tool()
+@admitted("transfer")
+async def box_download_folder_tool(
+    ctx: Context,
+    folder_id: str,
+    local_path: str,
+    recursive: bool = True,
+    max_concurrency: int = 8,
+) -> str:
+    """
+    Download all files of a Box folder to a local directory or zip archive.
+    Files are downloaded in parallel and streamed to disk. Running the tool again
+    with the same arguments resumes an interrupted download: files whose local
+    copy has the same SHA-1 as in Box are skipped, and partially downloaded
+    files are continued.
+
+    Args:
+        folder_id (str): The ID of the folder to download.
+        local_path (str): Local directory, or a path ending in .zip to write a zip archive.
+        recursive (bool, optional): Whether to include subfolders. Defaults to True.
+        max_concurrency (int, optional): Files downloaded at the same time, 1 to 32. Defaults to 8.
+
+    return:
+        str: JSON with a summary and the status of each file
+             (downloaded, resumed, skipped or failed).
+    """
+    from box_transfer import download_folder
+
+    box_client: BoxClient = cast(
+        BoxContext, ctx.request_context.lifespan_context
+    ).client_for(ctx)
+
+    try:
+        # Runs on worker threads so the server keeps serving other requests
+        with request_token() as cancel:
+            result = await asyncio.to_thread(
+                download_folder,
+                box_client,
+                str(folder_id),
+                os.path.expanduser(local_path),
+                recursive=recursive,
+                max_concurrency=min(max(max_concurrency, 1), 32),
+                progress=ProgressReporter(ctx, unit="files"),
+                cancel=cancel,
+            )
+    except Exception as e:
+        return f"Error downloading folder: {str(e)}"
+    return json.dumps(result)
+
+
+@mcp.tool()
+@admitted("transfer")
+async def box_upload_folder_tool(
+    ctx: Context,
+    local_path: str,
+    folder_id: str = "0",
+    max_concurrency: int = 8,
+    manifest_path: str | None = None,
+) -> str:
+    """
+    Upload a local directory tree into a Box folder. Subdirectories are created
+    as Box folders and files are uploaded in parallel. Files that already exist
+    in Box with the same SHA-1 are skipped and changed files are uploaded as new
+    versions, so running the tool again after a failure only sends what is missing.
+
+    Args:
+        local_path (str): The local directory to upload.
+        folder_id (str, optional): The ID of the Box folder to upload into. Defaults to "0" (root).
+        max_concurrency (int, optional): Files uploaded at the same time, 1 to 32. Defaults to 8.
+        manifest_path (str, optional): Local file to write the per-file manifest to. When set,
+            only the summary and the failed files are returned.
+
+    return:
+        str: JSON with a summary and the status, Box file ID and SHA-1 of each file
+             (uploaded, updated, skipped or failed).
+    """
+    from box_transfer import upload_directory
+
+    context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = context.client_for(ctx)
+
+    try:
+        with request_token() as cancel:
+            result = await asyncio.to_thread(
+                upload_directory,
+                box_client,
+                os.path.expanduser(local_path),
+                str(folder_id),
+                max_concurrency=min(max(max_concurrency, 1), 32),
+                progress=ProgressReporter(ctx, unit="files"),
+                cancel=cancel,
+                budget=context.memory_budget,
+            )
+    except Exception as e:
+        return f"Error uploading folder: {str(e)}"
+
+    for entry in result["files"]:
+        if entry["status"] == "updated":
+            context.invalidations.publish("file", entry["file_id"])
+
+    if manifest_path:
+        manifest_path = os.path.expanduser(manifest_path)
+        try:
+            with open(manifest_path, "w") as f:
+                json.dump(result, f, indent=2)
+        except OSError as e:
+            return f"Error writing manifest: {str(e)}"
+        result["manifest_path"] = manifest_path
+        result["files"] = [f for f in result["files"] if f["status"] == "failed"]
+    return json.dumps(result)
+
+
+@mcp.tool()
+@admitted("transfer")
+async def box_sync_folder_tool(
+    ctx: Context,
+    folder_id: str,
+    local_path: str,
+    conflict_policy: str = "report",
+    full_rescan: bool = False,
+    dry_run: bool = False,
+    max_concurrency: int = 8,
+) -> str:
+    """
+    Two-way sync of a Box folder and a local directory. The first sync merges both
+    sides; later syncs only look at what changed since the previous one (Box events
+    and local file changes) and apply the needed downloads, uploads, renames and
+    deletes. Files changed on both sides are reported as conflicts.
+
+    Args:
+        folder_id (str): The ID of the Box folder to sync.
+        local_path (str): The local directory to sync with. The sync state is kept in
+            a .box-sync.json file in this directory.
+        conflict_policy (str, optional): "report" leaves conflicts untouched, "local" or
+            "remote" makes that side win. Defaults to "report".
+        full_rescan (bool, optional): List the whole Box folder instead of reading
+            events. Defaults to False.
+        dry_run (bool, optional): Only report what would be done. Defaults to False.
+        max_concurrency (int, optional): Transfers at the same time, 1 to 32. Defaults to 8.
+
+    return:
+        str: JSON with a summary and each changed file with its actions and status
+             (planned, done, conflict or failed).
+    """
+    from box_sync import sync_folder
+
+    context = cast(BoxContext, ctx.request_context.lifespan_context)
+    box_client: BoxClient = context.client_for(ctx)
+
+    try:
+        with request_token() as cancel:
+            result = await asyncio.to_thread(
+                sync_folder,
+                box_client,
+                str(folder_id),
+                os.path.expanduser(local_path),
+                conflict_policy=conflict_policy,
+                full_rescan=full_rescan,
+                dry_run=dry_run,
+                max_concurrency=min(max(max_concurrency, 1), 32),
+                progress=ProgressReporter(ctx, unit="files"),
+                cancel=cancel,
+            )
+    except Exception as e:
+        return f"Error syncing folder: {str(e)}"
+
+    for change in result["changes"]:
+        if change["status"] == "done" and change["file_id"]:
+            context.invalidations.publish("file", change["file_id"])
+    return json.dumps(result)
+
+
+@mcp.resource(
+    "box-download://{blob_id}",
+    name="box_download",
+    description="Content of a file downloaded with box_download_file_tool",
+    mime_type="application/octet-stream",
+)
+async def box_download_resource(blob_id: str) -> bytes:
+    return await asyncio.to_thread(_box_context.blob_store.read, blob_id)
+
+
+@mcp.resource(
+    "box-download://{blob_id}/chunks/{index}",
+    name="box_download_chunk",
+    description="One chunk of a file downloaded with box_download_file_tool",
+    mime_type="application/octet-stream",
+)
+async def box_download_chunk_resource(blob_id: str, index: int) -> bytes:
+    return await asyncio.to_thread(_box_context.blob_store.read_chunk, blob_id, int(index))
+
+
+@mcp.tool()
+@admitted("docgen")
 async def box_docgen_create_batch_tool(
     ctx: Context,
     file_id: str,
@@ -663,7 +1943,9 @@ async def box_docgen_create_batch_tool(
     Returns:
         str: JSON-serialized response from Box, or an error message.
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
+    from box_ai_agents_toolkit import box_docgen_create_batch_from_user_input
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
     try:
         path = os.path.expanduser(user_input_file_path)
         if not os.path.isfile(path):
@@ -678,7 +1960,8 @@ async def box_docgen_create_batch_tool(
             generated_file_name = "Test_Name"
 
 
-        batch = box_docgen_create_batch_from_user_input(
+        batch = await asyncio.to_thread(
+            box_docgen_create_batch_from_user_input,
             client=box_client,
             file_id=file_id,
             destination_folder_id=destination_folder_id,
@@ -692,16 +1975,20 @@ async def box_docgen_create_batch_tool(
         return f"Error generating document batch: {str(e)}"
 
 @mcp.tool()
+@admitted("docgen")
 async def box_docgen_get_job_tool(ctx: Context, job_id: str) -> str:
     """
     Fetch a single DocGen job by its ID.
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
-    response = box_docgen_get_job_by_id(box_client, job_id)
+    from box_ai_agents_toolkit import box_docgen_get_job_by_id
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
+    response = await asyncio.to_thread(box_docgen_get_job_by_id, box_client, job_id)
     # Serialize SDK object to JSON-safe structures
     return json.dumps(_serialize(response), indent=2)
 
 @mcp.tool()
+@admitted("docgen")
 async def box_docgen_list_jobs_tool(
     ctx: Context,
     marker: str | None = None,
@@ -710,12 +1997,17 @@ async def box_docgen_list_jobs_tool(
     """
     List all DocGen jobs for the current user (paginated).
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
-    response = box_docgen_list_jobs(box_client, marker=marker, limit=limit)
+    from box_ai_agents_toolkit import box_docgen_list_jobs
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
+    response = await asyncio.to_thread(
+        box_docgen_list_jobs, box_client, marker=marker, limit=limit
+    )
     # Serialize SDK object to JSON-safe structures
     return json.dumps(_serialize(response), indent=2)
 
 @mcp.tool()
+@admitted("docgen")
 async def box_docgen_list_jobs_by_batch_tool(
     ctx: Context,
     batch_id: str,
@@ -725,15 +2017,21 @@ async def box_docgen_list_jobs_by_batch_tool(
     """
     List all DocGen jobs that belong to a particular batch.
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
+    from box_ai_agents_toolkit import box_docgen_list_jobs_by_batch
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
     try:
-        response = box_docgen_list_jobs_by_batch(
-            box_client, batch_id=batch_id, marker=marker, limit=limit
+        response = await asyncio.to_thread(
+            box_docgen_list_jobs_by_batch,
+            box_client,
+            batch_id=batch_id,
+            marker=marker,
+            limit=limit,
         )
         
         # Log the response type and structure for debugging
-        logger.info(f"Response type: {type(response)}")
-        logger.info(f"Response dir: {dir(response)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Response type: %s, attributes: %s", type(response), dir(response))
         
         # Create a simple dictionary with basic information
         result = {
@@ -761,12 +2059,12 @@ async def box_docgen_list_jobs_by_batch_tool(
                             job_info[attr] = str(getattr(job, attr))
                     result["jobs"].append(job_info)
                 except Exception as job_error:
-                    logger.error(f"Error processing job: {str(job_error)}")
+                    logger.error("Error processing job: %s", job_error)
                     result["jobs"].append({"error": str(job_error)})
         
         return json.dumps(result, indent=2)
     except Exception as e:
-        logger.error(f"Error in box_docgen_list_jobs_by_batch_tool: {str(e)}")
+        logger.exception("Error in box_docgen_list_jobs_by_batch_tool: %s", e)
         # Return a formatted error JSON
         return json.dumps({
             "error": str(e),
@@ -775,12 +2073,15 @@ async def box_docgen_list_jobs_by_batch_tool(
         }, indent=2)
 
 @mcp.tool()
+@admitted("docgen")
 async def box_docgen_template_create_tool(ctx: Context, file_id: str) -> str:
     """
     Mark a file as a Box Doc Gen template.
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
-    response = box_docgen_template_create(box_client, file_id)
+    from box_ai_agents_toolkit import box_docgen_template_create
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
+    response = await asyncio.to_thread(box_docgen_template_create, box_client, file_id)
     # The SDK returns a DocGenTemplateBase object which isn't directly JSON‑serialisable.
     # Use the common _serialize helper (defined later in this module) to convert it
     # into plain dict/list primitives before dumping to JSON.
@@ -788,6 +2089,7 @@ async def box_docgen_template_create_tool(ctx: Context, file_id: str) -> str:
 
 
 @mcp.tool()
+@admitted("docgen")
 async def box_docgen_template_list_tool(
     ctx: Context,
     marker: str | None = None,
@@ -796,33 +2098,44 @@ async def box_docgen_template_list_tool(
     """
     List all Box Doc Gen templates accessible to the user.
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
-    templates = box_docgen_template_list(box_client, marker=marker, limit=limit)
+    from box_ai_agents_toolkit import box_docgen_template_list
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
+    templates = await asyncio.to_thread(
+        box_docgen_template_list, box_client, marker=marker, limit=limit
+    )
 
     return json.dumps(_serialize(templates))
 
 
 @mcp.tool()
+@admitted("docgen")
 async def box_docgen_template_delete_tool(ctx: Context, template_id: str) -> str:
     """
     Unmark a file as a Box Doc Gen template.
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
-    box_docgen_template_delete(box_client, template_id)
+    from box_ai_agents_toolkit import box_docgen_template_delete
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
+    await asyncio.to_thread(box_docgen_template_delete, box_client, template_id)
     return json.dumps({"deleted_template": template_id})
 
 
 @mcp.tool()
+@admitted("docgen")
 async def box_docgen_template_get_by_id_tool(ctx: Context, template_id: str) -> str:
     """
     Retrieve details of a specific Box Doc Gen template.
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
-    template = box_docgen_template_get_by_id(box_client, template_id)
+    from box_ai_agents_toolkit import box_docgen_template_get_by_id
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
+    template = await asyncio.to_thread(box_docgen_template_get_by_id, box_client, template_id)
     return json.dumps(_serialize(template))
 
 
 @mcp.tool()
+@admitted("docgen")
 async def box_docgen_template_list_tags_tool(
     ctx: Context,
     template_id: str,
@@ -833,8 +2146,11 @@ async def box_docgen_template_list_tags_tool(
     """
     List all tags on a Box Doc Gen template.
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
-    tags = box_docgen_template_list_tags(
+    from box_ai_agents_toolkit import box_docgen_template_list_tags
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
+    tags = await asyncio.to_thread(
+        box_docgen_template_list_tags,
         box_client,
         template_id,
         template_version_id=template_version_id,
@@ -845,6 +2161,7 @@ async def box_docgen_template_list_tags_tool(
 
 
 @mcp.tool()
+@admitted("docgen")
 async def box_docgen_template_list_jobs_tool(
     ctx: Context,
     template_id: str,
@@ -854,9 +2171,15 @@ async def box_docgen_template_list_jobs_tool(
     """
     List all Doc Gen jobs that used a specific template.
     """
-    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client
-    jobs = box_docgen_template_list_jobs(
-        box_client, template_id=template_id, marker=marker, limit=limit
+    from box_ai_agents_toolkit import box_docgen_template_list_jobs
+
+    box_client: BoxClient = cast(BoxContext, ctx.request_context.lifespan_context).client_for(ctx)
+    jobs = await asyncio.to_thread(
+        box_docgen_template_list_jobs,
+        box_client,
+        template_id=template_id,
+        marker=marker,
+        limit=limit,
     )
     return json.dumps(_serialize(jobs))
 
@@ -889,5 +2212,26 @@ def _serialize(obj):
         return str(obj)
 
 if __name__ == "__main__":
-    # Initialize and run the server
-    mcp.run(transport="stdio")
+    # Initialize and run the server: stdio by default, or SSE on
+    # FASTMCP_HOST:FASTMCP_PORT with BOX_MCP_TRANSPORT=sse, in
+    # BOX_MCP_WORKERS processes when more than one
+    transport = os.getenv("BOX_MCP_TRANSPORT", "stdio")
+    workers = int(os.getenv("BOX_MCP_WORKERS", "1"))
+    try:
+        if "BOX_MCP_WORKER" in os.environ:
+            from box_workers import serve_worker
+
+            serve_worker(mcp.worker_app)
+        elif transport == "sse" and workers > 1:
+            from box_workers import Supervisor
+
+            Supervisor(
+                [sys.executable, os.path.abspath(__file__)],
+                workers,
+                mcp.settings.host,
+                mcp.settings.port,
+            ).run()
+        else:
+            mcp.run(transport=transport)
+    finally:
+        _box_context.shutdown()
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+from box_admission import Admission, _Limit
+
+
+def test_calls_beyond_the_limit_queue_then_get_a_busy_answer():
+    admission = Admission({"transfer": _Limit(concurrency=2, queue=1, max_wait=0.2)})
+    release = asyncio.Event()
+    running = []
+
+    @admission.limited("transfer")
+    async def download(file_id: str) -> str:
+        running.append(file_id)
+        await release.wait()
+        return f"downloaded {file_id}"
+
+    async def run():
+        first = [asyncio.ensure_future(download(str(i))) for i in range(3)]
+        await asyncio.sleep(0.05)
+        stats = admission.stats()["categories"]["transfer"]
+        assert (stats["active"], stats["queue_depth"]) == (2, 1)
+        assert running == ["0", "1"]
+
+        # Queue full: answered at once
+        busy = json.loads(await download("3"))
+        assert (busy["error"], busy["reason"]) == ("server_busy", "queue_full")
+        assert busy["retry_after_seconds"] >= 1
+
+        # The queued call gives up after the maximum wait
+        queued = json.loads(await first[2])
+        assert queued["reason"] == "queue_wait"
+
+        release.set()
+        return await asyncio.gather(*first[:2])
+
+    assert asyncio.run(run()) == ["downloaded 0", "downloaded 1"]
+    stats = admission.stats()["categories"]["transfer"]
+    assert stats["admitted"] == 2
+    assert (stats["rejected_queue_full"], stats["rejected_queue_wait"]) == (1, 1)
+    assert (stats["active"], stats["queue_depth"], stats["max_queue_depth"]) == (0, 0, 1)
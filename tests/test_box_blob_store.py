@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from box_blob_store import BlobStore, BlobTooLargeError
+
+
+@pytest.fixture
+def clock():
+    now = [0.0]
+    yield now
+
+
+def make_store(tmp_path, clock, **kwargs):
+    return BlobStore(directory=str(tmp_path), clock=lambda: clock[0], **kwargs)
+
+
+def test_stream_and_read_in_chunks(tmp_path, clock):
+    store = make_store(tmp_path, clock, chunk_size=4)
+    blob = store.put([b"0123", b"4567", b"89"], "1", "a.png", "image/png")
+
+    assert blob.size == 10
+    assert store.get_by_uri(blob.uri) == blob
+    assert store.get_by_uri(f"{blob.uri}/chunks/1") == blob
+    assert store.read(blob.blob_id) == b"0123456789"
+    assert store.chunk_count(blob) == 3
+    assert [store.read_chunk(blob.blob_id, i) for i in range(3)] == [b"0123", b"4567", b"89"]
+
+
+def test_blobs_expire_and_are_removed(tmp_path, clock):
+    store = make_store(tmp_path, clock, ttl=10)
+    blob = store.put([b"data"], "1", "a.bin", None)
+    assert blob.mime_type == "application/octet-stream"
+
+    clock[0] = 11
+    assert store.get(blob.blob_id) is None
+    assert not os.path.exists(blob.path)
+    with pytest.raises(KeyError):
+        store.read(blob.blob_id)
+    assert store.stats()["expired"] == 1
+
+
+def test_size_bound(tmp_path, clock):
+    store = make_store(tmp_path, clock, max_bytes=10)
+    first = store.put([b"12345678"], "1", "a.bin", None)
+    second = store.put([b"1234"], "2", "b.bin", None)
+    # The oldest blob makes room for the new one
+    assert store.get(first.blob_id) is None
+    assert store.get(second.blob_id) is not None
+
+    with pytest.raises(BlobTooLargeError):
+        store.put([b"123456", b"123456"], "3", "c.bin", None)
+    assert sorted(os.listdir(tmp_path)) == [second.blob_id]
+
+
+def test_large_blobs_are_read_in_chunks(tmp_path, clock):
+    store = make_store(tmp_path, clock, chunk_size=4, max_read_bytes=8)
+    blob = store.put([b"0123456789"], "1", "a.bin", None)
+
+    with pytest.raises(ValueError, match="chunks/0 to .*chunks/2"):
+        store.read(blob.blob_id)
+    assert store.read_chunk(blob.blob_id, 2) == b"89"
+    for index in (3, -1):
+        with pytest.raises(ValueError):
+            store.read_chunk(blob.blob_id, index)
+
+
+def test_blobs_written_at_once_share_the_size_bound(tmp_path, clock):
+    store = make_store(tmp_path, clock, max_bytes=10)
+    nested = []
+
+    def chunks():
+        yield b"123456"
+        # Another download is stored while this one is being written
+        with pytest.raises(BlobTooLargeError, match="full"):
+            store.put([b"123456"], "2", "b.bin", None)
+        nested.append(store.put([b"12"], "3", "c.bin", None))
+        yield b"12"
+
+    first = store.put(chunks(), "1", "a.bin", None)
+    assert store.stats()["bytes"] == 10
+    assert sorted(os.listdir(tmp_path)) == sorted([first.blob_id, nested[0].blob_id])
+
+
+def test_blob_removed_while_read_is_reported_missing(tmp_path, clock):
+    store = make_store(tmp_path, clock)
+    blob = store.put([b"data"], "1", "a.bin", None)
+    os.remove(blob.path)
+    with pytest.raises(KeyError):
+        store.read_chunk(blob.blob_id, 0)
@@ -0,0 +1,79 @@
+import asyncio
+
+import anyio
+import pytest
+
+from box_cancel import (
+    DISCONNECTED,
+    CancelToken,
+    ClosingStream,
+    OperationCancelled,
+    client_connection,
+    closing_receive,
+    request_token,
+)
+
+
+def test_cancelled_request_and_closed_connection_cancel_tokens():
+    async def run():
+        with client_connection() as connection:
+            started = asyncio.Event()
+            tokens = []
+
+            async def handler():
+                with request_token() as token:
+                    tokens.append(token)
+                    started.set()
+                    await asyncio.sleep(30)
+
+            # The client cancels one request
+            task = asyncio.ensure_future(handler())
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert tokens[0].cancelled
+
+            # The client goes away while another runs
+            send, receive = anyio.create_memory_object_stream(1)
+            stream = ClosingStream(receive, connection.close)
+            with request_token() as token:
+                await send.send("message")
+                await send.aclose()
+                assert [message async for message in stream] == ["message"]
+                assert token.cancelled and token.reason == DISCONNECTED
+            with request_token() as late:
+                assert late.cancelled
+
+    asyncio.run(run())
+
+
+def test_sse_disconnect_closes_connection():
+    messages = [{"type": "http.request"}, {"type": "http.disconnect"}]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def run():
+        with client_connection() as connection:
+            with request_token() as token:
+                wrapped = closing_receive(receive, connection.close)
+                await wrapped()
+                assert not token.cancelled
+                assert (await wrapped())["type"] == "http.disconnect"
+                assert token.reason == DISCONNECTED
+
+    asyncio.run(run())
+
+
+def test_token_stops_iteration_and_sleep():
+    token = CancelToken()
+    seen = []
+    with pytest.raises(OperationCancelled):
+        for item in token.chunks(range(10)):
+            seen.append(item)
+            if item == 2:
+                token.cancel()
+    assert seen == [0, 1, 2]
+    with pytest.raises(OperationCancelled):
+        token.sleep(30)
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import pytest
+
+from box_client_pool import BoxClientPool
+from mcp_server_box import BoxContext
+
+
+class FakeClient:
+    def __init__(self, as_user_id=None):
+        self.as_user_id = as_user_id
+        self.network_session = object()
+
+    def with_as_user_header(self, user_id):
+        client = FakeClient(user_id)
+        client.network_session = self.network_session
+        return client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_pool_reuses_client_per_user():
+    base = FakeClient()
+    pool = BoxClientPool(base, max_clients=10, idle_ttl=60)
+
+    first = pool.get(as_user_id="42")
+    assert pool.get(as_user_id="42") is first
+    assert first.as_user_id == "42"
+    assert first.network_session is base.network_session
+    assert pool.get() is base
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["misses"] == 1
+
+
+def test_pool_evicts_least_recently_used():
+    pool = BoxClientPool(FakeClient(), max_clients=2, idle_ttl=60)
+
+    a = pool.get(as_user_id="a")
+    pool.get(as_user_id="b")
+    pool.get(as_user_id="a")
+    pool.get(as_user_id="c")
+
+    assert len(pool) == 2
+    assert pool.get(as_user_id="a") is a
+    assert pool.stats()["evicted_lru"] == 1
+    # "b" was the least recently used and had to be rebuilt
+    misses = pool.stats()["misses"]
+    pool.get(as_user_id="b")
+    assert pool.stats()["misses"] == misses + 1
+
+
+def test_pool_evicts_idle_clients():
+    clock = FakeClock()
+    pool = BoxClientPool(FakeClient(), max_clients=10, idle_ttl=60, clock=clock)
+
+    a = pool.get(as_user_id="a")
+    clock.now = 30
+    pool.get(as_user_id="b")
+    clock.now = 70
+    pool.evict_idle()
+
+    assert len(pool) == 1
+    assert pool.stats()["evicted_idle"] == 1
+    assert pool.get(as_user_id="a") is not a
+
+
+def test_pool_keys_tokens_by_hash():
+    pool = BoxClientPool(FakeClient(), max_clients=10, idle_ttl=60)
+
+    client = pool.get(access_token="secret-token")
+
+    assert pool.get(access_token="secret-token") is client
+    assert not any("secret-token" in key for key in pool._entries)
+
+
+def test_as_user_only_for_allowed_users(monkeypatch):
+    def ctx(**meta):
+        return SimpleNamespace(request_context=SimpleNamespace(meta=SimpleNamespace(**meta)))
+
+    base = FakeClient()
+    monkeypatch.delenv("BOX_ALLOW_AS_USER", raising=False)
+    context = BoxContext(client_factory=lambda context: base)
+    with pytest.raises(PermissionError):
+        context.client_for(ctx(box_as_user_id="42"))
+    assert context.client_pool is None
+
+    monkeypatch.setenv("BOX_ALLOW_AS_USER", "1")
+    monkeypatch.setenv("BOX_AS_USER_ALLOWLIST", "42, 43")
+    context = BoxContext(client_factory=lambda context: base)
+    assert context.client_for(ctx(box_as_user_id="42")).as_user_id == "42"
+    with pytest.raises(PermissionError):
+        context.identity_for(ctx(box_as_user_id="44"))
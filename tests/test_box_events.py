@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from box_events import EventListener, InvalidationBus
+from mcp_server_box import BoxContext
+
+
+class FakeEvents:
+    def __init__(self):
+        self.log = []
+        self.servers_fetched = 0
+
+    def get_events(self, stream_type=None, stream_position=None, limit=100):
+        if stream_position == "now":
+            return SimpleNamespace(entries=[], next_stream_position=len(self.log))
+        start = int(stream_position)
+        entries = self.log[start : start + limit]
+        return SimpleNamespace(entries=entries, next_stream_position=start + len(entries))
+
+    def get_events_with_long_polling(self):
+        self.servers_fetched += 1
+        server = SimpleNamespace(url="https://realtime.example/subscribe", max_retries="10", retry_timeout=610)
+        return SimpleNamespace(entries=[server])
+
+    def change(self, item_type, item_id, parent_id=None):
+        parent = SimpleNamespace(type="folder", id=parent_id) if parent_id else None
+        self.log.append(SimpleNamespace(source=SimpleNamespace(type=item_type, id=item_id, parent=parent)))
+
+
+class FakeSession:
+    """Long-poll endpoint answering with queued messages or errors."""
+
+    def __init__(self):
+        self.replies = []
+        self.positions = []
+
+    def get(self, url, params=None, timeout=None):
+        self.positions.append(params["stream_position"])
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {"message": reply})
+
+
+@pytest.fixture
+def listener():
+    events = FakeEvents()
+    client = SimpleNamespace(events=events)
+    bus = InvalidationBus()
+    published = []
+    bus.subscribe(lambda item_type, item_id: published.append((item_type, item_id)))
+    listener = EventListener(lambda: client, bus, session=FakeSession())
+    return listener, events, listener._session, published
+
+
+def test_changes_are_published(listener):
+    listener, events, session, published = listener
+    events.change("file", "1", parent_id="10")
+    events.change("folder", "20")
+    events.change("user", "5")
+    listener.stream_position = "0"
+    session.replies = ["new_change"]
+
+    listener.poll_once()
+    assert published == [("file", "1"), ("folder_items", "10"), ("folder", "20")]
+    assert listener.stream_position == "3"
+
+
+def test_position_survives_disconnects(listener):
+    listener, events, session, published = listener
+    session.replies = ["reconnect", requests.ConnectionError("dropped"), "new_change"]
+    listener.poll_once()
+    position = listener.stream_position
+
+    events.change("file", "1")
+    with pytest.raises(requests.ConnectionError):
+        listener.poll_once()
+    listener._server = None
+    listener.poll_once()
+
+    assert session.positions == [position] * 3
+    assert published == [("file", "1")]
+    assert events.servers_fetched == 3
+
+
+def test_folder_changes_drop_the_text_of_files_inside():
+    context = BoxContext()
+    context.text_cache.put("1", "text of 1")
+    # A file changed in the folder: only that file's text is dropped
+    context.invalidations.publish("folder_items", "10")
+    assert context.text_cache.get("1") == "text of 1"
+    # The folder itself was trashed, moved or re-shared
+    context.invalidations.publish("folder", "10")
+    assert context.text_cache.get("1") is None
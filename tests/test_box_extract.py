@@ -0,0 +1,175 @@
+import asyncio
+import io
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import box_extract
+from box_extract import TextExtractor, extract_file
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+A = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+S = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+R = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+
+def office_file(parts: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, xml in parts.items():
+            archive.writestr(name, xml)
+    return buffer.getvalue()
+
+
+DOCX = office_file(
+    {
+        "word/document.xml": f"<w:document {W}><w:body>"
+        "<w:p><w:r><w:t>Quarterly </w:t></w:r><w:r><w:t>report</w:t></w:r></w:p>"
+        "<w:p><w:r><w:t>Revenue</w:t><w:tab/><w:t>up</w:t></w:r></w:p>"
+        "</w:body></w:document>"
+    }
+)
+
+
+def test_office_documents_are_extracted(tmp_path):
+    pptx = office_file(
+        {
+            f"ppt/slides/slide{n}.xml": f"<p:sld {A} xmlns:p='urn:p'><a:p><a:r><a:t>{text}</a:t></a:r></a:p></p:sld>"
+            for n, text in ((2, "Second"), (10, "Tenth"), (1, "First"))
+        }
+    )
+    xlsx = office_file(
+        {
+            "xl/workbook.xml": f"<workbook {S} {R}><sheets><sheet name='Budget' r:id='rId1'/></sheets></workbook>",
+            "xl/_rels/workbook.xml.rels": "<Relationships xmlns='http://schemas.openxmlformats.org/package/2006/relationships'>"
+            "<Relationship Id='rId1' Target='worksheets/sheet1.xml'/></Relationships>",
+            "xl/sharedStrings.xml": f"<sst {S}><si><t>Travel</t></si></sst>",
+            "xl/worksheets/sheet1.xml": f"<worksheet {S}><sheetData><row>"
+            "<c t='s'><v>0</v></c><c><v>1200</v></c><c t='inlineStr'><is><t>approved</t></is></c>"
+            "</row></sheetData></worksheet>",
+        }
+    )
+    for extension, data in (("docx", DOCX), ("pptx", pptx), ("xlsx", xlsx)):
+        (tmp_path / f"f.{extension}").write_bytes(data)
+
+    assert extract_file(str(tmp_path / "f.docx"), "docx") == "Quarterly report\nRevenue\tup"
+    assert extract_file(str(tmp_path / "f.pptx"), "pptx") == (
+        "Slide 1\nFirst\n\nSlide 2\nSecond\n\nSlide 3\nTenth"
+    )
+    assert extract_file(str(tmp_path / "f.xlsx"), "xlsx") == "# Budget\nTravel\t1200\tapproved"
+
+
+def test_local_extraction_replaces_missing_or_slow_box_text():
+    client = SimpleNamespace(
+        files=SimpleNamespace(
+            get_file_by_id=lambda file_id, fields: SimpleNamespace(name="report.docx", size=len(DOCX))
+        ),
+        downloads=SimpleNamespace(download_file=lambda file_id: io.BytesIO(DOCX)),
+    )
+    extractor = TextExtractor(fallback_after=0.2)
+
+    async def empty():
+        return ""
+
+    async def slow():
+        await asyncio.sleep(30)
+
+    async def fast():
+        return "from Box"
+
+    async def run():
+        try:
+            missing = await extractor.extract(client, "1", empty)
+            stalled = await extractor.extract(client, "1", slow)
+            ready = await extractor.extract(client, "1", fast)
+        finally:
+            extractor.shutdown()
+        return missing, stalled, ready
+
+    missing, stalled, ready = asyncio.run(run())
+    assert (missing.source, missing.fallback) == ("local", "empty")
+    assert missing.text.startswith("Quarterly report")
+    assert (stalled.source, stalled.fallback) == ("local", "slow")
+    assert (ready.text, ready.source, ready.fallback) == ("from Box", "box", None)
+    assert extractor.stats()["by_source"] == {"box": 1, "local": 2}
+
+
+def test_abandoned_download_leaves_no_temp_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+
+    class SlowStream:
+        chunks = [b"late", b""]
+
+        def read(self, size):
+            started.set()
+            release.wait(5)
+            return self.chunks.pop(0)
+
+    client = SimpleNamespace(
+        files=SimpleNamespace(
+            get_file_by_id=lambda file_id, fields: SimpleNamespace(name="notes.txt", size=10)
+        ),
+        downloads=SimpleNamespace(download_file=lambda file_id: SlowStream()),
+    )
+    downloads = []
+
+    async def run(endpoint, func, *args, **kwargs):
+        thread = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+        downloads.append(thread)
+        return await asyncio.shield(thread)
+
+    async def main():
+        task = asyncio.ensure_future(TextExtractor().extract_local(client, "1", run))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        release.set()
+        await asyncio.gather(task, *downloads, return_exceptions=True)
+
+    asyncio.run(main())
+    assert os.listdir(tmp_path) == []
+
+
+def test_parse_timeout_spares_other_parses(monkeypatch):
+    stuck = threading.Event()
+    contents = {"slow": b"slow", "fast": b"fast"}
+
+    def parse(path, extension):
+        with open(path, "rb") as f:
+            content = f.read()
+        if content == b"slow":
+            stuck.wait(5)
+        else:
+            time.sleep(0.4)
+        return content.decode()
+
+    monkeypatch.setattr(box_extract, "extract_file", parse)
+    client = SimpleNamespace(
+        files=SimpleNamespace(
+            get_file_by_id=lambda file_id, fields: SimpleNamespace(name=f"{file_id}.txt", size=4)
+        ),
+        downloads=SimpleNamespace(download_file=lambda file_id: io.BytesIO(contents[file_id])),
+    )
+    extractor = TextExtractor(timeout=0.5)
+    pool = extractor._executor = ThreadPoolExecutor(2)
+
+    async def main():
+        slow = asyncio.ensure_future(extractor.extract_local(client, "slow"))
+        await asyncio.sleep(0.3)
+        fast = asyncio.ensure_future(extractor.extract_local(client, "fast"))
+        return await asyncio.gather(slow, fast, return_exceptions=True)
+
+    try:
+        slow, fast = asyncio.run(main())
+    finally:
+        stuck.set()
+    assert isinstance(slow, box_extract.UnsupportedFile)
+    assert fast == "fast"
+    # The pool with the stuck parse was stopped once the other one finished
+    assert pool._shutdown
+    assert extractor.stats()["timeouts"] == 1
+    assert extractor.stats()["pools_retired"] == 0
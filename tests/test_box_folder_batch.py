@@ -0,0 +1,88 @@
+import itertools
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from box_folder_batch import parse_operations, run_folder_operations
+
+
+class FakeFolders:
+    def __init__(self):
+        self.parents = {"0": None, "7": "0", "70": "7", "71": "7"}
+        self.calls = []
+        self._ids = itertools.count(100)
+        self._lock = threading.Lock()
+
+    def create_folder(self, name, parent):
+        if parent.id not in self.parents:
+            raise ValueError(f"No folder {parent.id}")
+        with self._lock:
+            folder_id = str(next(self._ids))
+            self.parents[folder_id] = parent.id
+            self.calls.append(("create", name))
+        return SimpleNamespace(id=folder_id, name=name)
+
+    def update_folder_by_id(self, folder_id, name=None, description=None, parent=None):
+        if parent:
+            self.parents[folder_id] = parent.id
+        self.calls.append(("update", folder_id))
+        return SimpleNamespace(id=folder_id, name=name)
+
+    def delete_folder_by_id(self, folder_id, recursive=False):
+        children = [f for f, p in self.parents.items() if p == folder_id]
+        if children and not recursive:
+            raise ValueError("Folder is not empty")
+        for child in children:
+            self.delete_folder_by_id(child, recursive=True)
+        del self.parents[folder_id]
+        self.calls.append(("delete", folder_id))
+
+    def get_folder_items(self, folder_id, **kwargs):
+        entries = [
+            SimpleNamespace(id=f, type="folder") for f, p in self.parents.items() if p == folder_id
+        ]
+        return SimpleNamespace(entries=entries, next_marker=None)
+
+
+def test_dependencies():
+    operations = parse_operations([
+        {"action": "create", "name": "Project", "ref": "p"},
+        {"action": "create", "name": "Specs", "parent_id": "$p"},
+        {"action": "create", "name": "Notes", "parent_id": "$p"},
+        {"action": "create", "name": "Other"},
+        {"action": "update", "folder_id": "7", "name": "Renamed"},
+        {"action": "create", "name": "In 7", "parent_id": 7},
+        {"action": "delete", "folder_id": "7", "recursive": True},
+    ])
+    assert [op.depends_on for op in operations] == [set(), {0}, {0}, set(), set(), {4}, {4, 5}]
+
+    with pytest.raises(ValueError, match=r"\$q does not name an earlier create"):
+        parse_operations([{"action": "create", "name": "a", "parent_id": "$q"}])
+    with pytest.raises(ValueError, match="folder_id is required"):
+        parse_operations([{"action": "delete"}])
+
+
+def test_batch_runs_in_dependency_order():
+    folders = FakeFolders()
+    progress = []
+    result = run_folder_operations(
+        SimpleNamespace(folders=folders),
+        [
+            {"action": "create", "name": "Project", "ref": "p"},
+            {"action": "create", "name": "Specs", "parent_id": "$p", "ref": "s"},
+            {"action": "create", "name": "Broken", "parent_id": "404", "ref": "b"},
+            {"action": "create", "name": "Under broken", "parent_id": "$b"},
+            {"action": "delete", "folder_id": "7", "recursive": True},
+        ],
+        rate=1000,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+    statuses = [r["status"] for r in result["results"]]
+    assert statuses == ["done", "done", "failed", "skipped", "done"]
+    specs_id = result["results"][1]["folder_id"]
+    assert folders.parents[specs_id] == result["results"][0]["folder_id"]
+    assert "7" not in folders.parents and "70" not in folders.parents
+    assert result["results"][4]["subfolders"] == 2
+    # Subfolders of the recursive delete count as units of work
+    assert max(progress) == (7, 7)
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import logging
+import queue
+
+import box_logging
+from box_logging import JsonFormatter, _QueueHandler, note_request_id, tool_call
+
+
+def test_tool_call_record_has_structured_fields(caplog):
+    async def call(failing):
+        async with tool_call("box_read_tool") as outcome:
+            await asyncio.to_thread(note_request_id, "abc123")
+            if failing:
+                outcome["error"] = "Error reading file: not found"
+
+    caplog.set_level(logging.INFO, logger="box_logging")
+    asyncio.run(call(failing=False))
+    asyncio.run(call(failing=True))
+    ok, failed = caplog.records
+    assert (ok.levelno, ok.tool, ok.status, ok.box_request_ids) == (
+        logging.INFO, "box_read_tool", "ok", ["abc123"]
+    )
+    assert (failed.levelno, failed.status) == (logging.WARNING, "error")
+    entry = json.loads(JsonFormatter().format(failed))
+    assert entry["error"] == "Error reading file: not found"
+    assert entry["duration_ms"] >= 0 and entry["box_request_ids"] == ["abc123"]
+
+    # Successful calls are sampled; failures are always logged
+    caplog.clear()
+    box_logging._sample_rate = 0.0
+    try:
+        asyncio.run(call(failing=False))
+        asyncio.run(call(failing=True))
+    finally:
+        box_logging._sample_rate = 1.0
+    assert [r.status for r in caplog.records] == ["error"]
+
+
+def test_queue_handler_defers_formatting_and_drops_when_full():
+    class Lazy:
+        formatted = 0
+
+        def __str__(self):
+            Lazy.formatted += 1
+            return "lazy"
+
+    handler = _QueueHandler(queue.Queue(1))
+    log = logging.getLogger("test_box_logging.queue")
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        log.warning("first %s", Lazy())
+        log.warning("second %s", Lazy())
+    finally:
+        log.removeHandler(handler)
+    assert (handler.dropped, Lazy.formatted) == (1, 0)
+    assert handler.queue.get_nowait().getMessage() == "first lazy"
@@ -0,0 +1,76 @@
+import asyncio
+import base64
+import hashlib
+import io
+from types import SimpleNamespace
+
+from box_memory import AllocationTracker, ByteBudget
+
+
+def test_budget_refuses_reservations_beyond_its_limit():
+    budget = ByteBudget(100)
+    first = budget.try_reserve(60)
+    assert first is not None and budget.available() == 40
+    assert budget.try_reserve(50) is None
+    with budget.try_reserve(40):
+        assert budget.available() == 0
+    first.release()
+    first.release()
+    assert budget.available() == 100
+    stats = budget.stats()
+    assert (stats["granted"], stats["refused"], stats["peak_reserved_bytes"]) == (2, 1, 100)
+
+
+def test_tracker_records_the_peak_of_each_tool_call():
+    tracker = AllocationTracker(enabled=True)
+
+    async def call():
+        async with tracker.track("box_download_file_tool"):
+            buffer = bytearray(4 * 1024 * 1024)
+            del buffer
+
+    asyncio.run(call())
+    peaks = tracker.stats()["tools"]["box_download_file_tool"]
+    assert peaks["calls"] == 1 and peaks["overlapped_calls"] == 0
+    assert peaks["max_peak_bytes"] >= 4 * 1024 * 1024
+
+
+def test_chunked_upload_streams_parts_the_budget_cannot_hold(tmp_path, monkeypatch):
+    import box_transfer
+
+    monkeypatch.setattr(box_transfer, "CHUNKED_UPLOAD_MIN_SIZE", 10)
+    parts, bodies = [], []
+
+    def upload_part(session_id, body, digest, content_range):
+        data = body.read()
+        assert digest == "sha=" + base64.b64encode(hashlib.sha1(data).digest()).decode()
+        bodies.append(type(body))
+        parts.append(data)
+        return SimpleNamespace(part=content_range)
+
+    def commit(session_id, uploaded, digest):
+        assert digest == "sha=" + base64.b64encode(hashlib.sha1(b"".join(parts)).digest()).decode()
+        return SimpleNamespace(entries=[SimpleNamespace(id="f1")])
+
+    box = SimpleNamespace(
+        uploads=SimpleNamespace(preflight_file_upload_check=lambda **kwargs: None),
+        chunked_uploads=SimpleNamespace(
+            create_file_upload_session=lambda parent_id, size, name: SimpleNamespace(
+                id="s1", part_size=8
+            ),
+            upload_file_part=upload_part,
+            create_file_upload_session_commit=commit,
+        ),
+    )
+    source = tmp_path / "big.bin"
+    source.write_bytes(bytes(range(20)))
+    budget = ByteBudget(8)
+    held = budget.try_reserve(4)
+
+    # Only the last, shorter part fits in what is left of the budget
+    result = box_transfer.upload_file_from(box, str(source), "big.bin", "0", budget=budget)
+    assert (result.status, result.file_id) == ("uploaded", "f1")
+    assert b"".join(parts) == source.read_bytes()
+    assert bodies == [box_transfer._FileSlice, box_transfer._FileSlice, io.BytesIO]
+    held.release()
+    assert budget.available() == 8
@@ -0,0 +1,66 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from box_network import HttpConfig, PooledNetworkClient, request_category
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.startswith("/slow"):
+            time.sleep(0.5)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_request_category():
+    assert request_category("https://api.box.com/2.0/ai/ask") == "ai"
+    assert request_category("https://api.box.com/2.0/ai/extract_structured") == "ai"
+    assert request_category("https://api.box.com/2.0/files/1/content") == "content"
+    assert request_category("https://upload.box.com/api/2.0/files/content") == "content"
+    assert request_category("https://dl.boxcloud.com/api/2.0/internal_files/1") == "content"
+    assert request_category("https://api.box.com/2.0/folders/0/items") == "metadata"
+    assert request_category("https://api.box.com/2.0/docgen_batches") == "metadata"
+
+
+def test_connections_are_reused(server_url):
+    client = PooledNetworkClient(HttpConfig())
+    for _ in range(5):
+        response = client.requests_session.get(f"{server_url}/2.0/users/me")
+        assert response.json() == {"ok": True}
+
+    stats = client.stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["idle_connections"] == 1
+    assert stats["requests_by_category"]["metadata"] == 5
+
+
+def test_category_timeouts(server_url):
+    client = PooledNetworkClient(HttpConfig(metadata_timeout=0.1, content_timeout=5))
+    with pytest.raises(requests.Timeout):
+        client.requests_session.get(f"{server_url}/slow/2.0/folders/0")
+    # Downloads get the longer content timeout
+    response = client.requests_session.get(f"{server_url}/slow/2.0/files/1/content")
+    assert response.status_code == 200
@@ -0,0 +1,126 @@
+import base64
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from box_paging import (
+    TextCache,
+    decode_cursor,
+    encode_cursor,
+    decode_utf8_prefix,
+    resolve_window,
+    text_window,
+)
+from mcp_server_box import _download_window
+
+
+def test_text_windows_cover_the_text_on_word_boundaries():
+    text = " ".join(f"word{i}" for i in range(1000))
+    pieces = []
+    window = text_window("1", text, 0, 100)
+    while True:
+        assert window["total_length"] == len(text)
+        assert window["length"] <= 100
+        pieces.append(window["text"])
+        if window["next_cursor"] is None:
+            break
+        assert window["text"].endswith(" ")
+        offset, length = decode_cursor(window["next_cursor"], "1")
+        window = text_window("1", text, offset, length)
+    assert "".join(pieces) == text
+
+
+def test_cursor_is_bound_to_file():
+    cursor = text_window("1", "a b c d e", 0, 2)["next_cursor"]
+    with pytest.raises(ValueError):
+        resolve_window("2", None, None, cursor, 100)
+    with pytest.raises(ValueError):
+        resolve_window("1", None, None, "not-a-cursor", 100)
+    for offset, length in ((-1, 10), (0, 0), (5, -10)):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            resolve_window("1", None, None, encode_cursor("1", offset, length), 100)
+    assert resolve_window("1", None, None, None, 100) == (0, 100)
+
+
+def test_decode_utf8_prefix_stops_before_split_character():
+    data = "héllo".encode("utf-8")
+    # Cut inside the two-byte "é"
+    text, consumed = decode_utf8_prefix(data[:2], final=False)
+    assert (text, consumed) == ("h", 1)
+    text, consumed = decode_utf8_prefix(data[consumed:], final=True)
+    assert text == "éllo"
+
+
+def download_client(name: str, content: bytes, honor_range: bool = True):
+    streams = []
+
+    def download_file(file_id, range):
+        start, end = (int(n) for n in range.split("=")[1].split("-"))
+        streams.append(io.BytesIO(content[start : end + 1] if honor_range else content))
+        return streams[-1]
+
+    client = SimpleNamespace(
+        files=SimpleNamespace(
+            get_file_by_id=lambda file_id, fields: SimpleNamespace(name=name, size=len(content))
+        ),
+        downloads=SimpleNamespace(download_file=download_file),
+    )
+    return client, streams
+
+
+def test_text_windows_smaller_than_a_character_advance():
+    client, _ = download_client("a.txt", "é€a".encode("utf-8"))
+    texts, offset = [], 0
+    while offset is not None:
+        window = _download_window(client, "1", offset, 1)
+        texts.append(window["content"])
+        cursor = window["next_cursor"]
+        offset = decode_cursor(cursor, "1")[0] if cursor else None
+    assert texts == ["é", "€", "a"]
+
+
+def test_window_ignoring_range_keeps_only_the_window():
+    content = bytes(range(256)) * 1024
+    client, streams = download_client("a.bin", content, honor_range=False)
+    window = _download_window(client, "1", 200 * 1024, 100)
+    assert window["length"] == 100
+    assert window["content_base64"] == base64.b64encode(content[200 * 1024 : 200 * 1024 + 100]).decode()
+    assert streams[0].closed
+
+
+def test_text_cache_scopes_and_bounds():
+    now = [0.0]
+    cache = TextCache(max_bytes=10, ttl=60, clock=lambda: now[0])
+    loads = []
+
+    def load(text):
+        loads.append(text)
+        return text
+
+    assert cache.get_or_load("1", lambda: load("aaaa"), identity="") == "aaaa"
+    assert cache.get_or_load("1", lambda: load("bbbb"), identity="") == "aaaa"
+    # Another identity never gets the first one's text
+    assert cache.get_or_load("1", lambda: load("cccc"), identity="as-user:7") == "cccc"
+
+    # Over the byte budget: the least recently used entry goes
+    cache.get_or_load("2", lambda: load("dddd"))
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= 10
+
+    cache.invalidate("2")
+    now[0] = 61
+    assert cache.get_or_load("1", lambda: load("eeee"), identity="as-user:7") == "eeee"
+    assert loads == ["aaaa", "cccc", "dddd", "eeee"]
+
+
+def test_text_cache_ttl_per_identity():
+    now = [0.0]
+    cache = TextCache(ttl=60, ttl_by_identity={"": 3600}, clock=lambda: now[0])
+    cache.put("1", "own", identity="")
+    cache.put("1", "other", identity="as-user:7")
+
+    now[0] = 61
+    assert cache.get("1", identity="") == "own"
+    assert cache.get("1", identity="as-user:7") is None
+    assert not cache.contains("1", identity="as-user:7")
@@ -0,0 +1,103 @@
+import threading
+
+import box_ai_agents_toolkit
+from box_prefetch import Prefetcher
+from box_resilience import Resilience, ResilienceConfig
+from mcp_server_box import BoxContext
+
+
+def test_prefetch_within_budget_and_hit_rate():
+    prefetcher = Prefetcher(top_n=3, per_minute=4)
+    release = threading.Event()
+    cache = {"cached": "text of cached"}
+
+    def load(file_id):
+        if file_id == "slow":
+            release.wait(5)
+        if file_id == "broken":
+            raise RuntimeError("no text")
+        return f"text of {file_id}"
+
+    def schedule(file_ids):
+        return prefetcher.schedule(
+            file_ids, "", load, store=cache.__setitem__, cached=cache.__contains__
+        )
+
+    # Only the first three are considered, and cached files are skipped
+    assert schedule(["slow", "cached", "a", "b"]) == 2
+    # The budget of four per minute is used up after two more
+    assert schedule(["broken", "c", "d"]) == 2
+
+    # A read joins the prefetch in flight instead of extracting again
+    pending = prefetcher.pending("slow")
+    release.set()
+    assert pending.result(5) == "text of slow"
+    prefetcher.record_read("slow", served=True)
+    prefetcher._pool().shutdown(wait=True)
+
+    prefetcher.record_read("a", served="a" in cache)
+    prefetcher.record_read("c", served=False)
+    prefetcher.record_read("broken", served=False)
+    stats = prefetcher.stats()
+    assert (stats["scheduled"], stats["fetched"], stats["failed"]) == (4, 3, 1)
+    assert (stats["skipped_cached"], stats["skipped_budget"], stats["joined"]) == (1, 1, 1)
+    assert (stats["used"], stats["hit_rate"], stats["in_flight"]) == (2, 0.5, 0)
+
+
+def test_prefetches_cancelled_by_shutdown_are_forgotten():
+    prefetcher = Prefetcher(top_n=2, max_concurrency=1)
+    release = threading.Event()
+    cache = {}
+
+    def load(file_id):
+        release.wait(5)
+        return f"text of {file_id}"
+
+    def schedule(file_ids):
+        return prefetcher.schedule(
+            file_ids, "", load, store=cache.__setitem__, cached=cache.__contains__
+        )
+
+    assert schedule(["running", "queued"]) == 2
+    prefetcher.shutdown()
+    release.set()
+    # A read does not join the cancelled prefetch, and it can be scheduled again
+    assert prefetcher.pending("queued") is None
+    release.clear()
+    assert schedule(["queued"]) == 1
+    pending = prefetcher.pending("queued")
+    release.set()
+    assert pending.result(5) == "text of queued"
+    prefetcher.shutdown()
+
+
+def test_context_prefetch_skips_empty_text_and_open_circuits(monkeypatch):
+    texts = {"new": "", "old": "text of old"}
+    calls = []
+
+    def extract(client, file_id):
+        calls.append(file_id)
+        if file_id == "down":
+            raise ConnectionError("connection refused")
+        return texts[file_id]
+
+    monkeypatch.setattr(box_ai_agents_toolkit, "box_file_text_extract", extract)
+    context = BoxContext(
+        prefetcher=Prefetcher(top_n=5),
+        resilience=Resilience(ResilienceConfig(failure_threshold=1, reset_timeout=60)),
+    )
+    def prefetch(*file_ids):
+        context.prefetch(None, "", [(file_id, f"{file_id}.txt") for file_id in file_ids])
+        pool, context.prefetcher._executor = context.prefetcher._executor, None
+        pool.shutdown(wait=True)
+
+    prefetch("new", "old")
+    # A file Box has no text for yet is left for box_read_tool to extract
+    assert context.text_cache.get("new") is None
+    assert context.text_cache.get("old") == "text of old"
+
+    prefetch("down")
+    prefetch("down")
+    # The second prefetch found the circuit open and did not call Box
+    assert calls.count("down") == 1
+    assert context.resilience.stats()["endpoints"]["text_extract"]["rejected"] == 1
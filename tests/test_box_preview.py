@@ -0,0 +1,76 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from box_preview import (
+    PreviewCache,
+    PreviewUnavailableError,
+    downscale,
+    get_preview,
+    representation_for,
+)
+
+
+def test_representation_for():
+    assert representation_for(100, 1) == ("jpg", 160, "")
+    assert representation_for(320, 1) == ("jpg", 320, "")
+    assert representation_for(5000, 1) == ("jpg", 2048, "")
+    # Later pages only exist as paged PNGs
+    assert representation_for(100, 3) == ("png", 1024, "3.png")
+
+
+def test_downscale():
+    Image = pytest.importorskip("PIL.Image")
+    original = io.BytesIO()
+    Image.new("RGB", (1600, 800), "red").save(original, format="BMP")
+
+    data, mime_type = downscale(original.getvalue(), 200)
+    assert mime_type == "image/jpeg"
+    with Image.open(io.BytesIO(data)) as preview:
+        assert preview.size == (200, 100)
+    assert downscale(b"not an image", 200) is None
+
+
+def test_preview_cache_is_bounded():
+    cache = PreviewCache(max_bytes=10)
+    preview = SimpleNamespace(data=b"123456")
+    cache.put(("", "1"), preview)
+    cache.put(("", "2"), preview)
+    assert cache.get(("", "1")) is None
+    assert cache.get(("", "2")) is preview
+    assert cache.stats()["bytes"] == 6
+
+
+def _client(name, representations=None):
+    downloads = []
+    file_info = SimpleNamespace(
+        name=name,
+        size=100,
+        file_version=SimpleNamespace(id="v1"),
+        representations=representations,
+    )
+    client = SimpleNamespace(
+        files=SimpleNamespace(get_file_by_id=lambda file_id, **kwargs: file_info),
+        downloads=SimpleNamespace(
+            download_file=lambda file_id: downloads.append(file_id) or io.BytesIO(b"raw")
+        ),
+    )
+    return client, downloads
+
+
+def test_without_representation_only_images_fall_back(monkeypatch):
+    client, downloads = _client("report.docx")
+    with pytest.raises(PreviewUnavailableError):
+        get_preview(client, PreviewCache(), "", "1")
+    assert downloads == []
+
+    monkeypatch.setattr("box_preview.downscale", lambda data, size: (b"small", "image/jpeg"))
+    cache = PreviewCache()
+    client, downloads = _client("photo.heic")
+    preview, details = get_preview(client, cache, "", "2", size=100)
+    assert (preview.data, preview.source) == (b"small", "downscaled")
+    assert details["file_version_id"] == "v1"
+    # Cached per version and size: the original is not downloaded again
+    get_preview(client, cache, "", "2", size=100)
+    assert downloads == ["2"]
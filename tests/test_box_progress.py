@@ -0,0 +1,72 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from box_progress import DurationEstimate, ProgressReporter
+
+
+class FakeContext:
+    def __init__(self, token=1):
+        self.progress = []
+        self.logs = []
+        session = SimpleNamespace(send_log_message=self._log)
+        meta = SimpleNamespace(progressToken=token) if token is not None else None
+        self.request_context = SimpleNamespace(meta=meta, session=session)
+
+    async def report_progress(self, progress, total=None):
+        self.progress.append((progress, total))
+
+    async def _log(self, level, data, logger=None):
+        self.logs.append(data)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_progress_is_throttled_and_carries_details():
+    ctx = FakeContext()
+    clock = FakeClock()
+
+    async def run():
+        progress = ProgressReporter(ctx, unit="bytes", clock=clock)
+        progress.update(total=100)
+        clock.now = 0.5
+        progress.update(advance=10, bytes=10)  # within min_interval
+        clock.now = 2.0
+        progress.update(advance=40, bytes=40)
+        progress.partial({"items": [1]})
+        clock.now = 2.1
+        progress.update(advance=50, bytes=50)  # final one is always sent
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert ctx.progress == [(0.0, 100), (50.0, 100), (100.0, 100)]
+    assert ctx.logs[1]["eta_seconds"] == 2.0
+    assert ctx.logs[1]["bytes"] == 50
+    assert ctx.logs[2]["partial_result"] == {"items": [1]}
+    assert ctx.logs[3]["eta_seconds"] == 0.0
+
+
+def test_no_notifications_without_token_and_heartbeat_from_thread():
+    silent = FakeContext(token=None)
+    ctx = FakeContext()
+    estimate = DurationEstimate(initial=10.0, weight=0.5)
+
+    async def run():
+        ProgressReporter(silent).update(done=1, total=1)
+        result = await ProgressReporter(ctx, unit="seconds", min_interval=0).run_with_heartbeat(
+            time.sleep, 0.15, estimate=estimate, interval=0.05
+        )
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) is None
+    assert silent.progress == [] and silent.logs == []
+    assert ctx.progress and all(total == 10.0 for _, total in ctx.progress)
+    assert "eta_seconds" not in ctx.logs[0]
+    assert 5.0 < estimate.value < 5.2
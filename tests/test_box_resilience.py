@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+
+from box_resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    Resilience,
+    ResilienceConfig,
+)
+
+
+def test_slow_read_is_hedged_and_the_hedge_wins():
+    resilience = Resilience(ResilienceConfig(hedge_initial_delay=0.05, hedge_budget=1.0))
+    calls = []
+    lock = threading.Lock()
+
+    def read(file_id):
+        with lock:
+            calls.append(file_id)
+            first = len(calls) == 1
+        time.sleep(1.0 if first else 0.01)
+        return f"text of {file_id}"
+
+    started = time.monotonic()
+    assert asyncio.run(resilience.call("text_extract", read, "7", idempotent=True)) == "text of 7"
+    assert time.monotonic() - started < 0.5
+    assert calls == ["7", "7"]
+    stats = resilience.stats()["endpoints"]["text_extract"]
+    assert (stats["hedged"], stats["hedge_wins"], stats["hedge_win_rate"]) == (1, 1, 1.0)
+
+    # Writes are never sent twice
+    calls.clear()
+    asyncio.run(resilience.call("upload", read, "8"))
+    assert calls == ["8"]
+
+
+def test_circuit_opens_after_failures_and_deadlines_apply():
+    config = ResilienceConfig(failure_threshold=2, reset_timeout=60)
+    config.deadlines["search"] = 0.1
+    resilience = Resilience(config)
+
+    def down():
+        raise requests.ConnectionError("connection refused")
+
+    def not_found():
+        response = requests.Response()
+        response.status_code = 404
+        raise requests.HTTPError("404", response=response)
+
+    async def run():
+        # Client errors say nothing about the endpoint's health
+        for _ in range(3):
+            with pytest.raises(requests.HTTPError):
+                await resilience.call("file_info", not_found)
+        for _ in range(2):
+            with pytest.raises(requests.ConnectionError):
+                await resilience.call("file_info", down)
+        with pytest.raises(CircuitOpenError):
+            await resilience.call("file_info", lambda: "never called")
+        with pytest.raises(DeadlineExceeded):
+            await resilience.call("search", time.sleep, 1.0)
+
+    asyncio.run(run())
+    stats = resilience.stats()["endpoints"]
+    assert stats["file_info"]["circuit"] == "open"
+    assert stats["file_info"]["rejected"] == 1
+    assert stats["search"]["deadlines_exceeded"] == 1
+
+
+def test_half_open_circuit_lets_one_trial_through():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 11
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
@@ -0,0 +1,51 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from box_retrieval import chunk_text, VectorIndex  # noqa: E402
+
+CONTRACT = (
+    "This agreement sets out the termination terms. Either party may terminate the "
+    "contract with ninety days written notice. " * 20
+)
+POLICY = "Employees book economy class for flights under six hours. Hotels need approval. " * 20
+MINUTES = "The committee approved the budget for the new Berlin office and hiring plan. " * 20
+
+
+def test_chunks_overlap_and_start_on_words():
+    chunks = chunk_text(CONTRACT, size=300, overlap=60)
+    assert len(chunks) > 5
+    for (start, text), (next_start, _) in zip(chunks, chunks[1:]):
+        assert CONTRACT[start:].lstrip().startswith(text)
+        assert next_start < start + len(text)
+        assert CONTRACT[next_start - 1] == " "
+
+
+def test_search_ranks_files_and_reuses_rows(tmp_path):
+    index = VectorIndex(str(tmp_path), dimensions=256)
+    index.add("1", CONTRACT, name="contract.pdf")
+    index.add("2", POLICY, name="travel.docx")
+    index.add("3", MINUTES)
+    index.add("4", POLICY, identity="user:42")
+
+    files = index.search("How much notice is needed to terminate the contract?", max_files=2)
+    assert files[0]["file_id"] == "1"
+    assert files[0]["name"] == "contract.pdf"
+    assert 1 <= len(files[0]["passages"]) <= 2
+    assert "notice" in files[0]["passages"][0]["text"]
+    assert index.search("flight class", max_files=1)[0]["file_id"] == "2"
+    assert [f["file_id"] for f in index.search("flight class", identity="user:42")] == ["4"]
+    with pytest.raises(ValueError):
+        index.search("?")
+
+    # Re-indexing a file reuses its rows, and the index survives a restart
+    rows = index.stats()["rows"]
+    index.add("1", MINUTES)
+    index.invalidate("3")
+    reopened = VectorIndex(str(tmp_path), dimensions=256)
+    assert reopened.stats()["rows"] == rows
+    assert reopened.search("Berlin office budget")[0]["file_id"] == "1"
+    assert reopened.search("Berlin office budget")[0]["name"] == "contract.pdf"
+    assert reopened.stats()["files"] == 3
+    with pytest.raises(ValueError):
+        VectorIndex(str(tmp_path), dimensions=512)
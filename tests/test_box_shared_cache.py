@@ -0,0 +1,45 @@
+from box_paging import TextCache
+from box_preview import Preview, PreviewCache
+from box_shared_cache import SharedCache
+
+
+def test_processes_share_text_and_see_invalidations(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    # Two caches on one file, as in two worker processes
+    first = TextCache(shared=SharedCache(path))
+    second = TextCache(shared=SharedCache(path))
+
+    first.put("1", "text of 1", identity="user")
+    assert second.get("1", identity="user") == "text of 1"
+    assert second.get("1", identity="other") is None
+    assert second.contains("1", identity="user")
+
+    # Replaced or invalidated elsewhere: the in-memory copy is not served
+    first.put("1", "new text of 1", identity="user")
+    assert second.get("1", identity="user") == "new text of 1"
+    first.invalidate("1")
+    assert second.get("1", identity="user") is None
+    assert (second.hits, second.misses) == (2, 2)
+
+    previews = PreviewCache(shared=SharedCache(path))
+    previews.put(("user", "2", "v1", 320, 1), Preview(b"jpeg", "image/jpeg", "representation"))
+    found = PreviewCache(shared=SharedCache(path)).get(("user", "2", "v1", 320, 1))
+    assert (found.data, found.mime_type, found.source) == (b"jpeg", "image/jpeg", "representation")
+
+
+def test_oldest_entries_are_evicted_beyond_the_limit(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.sqlite"), max_bytes=1000)
+    for i in range(128):
+        cache.put("text", str(i), str(i), b"x" * 100)
+    stats = cache.stats()
+    assert stats["bytes"] <= 900
+    assert cache.get("text", "0") is None
+    assert cache.get("text", "127") is not None
+
+
+def test_unusable_database_leaves_caches_per_process(tmp_path, monkeypatch):
+    not_a_database = tmp_path / "cache.sqlite"
+    not_a_database.write_bytes(b"not a database" * 100)
+    for path in (not_a_database, tmp_path / "missing" / "cache.sqlite"):
+        monkeypatch.setenv("BOX_SHARED_CACHE", str(path))
+        assert SharedCache.from_env() is None
@@ -0,0 +1,200 @@
+import hashlib
+import io
+import itertools
+from types import SimpleNamespace
+
+from box_sync import sync_folder
+
+
+class FakeBox:
+    """Box folder tree with an events stream, kept in memory."""
+
+    def __init__(self):
+        self.items = {"0": {"type": "folder", "name": "All Files", "parent": None}}
+        self.log = []
+        self._ids = itertools.count(100)
+        self.folders = SimpleNamespace(
+            get_folder_items=self._folder_items,
+            get_folder_by_id=lambda id_, fields=None: self._info(id_),
+            create_folder=lambda name, parent: self._info(self.add("folder", name, parent.id)),
+        )
+        self.files = SimpleNamespace(
+            get_file_by_id=lambda id_, fields=None: self._info(id_),
+            update_file_by_id=self._move,
+            delete_file_by_id=self.trash,
+        )
+        self.downloads = SimpleNamespace(
+            download_file=lambda id_, range=None: io.BytesIO(self.items[id_]["content"])
+        )
+        self.uploads = SimpleNamespace(
+            preflight_file_upload_check=lambda **kwargs: None,
+            upload_file=lambda attributes, file, content_md_5=None: self._uploaded(
+                self.add("file", attributes.name, attributes.parent.id, file.read())
+            ),
+            upload_file_version=lambda id_, attributes, file, content_md_5=None: self._uploaded(
+                self.write(id_, file.read())
+            ),
+        )
+        self.events = SimpleNamespace(get_events=self._get_events)
+
+    # Changes made "by another user"
+    def add(self, item_type, name, parent, content=None):
+        item_id = str(next(self._ids))
+        self.items[item_id] = {"type": item_type, "name": name, "parent": parent, "content": content}
+        return self._changed(item_id)
+
+    def write(self, item_id, content):
+        self.items[item_id]["content"] = content
+        return self._changed(item_id)
+
+    def trash(self, item_id, if_match=None):
+        self.items[item_id]["trashed"] = True
+        self._changed(item_id)
+
+    def _move(self, item_id, name=None, parent=None, **kwargs):
+        self.items[item_id]["name"] = name or self.items[item_id]["name"]
+        self.items[item_id]["parent"] = parent.id if parent else self.items[item_id]["parent"]
+        return self._info(self._changed(item_id))
+
+    def _changed(self, item_id):
+        self.log.append(SimpleNamespace(type=self.items[item_id]["type"], id=item_id))
+        return item_id
+
+    def _trashed(self, item_id):
+        while item_id:
+            if self.items[item_id].get("trashed"):
+                return True
+            item_id = self.items[item_id]["parent"]
+        return False
+
+    def _info(self, item_id):
+        item = self.items[item_id]
+        ancestors, parent = [], item["parent"]
+        while parent:
+            ancestors.insert(0, SimpleNamespace(id=parent, name=self.items[parent]["name"]))
+            parent = self.items[parent]["parent"]
+        content = item.get("content")
+        return SimpleNamespace(
+            type=item["type"],
+            id=item_id,
+            name=item["name"],
+            size=len(content) if content is not None else None,
+            sha_1=hashlib.sha1(content).hexdigest() if content is not None else None,
+            etag=str(len(self.log)),
+            item_status="trashed" if self._trashed(item_id) else "active",
+            path_collection=SimpleNamespace(entries=ancestors),
+        )
+
+    def _folder_items(self, folder_id, **kwargs):
+        entries = [
+            self._info(item_id)
+            for item_id, item in self.items.items()
+            if item["parent"] == folder_id and not item.get("trashed")
+        ]
+        return SimpleNamespace(entries=entries, next_marker=None)
+
+    def _uploaded(self, item_id):
+        return SimpleNamespace(entries=[self._info(item_id)])
+
+    def _get_events(self, stream_type=None, stream_position=None, limit=100):
+        if stream_position == "now":
+            return SimpleNamespace(entries=[], next_stream_position=len(self.log))
+        start = int(stream_position)
+        entries = [
+            SimpleNamespace(source=source) for source in self.log[start : start + limit]
+        ]
+        return SimpleNamespace(entries=entries, next_stream_position=start + len(entries))
+
+    def tree(self, folder_id="0", prefix=""):
+        files = {}
+        for entry in self._folder_items(folder_id).entries:
+            if entry.type == "folder":
+                files.update(self.tree(entry.id, prefix + entry.name + "/"))
+            else:
+                files[prefix + entry.name] = self.items[entry.id]["content"]
+        return files
+
+
+def local_tree(root):
+    return {
+        path.relative_to(root).as_posix(): path.read_bytes()
+        for path in root.rglob("*")
+        if path.is_file() and not path.name.startswith(".box-sync")
+    }
+
+
+def changes(result):
+    return {change["path"]: change.get("actions", change["status"]) for change in result["changes"]}
+
+
+def setup(tmp_path):
+    box = FakeBox()
+    box.add("file", "a.txt", "0", b"a")
+    sub = box.add("folder", "sub", "0")
+    box.add("file", "b.txt", sub, b"b")
+    (tmp_path / "a.txt").write_bytes(b"a")
+    (tmp_path / "c.txt").write_bytes(b"c")
+    return box, sub
+
+
+def test_first_sync_merges_both_sides(tmp_path):
+    box, _ = setup(tmp_path)
+    result = sync_folder(box, "0", str(tmp_path))
+    assert result["mode"] == "full"
+    assert changes(result) == {"sub/b.txt": ["download"], "c.txt": ["upload"]}
+    assert local_tree(tmp_path) == box.tree() == {"a.txt": b"a", "c.txt": b"c", "sub/b.txt": b"b"}
+
+    result = sync_folder(box, "0", str(tmp_path))
+    assert result["mode"] == "incremental"
+    assert result["changes"] == []
+
+
+def test_incremental_sync_applies_changes_on_both_sides(tmp_path):
+    box, sub = setup(tmp_path)
+    sync_folder(box, "0", str(tmp_path))
+    a_id = next(i for i, item in box.items.items() if item["name"] == "a.txt")
+    c_id = next(i for i, item in box.items.items() if item["name"] == "c.txt")
+
+    box.write(a_id, b"a2")
+    box._move(sub, name="renamed")
+    box.trash(c_id)
+    box.add("file", "d.txt", "0", b"d")
+    (tmp_path / "sub" / "b.txt").write_bytes(b"b2")
+    (tmp_path / "e.txt").write_bytes(b"e")
+
+    result = sync_folder(box, "0", str(tmp_path))
+    assert result["mode"] == "incremental"
+    assert changes(result) == {
+        "a.txt": ["download"],
+        "renamed/b.txt": ["rename_local", "upload"],
+        "c.txt": ["delete_local"],
+        "d.txt": ["download"],
+        "e.txt": ["upload"],
+    }
+    expected = {"a.txt": b"a2", "renamed/b.txt": b"b2", "d.txt": b"d", "e.txt": b"e"}
+    assert local_tree(tmp_path) == box.tree() == expected
+
+    # Local renames become moves in Box
+    (tmp_path / "renamed" / "b.txt").rename(tmp_path / "b.txt")
+    (tmp_path / "e.txt").unlink()
+    result = sync_folder(box, "0", str(tmp_path))
+    assert changes(result) == {"b.txt": ["rename_remote"], "e.txt": ["delete_remote"]}
+    assert local_tree(tmp_path) == box.tree() == {"a.txt": b"a2", "b.txt": b"b2", "d.txt": b"d"}
+
+
+def test_conflicts_are_kept_until_resolved(tmp_path):
+    box, _ = setup(tmp_path)
+    sync_folder(box, "0", str(tmp_path))
+    a_id = next(i for i, item in box.items.items() if item["name"] == "a.txt")
+    box.write(a_id, b"remote")
+    (tmp_path / "a.txt").write_bytes(b"local")
+
+    for _ in range(2):
+        result = sync_folder(box, "0", str(tmp_path))
+        assert changes(result) == {"a.txt": "conflict"}
+        assert (tmp_path / "a.txt").read_bytes() == b"local"
+
+    result = sync_folder(box, "0", str(tmp_path), conflict_policy="remote")
+    assert changes(result) == {"a.txt": ["download"]}
+    assert (tmp_path / "a.txt").read_bytes() == b"remote"
+    assert sync_folder(box, "0", str(tmp_path))["changes"] == []
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import box_ai_agents_toolkit
+import pytest
+
+from box_text_index import TextIndex, TextIndexer
+
+
+def test_search_ranks_scopes_and_invalidates(tmp_path):
+    index = TextIndex(str(tmp_path / "index.db"))
+    index.add("1", "The quarterly budget review covers travel and budget cuts.", name="notes.txt")
+    index.add("2", "Travel policy: economy class for flights under six hours.")
+    index.add("3", "Budget for the Berlin office.", identity="user:42")
+
+    results = index.search("budget")
+    assert [r["file_id"] for r in results] == ["1"]
+    assert "[budget]" in results[0]["snippet"]
+    # Both mention travel once; the shorter document ranks first
+    assert [r["file_id"] for r in index.search("travel")] == ["2", "1"]
+    # Matches in the name count for more than matches in the text
+    index.add("4", "Minutes of the travel committee.", name="travel.txt")
+    assert index.search("travel")[0]["file_id"] == "4"
+    assert [r["file_id"] for r in index.search("budget", identity="user:42")] == ["3"]
+    # Punctuation and FTS5 operators in queries are searched for literally
+    assert [r["file_id"] for r in index.search("policy: NOT economy")] == []
+    with pytest.raises(ValueError):
+        index.search("  ")
+
+    # Re-reading a file keeps the name learned earlier
+    index.add("1", "Replaced text about hiring.")
+    assert index.search("budget") == []
+    assert index.search("hiring")[0]["name"] == "notes.txt"
+
+    index.invalidate("1")
+    assert index.search("hiring") == []
+    assert index.stats()["documents"] == 3
+
+
+def test_indexer_extracts_only_changed_files(monkeypatch):
+    files = {
+        "10": SimpleNamespace(type="file", id="10", name="a.txt", size=5, sha_1="s1"),
+        "11": SimpleNamespace(type="file", id="11", name="b.txt", size=5, sha_1="s2"),
+    }
+    client = SimpleNamespace(
+        folders=SimpleNamespace(
+            get_folder_items=lambda folder_id, **kwargs: SimpleNamespace(
+                entries=list(files.values()), next_marker=None
+            )
+        )
+    )
+    extracted = []
+
+    def extract(client, file_id):
+        extracted.append(file_id)
+        return f"contract number {file_id}"
+
+    monkeypatch.setattr(box_ai_agents_toolkit, "box_file_text_extract", extract)
+    index = TextIndex(":memory:")
+    indexer = TextIndexer(lambda: client, index, ["0"])
+
+    indexer.index_once()
+    assert sorted(extracted) == ["10", "11"]
+    assert index.search("11")[0]["name"] == "b.txt"
+
+    files["11"].sha_1 = "s3"
+    del files["10"]
+    indexer.index_once()
+    assert sorted(extracted) == ["10", "11", "11"]
+    assert [r["file_id"] for r in index.search("contract")] == ["11"]
+    assert indexer.stats()["removed"] == 1
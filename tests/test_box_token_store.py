@@ -0,0 +1,124 @@
+import time
+from contextlib import contextmanager
+
+from box_sdk_gen import AccessToken, BoxOAuth, FileWithInMemoryCacheTokenStorage
+
+from box_token_store import (
+    SharedFileTokenStorage,
+    TokenRefresher,
+    get_shared_oauth,
+)
+
+
+def _token(name: str, expires_in: int = 3600) -> AccessToken:
+    return AccessToken(
+        access_token=f"access-{name}",
+        refresh_token=f"refresh-{name}",
+        expires_in=expires_in,
+        token_type="bearer",
+    )
+
+
+def _fake_refresh(calls: list):
+    """Stand-in for BoxOAuth.refresh_token that stores a new token."""
+
+    def refresh_token(self, *, network_session=None):
+        calls.append(self.token_storage.get().refresh_token)
+        token = _token(f"refreshed-{len(calls)}")
+        self.token_storage.store(token)
+        return token
+
+    return refresh_token
+
+
+def test_token_shared_between_storages(tmp_path):
+    path = str(tmp_path / "token.json")
+    first = SharedFileTokenStorage(path, legacy_filename=None)
+    second = SharedFileTokenStorage(path, legacy_filename=None)
+
+    first.store(_token("one"))
+    assert second.get().access_token == "access-one"
+    assert second.expires_at() > time.time() + 3000
+
+    second.store(_token("two"))
+    assert first.get().access_token == "access-two"
+
+
+def test_refresh_skipped_when_other_process_refreshed(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(BoxOAuth, "refresh_token", _fake_refresh(calls))
+    path = str(tmp_path / "token.json")
+
+    class Config:
+        client_id = "id"
+        client_secret = "secret"
+
+    replica_a = get_shared_oauth(Config, path)
+    replica_b = get_shared_oauth(Config, path)
+    replica_a.token_storage.store(_token("initial", expires_in=60))
+
+    # Both replicas see the token about to expire; only one refreshes it
+    assert replica_a.refresh_if_expiring(margin=600)
+    assert not replica_b.refresh_if_expiring(margin=600)
+    assert calls == ["refresh-initial"]
+    assert replica_b.token_storage.get().access_token == "access-refreshed-1"
+
+
+def test_inline_refresh_reuses_token_refreshed_elsewhere(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(BoxOAuth, "refresh_token", _fake_refresh(calls))
+    path = str(tmp_path / "token.json")
+
+    class Config:
+        client_id = "id"
+        client_secret = "secret"
+
+    auth = get_shared_oauth(Config, path)
+    auth.token_storage.store(_token("initial"))
+    acquire_lock = auth.token_storage.lock
+
+    @contextmanager
+    def lock_after_other_process_refreshed():
+        # Another replica refreshes while this one waits for the lock
+        SharedFileTokenStorage(path, legacy_filename=None).store(_token("other"))
+        with acquire_lock():
+            yield
+
+    monkeypatch.setattr(auth.token_storage, "lock", lock_after_other_process_refreshed)
+
+    assert auth.refresh_token().access_token == "access-other"
+    assert calls == []
+
+
+def test_refresher_schedules_ahead_of_expiry(tmp_path):
+    path = str(tmp_path / "token.json")
+
+    class Config:
+        client_id = "id"
+        client_secret = "secret"
+
+    auth = get_shared_oauth(Config, path)
+    auth.token_storage.store(_token("initial", expires_in=3600))
+    refresher = TokenRefresher(auth, margin=600)
+
+    assert 2990 < refresher.seconds_until_due() <= 3000
+    assert refresher.stats()["refreshes"] == 0
+
+
+def test_new_authorization_replaces_shared_token(tmp_path):
+    path = str(tmp_path / "token.json")
+    legacy = str(tmp_path / "legacy")
+    FileWithInMemoryCacheTokenStorage(legacy).store(_token("first"))
+    storage = SharedFileTokenStorage(path, legacy_filename=legacy)
+    assert storage.get().access_token == "access-first"
+
+    storage.store(_token("refreshed"))
+    assert storage.get().access_token == "access-refreshed"
+
+    # authorize_app writes the toolkit's shelve storage again
+    time.sleep(0.01)
+    FileWithInMemoryCacheTokenStorage(legacy).store(_token("reauthorized"))
+    assert storage.get().access_token == "access-reauthorized"
+    assert SharedFileTokenStorage(path, legacy_filename=None).get().access_token == (
+        "access-reauthorized"
+    )
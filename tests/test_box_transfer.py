@@ -0,0 +1,222 @@
+import hashlib
+import io
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from box_transfer import download_folder, upload_directory
+
+
+class FakeBox:
+    """Folder tree with download (Range support) and upload endpoints."""
+
+    def __init__(self, files):
+        self.contents = files
+        self.ranges = []
+        self.uploads_sent = []
+        self.folders = SimpleNamespace(
+            get_folder_items=self._items, create_folder=self._create_folder
+        )
+        self.downloads = SimpleNamespace(download_file=self._download)
+        self.uploads = SimpleNamespace(
+            preflight_file_upload_check=lambda **kwargs: None,
+            upload_file=self._upload,
+            upload_file_version=self._upload_version,
+        )
+
+    def _items(self, folder_id, **kwargs):
+        prefix = "" if folder_id == "0" else folder_id + "/"
+        entries, folders = [], set()
+        for path, content in self.contents.items():
+            if not path.startswith(prefix):
+                continue
+            name, _, rest = path[len(prefix):].partition("/")
+            if rest:
+                folders.add(name)
+            else:
+                entries.append(self._file(path, name, content))
+        entries += [SimpleNamespace(type="folder", id=prefix + name, name=name) for name in folders]
+        return SimpleNamespace(entries=entries, next_marker=None)
+
+    @staticmethod
+    def _file(path, name, content):
+        return SimpleNamespace(
+            type="file", id=path, name=name, size=len(content),
+            sha_1=hashlib.sha1(content).hexdigest(),
+        )
+
+    def _download(self, file_id, range=None):
+        self.ranges.append((file_id, range))
+        content = self.contents[file_id]
+        if range:
+            content = content[int(range[len("bytes="):].rstrip("-")):]
+        return io.BytesIO(content)
+
+    def _create_folder(self, name, parent):
+        prefix = "" if parent.id == "0" else parent.id + "/"
+        # Folders only exist through the files in them
+        self.contents[prefix + name + "/.keep"] = b""
+        return SimpleNamespace(id=prefix + name)
+
+    def _upload(self, attributes, file, content_md_5=None):
+        prefix = "" if attributes.parent.id == "0" else attributes.parent.id + "/"
+        return self._store(prefix + attributes.name, file.read(), content_md_5)
+
+    def _upload_version(self, file_id, attributes, file, content_md_5=None):
+        return self._store(file_id, file.read(), content_md_5)
+
+    def _store(self, path, content, sha1):
+        assert sha1 == hashlib.sha1(content).hexdigest()
+        self.contents[path] = content
+        self.uploads_sent.append(path)
+        return SimpleNamespace(entries=[SimpleNamespace(id=path)])
+
+
+FILES = {"a.txt": b"a" * 1000, "sub/b.txt": b"b" * 3000, "sub/deeper/c.bin": b"c" * 10}
+
+
+def statuses(result):
+    return {f["path"]: f["status"] for f in result["files"]}
+
+
+def test_download_resume_and_skip(tmp_path):
+    box = FakeBox(FILES)
+    result = download_folder(box, "0", str(tmp_path), max_concurrency=2)
+    assert set(statuses(result).values()) == {"downloaded"}
+    assert (tmp_path / "sub" / "deeper" / "c.bin").read_bytes() == b"c" * 10
+
+    # An interrupted download and a locally modified file
+    (tmp_path / "sub" / "b.txt").unlink()
+    (tmp_path / "sub" / "b.txt.part").write_bytes(b"b" * 1200)
+    (tmp_path / "a.txt").write_bytes(b"changed")
+    box.ranges.clear()
+
+    result = download_folder(box, "0", str(tmp_path))
+    assert statuses(result) == {
+        "a.txt": "downloaded",
+        "sub/b.txt": "resumed",
+        "sub/deeper/c.bin": "skipped",
+    }
+    assert sorted(box.ranges) == [("a.txt", None), ("sub/b.txt", "bytes=1200-")]
+    assert (tmp_path / "sub" / "b.txt").read_bytes() == FILES["sub/b.txt"]
+    assert not (tmp_path / "sub" / "b.txt.part").exists()
+
+
+def test_stale_partial_file_is_downloaded_again(tmp_path):
+    box = FakeBox({"a.txt": b"new content"})
+    (tmp_path / "a.txt.part").write_bytes(b"old")
+    result = download_folder(box, "0", str(tmp_path))
+    assert statuses(result) == {"a.txt": "downloaded"}
+    assert (tmp_path / "a.txt").read_bytes() == b"new content"
+
+
+def test_download_to_zip(tmp_path):
+    box = FakeBox(FILES)
+    archive_path = str(tmp_path / "out.zip")
+    result = download_folder(box, "0", archive_path, recursive=False)
+    assert statuses(result) == {"a.txt": "downloaded"}
+
+    result = download_folder(box, "0", archive_path)
+    assert statuses(result) == {
+        "a.txt": "skipped",
+        "sub/b.txt": "downloaded",
+        "sub/deeper/c.bin": "downloaded",
+    }
+    with zipfile.ZipFile(archive_path) as archive:
+        assert {name: archive.read(name) for name in archive.namelist()} == FILES
+    assert not (tmp_path / "out.zip.parts").exists()
+
+
+def test_upload_directory_skips_unchanged_files(tmp_path):
+    for path, content in FILES.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(content)
+    box = FakeBox({"a.txt": b"old", "sub/b.txt": FILES["sub/b.txt"]})
+
+    result = upload_directory(box, str(tmp_path), "0", max_concurrency=2)
+    assert statuses(result) == {
+        "a.txt": "updated",
+        "sub/b.txt": "skipped",
+        "sub/deeper/c.bin": "uploaded",
+    }
+    assert result["folders_created"] == 1
+    assert sorted(box.uploads_sent) == ["a.txt", "sub/deeper/c.bin"]
+    assert all(box.contents[path] == content for path, content in FILES.items())
+
+    result = upload_directory(box, str(tmp_path), "0")
+    assert set(statuses(result).values()) == {"skipped"}
+    assert result["folders_created"] == 0
+
+
+def test_upload_into_a_file_fails_its_subtree(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.txt").write_bytes(b"b")
+    (tmp_path / "a.txt").write_bytes(b"a")
+    box = FakeBox({"sub": b"a file, not a folder"})
+
+    result = upload_directory(box, str(tmp_path), "0")
+    assert statuses(result) == {"a.txt": "uploaded", "sub/b.txt": "failed"}
+    assert "not a folder" in result["files"][1]["error"]
+
+
+def test_cancelled_transfers_clean_up_or_resume(tmp_path, monkeypatch):
+    import box_transfer
+    from box_cancel import CancelToken, OperationCancelled
+
+    # A download cancelled mid-file keeps its partial file, and running it
+    # again continues from there
+    cancel = CancelToken()
+    box = FakeBox({"a.txt": b"a" * (3 * box_transfer.NETWORK_READ_SIZE)})
+    real_download = box.downloads.download_file
+
+    def download(file_id, range=None):
+        stream = real_download(file_id, range)
+        read = stream.read
+        # Cancelled once the first chunk was written
+        stream.read = lambda size: (stream.tell() and cancel.cancel(), read(size))[1]
+        return stream
+
+    box.downloads.download_file = download
+    with pytest.raises(OperationCancelled):
+        download_folder(box, "0", str(tmp_path / "out"), cancel=cancel)
+    assert [p.name for p in (tmp_path / "out").iterdir()] == ["a.txt.part"]
+    box.downloads.download_file = real_download
+    result = download_folder(box, "0", str(tmp_path / "out"))
+    assert statuses(result) == {"a.txt": "resumed"}
+    assert [p.name for p in (tmp_path / "out").iterdir()] == ["a.txt"]
+
+    # A chunked upload cancelled between parts deletes its upload session
+    monkeypatch.setattr(box_transfer, "CHUNKED_UPLOAD_MIN_SIZE", 10)
+    sessions = []
+    box.chunked_uploads = SimpleNamespace(
+        create_file_upload_session=lambda parent_id, size, name: SimpleNamespace(
+            id="s1", part_size=4
+        ),
+        upload_file_part=lambda session_id, body, digest, content_range: SimpleNamespace(
+            part=content_range
+        ),
+        delete_file_upload_session_by_id=sessions.append,
+    )
+    source = tmp_path / "big.bin"
+    source.write_bytes(b"x" * 12)
+    cancel = CancelToken()
+    with pytest.raises(OperationCancelled):
+        box_transfer.upload_file_from(
+            box, str(source), "big.bin", "0", on_bytes=lambda sent: cancel.cancel(), cancel=cancel
+        )
+    assert sessions == ["s1"]
+
+
+def test_saved_download_continues_from_its_partial_file(tmp_path):
+    from box_cancel import CancelToken
+    from mcp_server_box import _save_download
+
+    box = FakeBox({"a.txt": b"a" * 3000})
+    (tmp_path / "a.txt.part").write_bytes(b"a" * 1000)
+    file_info = box._file("a.txt", "a.txt", box.contents["a.txt"])
+
+    path = _save_download(box, file_info, str(tmp_path), CancelToken())
+    assert path == str(tmp_path / "a.txt")
+    assert box.ranges == [("a.txt", "bytes=1000-")]
+    assert (tmp_path / "a.txt").read_bytes() == b"a" * 3000
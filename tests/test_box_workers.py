@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount
+
+from box_workers import MessageRouter, worker_socket_path
+
+
+def test_messages_for_other_workers_are_forwarded(tmp_path):
+    import uvicorn
+
+    def worker_app(worker):
+        async def local(scope, receive, send):
+            text = f"worker {worker} {scope['path']} {scope['query_string'].decode()}"
+            await PlainTextResponse(text)(scope, receive, send)
+
+        # Mounted at the message path, as in BoxMCP.worker_app
+        return Starlette(routes=[Mount("/messages", app=MessageRouter(worker, str(tmp_path), local))])
+
+    # Worker 1 listens on its socket in the runtime directory
+    worker_1 = uvicorn.Server(
+        uvicorn.Config(
+            worker_app(1), uds=worker_socket_path(str(tmp_path), 1), log_config=None
+        )
+    )
+    thread = threading.Thread(target=worker_1.run, daemon=True)
+    thread.start()
+
+    worker_0 = worker_app(0)
+    router = worker_0.routes[0].app
+
+    async def run():
+        while not worker_1.started:
+            await asyncio.sleep(0.01)
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=worker_0), base_url="http://worker"
+        ) as client:
+            responses = [
+                await client.post(path, params={"session_id": "abc"}, json={})
+                for path in ("/messages/w0/", "/messages/w1/", "/messages/w2/")
+            ]
+        return [(response.status_code, response.text) for response in responses]
+
+    try:
+        assert asyncio.run(run()) == [
+            (200, "worker 0 /messages/w0/ session_id=abc"),
+            (200, "worker 1 /messages/w1/ session_id=abc"),
+            # Worker 2 is not running: its sessions are gone
+            (404, "Could not find session"),
+        ]
+    finally:
+        worker_1.should_exit = True
+        thread.join(5)
+    assert router.forwarded == 1